@@ -13,6 +13,7 @@ except ImportError:
     smbus = type('obj', (object,), {'SMBus': MockSMBus})
 
 import time
+from metrics import histogram
 
 try:
     import RPi.GPIO as GPIO
@@ -72,6 +73,20 @@ DEFAULTS = {
     3: 90
 }
 
+# Optional callback(name, value), e.g. Recorder.sensor, called for sensor readings
+on_sensor = None
+
+def report_sensor(name, value):
+    if on_sensor is not None:
+        on_sensor(name, value)
+
+def phase_timer(phase):
+    return histogram("wastexpert_automation_seconds", "Pickup automation phase duration in seconds.", phase=phase)
+
+LIFT_UP_SECONDS = phase_timer("lift_up")
+LIFT_DOWN_SECONDS = phase_timer("lift_down")
+SEQUENCE_SECONDS = phase_timer("sequence")
+
 # ================= PCA FUNCTIONS =================
 def write_byte(reg, val):
     try:
@@ -142,15 +157,18 @@ def motor_down():
 
 # ================= MOVEMENT =================
 def move_up_until_L2():
+    start = time.perf_counter()
     motor_up()
     # No timeout - wait forever until L2 is pressed (LOW)
     while GPIO.input(L2) == 1:
         time.sleep(0.05)
     motor_stop()
+    LIFT_UP_SECONDS.observe(time.perf_counter() - start)
     print("TOP Reached")
 
 def move_down_until_L1(check_sensors=False):
 
+    start = time.perf_counter()
     motor_down()
 
     metal_confirmed = False
@@ -168,6 +186,8 @@ def move_down_until_L1(check_sensors=False):
 
             wet_raw   = GPIO.input(WET_SENSOR_PIN)
             metal_raw = GPIO.input(METAL_SENSOR_PIN)
+            report_sensor("wet", wet_raw)
+            report_sensor("metal", metal_raw)
 
             # ---- METAL LOGIC ----
             if wet_raw == 1 and metal_raw == 0:
@@ -190,7 +210,10 @@ def move_down_until_L1(check_sensors=False):
         time.sleep(0.05)
 
     motor_stop()
+    LIFT_DOWN_SECONDS.observe(time.perf_counter() - start)
     print("BOTTOM Reached")
+    if check_sensors:
+        report_sensor("result", {"metal": metal_confirmed, "wet": wet_confirmed})
 
     return metal_confirmed, wet_confirmed
 
@@ -203,6 +226,7 @@ def set_defaults():
 def automation_sequence():
 
     print("\n===== AUTOMATION START =====")
+    start = time.perf_counter()
 
     move_servo(1, 150)
     move_down_until_L1()
@@ -243,6 +267,7 @@ def automation_sequence():
 
     move_up_until_L2()
 
+    SEQUENCE_SECONDS.observe(time.perf_counter() - start)
     print("===== AUTOMATION COMPLETE =====\n")
 
 # ================= MAIN =================
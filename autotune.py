@@ -0,0 +1,179 @@
+import hashlib
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+import cv2
+
+from detector import create_detector, cuda_available
+from ort_net import ort
+
+# ================= CONFIGURATION =================
+CACHE_FILE = "autotune_cache.json"
+MODEL_TYPES = ['n', 's']          # Larger models are preferred when they fit the budget
+INPUT_SIZES = [320, 416, 480, 640]
+THREAD_COUNTS = [1, 2, 4]
+LATENCY_BUDGET_MS = 250           # Per-frame detect() latency (letterbox + forward + decode)
+CAMERA_SIZE = (640, 480)
+WARMUP = 2
+RUNS = 10
+CONF_THRESHOLD = 0.20
+NMS_THRESHOLD = 0.45
+
+
+def model_file(model_type, size):
+    # Stock download is 640x640; every other size comes from export_onnx.py
+    if size == 640:
+        return f"yolov8{model_type}.onnx"
+    return f"yolov8{model_type}_{size}x{size}.onnx"
+
+
+def available_backends():
+    backends = ["opencv"]
+    if cuda_available():
+        backends.append("opencv-cuda")
+    if ort is not None:
+        backends.append("onnxruntime")
+    return backends
+
+
+def hardware_id():
+    """
+    Identifies the machine and the inference libraries, e.g.
+    "aarch64/Raspberry Pi 4 Model B Rev 1.4/4cpu/cv4.9.0/ort1.17.0".
+    """
+    cpu = platform.processor() or "unknown"
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                key, _, value = line.partition(":")
+                # "Model" on Raspberry Pi, "model name" on x86
+                if key.strip() in ("Model", "model name"):
+                    cpu = value.strip()
+    except OSError:
+        pass
+    ort_version = ort.__version__ if ort is not None else "none"
+    return f"{platform.machine()}/{cpu}/{os.cpu_count()}cpu/cv{cv2.__version__}/ort{ort_version}"
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def load_tuned(cache_file=CACHE_FILE):
+    """
+    Returns: the newest cached configuration for this machine whose model
+    file still exists with the same hash, or None (run autotune.py).
+    """
+    if not os.path.exists(cache_file):
+        return None
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring autotune cache {cache_file}: {e}")
+        return None
+
+    prefix = hardware_id() + "|"
+    entries = [entry for key, entry in cache.items() if key.startswith(prefix)]
+    for entry in sorted(entries, key=lambda e: e["tuned_at"], reverse=True):
+        if os.path.exists(entry["model_file"]) and file_sha256(entry["model_file"]) == entry["model_sha256"]:
+            return entry
+    return None
+
+
+def save_tuned(entry, cache_file=CACHE_FILE):
+    cache = {}
+    if os.path.exists(cache_file):
+        try:
+            with open(cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            pass
+    cache[f"{hardware_id()}|{entry['model_sha256']}"] = entry
+    with open(cache_file, "w") as f:
+        json.dump(cache, f, indent=2)
+
+
+def bench(model_path, backend, threads, size, frame, budget_ms):
+    """
+    Returns: median detect() latency in ms (the warm-up latency if that is
+    already far over budget, to keep slow combinations from dominating the run)
+    """
+    cv2.setNumThreads(threads)
+    options = {"threads": threads} if backend == "onnxruntime" else {}
+    detector = create_detector(backend, model_path, (size, size), **options)
+
+    def step():
+        start = time.perf_counter()
+        detector.detect(frame, conf_threshold=CONF_THRESHOLD, nms_threshold=NMS_THRESHOLD)
+        return (time.perf_counter() - start) * 1000
+
+    for _ in range(WARMUP):
+        warm_ms = step()
+    if warm_ms > 2 * budget_ms:
+        return warm_ms
+    return float(np.median([step() for _ in range(RUNS)]))
+
+
+def choose(results, budget_ms):
+    """
+    Picks the most accurate model/input size whose fastest backend and thread
+    count meets the budget, or the fastest overall when nothing does.
+    """
+    within = [r for r in results if r["latency_ms"] <= budget_ms]
+    if not within:
+        return min(results, key=lambda r: r["latency_ms"])
+    return max(within, key=lambda r: (r["input_size"][0], MODEL_TYPES.index(r["model_type"]), -r["latency_ms"]))
+
+
+def main():
+    # Usage: python autotune.py [latency budget ms]
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else LATENCY_BUDGET_MS
+    frame = np.random.randint(0, 255, (CAMERA_SIZE[1], CAMERA_SIZE[0], 3), dtype=np.uint8)
+    backends = available_backends()
+    thread_counts = [t for t in THREAD_COUNTS if t <= (os.cpu_count() or 1)]
+
+    print(f"Hardware: {hardware_id()}")
+    print(f"Backends: {', '.join(backends)}, budget {budget_ms:.0f} ms")
+    print(f"{'model':<24}{'backend':<14}{'threads':>8}{'ms':>9}{'FPS':>8}")
+    results = []
+    for model_type in MODEL_TYPES:
+        for size in INPUT_SIZES:
+            path = model_file(model_type, size)
+            if not os.path.exists(path):
+                hint = "not downloaded" if size == 640 else f"export it with: python export_onnx.py {model_type} {size} {size}"
+                print(f"{path:<24}skipped ({hint})")
+                continue
+            for backend in backends:
+                for threads in thread_counts:
+                    try:
+                        ms = bench(path, backend, threads, size, frame, budget_ms)
+                    except Exception as e:
+                        print(f"{path:<24}{backend:<14}{threads:>8}  failed: {e}")
+                        continue
+                    print(f"{path:<24}{backend:<14}{threads:>8}{ms:>9.1f}{1000 / ms:>8.1f}")
+                    results.append({"model_type": model_type, "model_file": path, "input_size": [size, size],
+                                    "backend": backend, "threads": threads, "latency_ms": round(ms, 1)})
+
+    if not results:
+        print("No models found, nothing to tune.")
+        return
+
+    best = choose(results, budget_ms)
+    if best["latency_ms"] > budget_ms:
+        print(f"⚠️ Nothing meets {budget_ms:.0f} ms, using the fastest configuration.")
+    best.update(budget_ms=budget_ms, model_sha256=file_sha256(best["model_file"]), tuned_at=time.time())
+    save_tuned(best)
+    print(f"\n✅ {best['model_file']} on {best['backend']} x{best['threads']} threads: "
+          f"{best['latency_ms']} ms -> saved to {CACHE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -40,6 +40,13 @@ pwm_a = None
 pwm_b = None
 initialized = False
 
+# Optional callback(command name), e.g. Recorder.command, called for every drive command
+on_command = None
+
+def _notify(command):
+    if on_command is not None:
+        on_command(command)
+
 def init():
     global pwm_a, pwm_b, initialized
     if initialized:
@@ -63,10 +70,12 @@ def init():
 
 def stop():
     if not initialized: init()
+    _notify("STOP")
     GPIO.output([IN1, IN2, IN3, IN4], 0)
 
 def forward():
     if not initialized: init()
+    _notify("FORWARD")
     pwm_a.ChangeDutyCycle(SPEED)
     pwm_b.ChangeDutyCycle(SPEED)
     GPIO.output(IN1, 0); GPIO.output(IN2, 1)
@@ -74,6 +83,7 @@ def forward():
 
 def backward():
     if not initialized: init()
+    _notify("BACKWARD")
     pwm_a.ChangeDutyCycle(SPEED)
     pwm_b.ChangeDutyCycle(SPEED)
     GPIO.output(IN1, 1); GPIO.output(IN2, 0)
@@ -81,6 +91,7 @@ def backward():
 
 def left():
     if not initialized: init()
+    _notify("LEFT")
     pwm_a.ChangeDutyCycle(TURN_SPEED)
     pwm_b.ChangeDutyCycle(TURN_SPEED)
     GPIO.output(IN1, 0); GPIO.output(IN2, 1)
@@ -88,6 +99,7 @@ def left():
 
 def right():
     if not initialized: init()
+    _notify("RIGHT")
     pwm_a.ChangeDutyCycle(TURN_SPEED)
     pwm_b.ChangeDutyCycle(TURN_SPEED)
     GPIO.output(IN1, 1); GPIO.output(IN2, 0)
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import numpy as np
+import cv2
+
+from detector import create_detector
+from postprocess import split_cameras
+
+# ================= CONFIGURATION =================
+MODEL_FILE = "yolov8n.onnx"                  # batch 1
+BATCH_MODEL_FILE = "yolov8n_640x640_b2.onnx"  # python export_onnx.py n 640 640 2
+CAMERAS = 2
+INPUT_SIZE = (640, 640)
+FRAME_SIZE = (640, 480)
+BACKEND = "opencv"
+THREAD_COUNTS = [1, 2, 4]
+RUNS = 30
+CONF_THRESHOLD = 0.20
+NMS_THRESHOLD = 0.45
+
+
+def time_sets(detect, frames):
+    """
+    Returns: median milliseconds per set of frames (one frame per camera), last result
+    """
+    result = detect(frames)  # warm-up
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = detect(frames)
+        samples.append(time.perf_counter() - start)
+    return np.median(samples) * 1000, result
+
+
+def main():
+    model_file = sys.argv[1] if len(sys.argv) > 1 else MODEL_FILE
+    batch_model_file = sys.argv[2] if len(sys.argv) > 2 else BATCH_MODEL_FILE
+    for path in (model_file, batch_model_file):
+        if not os.path.exists(path):
+            print(f"Model file {path} not found.")
+            return
+
+    decode_kwargs = {"conf_threshold": CONF_THRESHOLD, "nms_threshold": NMS_THRESHOLD}
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8) for _ in range(CAMERAS)]
+
+    print(f"{CAMERAS} cameras, {RUNS} runs, median per set of {CAMERAS} frames")
+    print(f"  per camera: {model_file}\n  batched   : {batch_model_file}")
+    print(f"{'threads':>8}{'per-cam ms':>12}{'batched ms':>12}{'speedup':>9}{'sets/s':>8}{'same':>6}")
+    for threads in THREAD_COUNTS:
+        cv2.setNumThreads(threads)
+        single = create_detector(BACKEND, model_file, INPUT_SIZE)
+        batched = create_detector(BACKEND, batch_model_file, INPUT_SIZE)
+        each_ms, each = time_sets(lambda f: single.detect_each(f, **decode_kwargs), frames)
+        batch_ms, batch = time_sets(lambda f: batched.detect_batch(f, **decode_kwargs), frames)
+        # Both paths must find the same boxes on every camera
+        same = all(len(a) == len(b) and np.array_equal(a[["left", "top", "class_id"]], b[["left", "top", "class_id"]])
+                   for a, b in zip(split_cameras(each, CAMERAS), split_cameras(batch, CAMERAS)))
+        print(f"{threads:>8}{each_ms:>12.1f}{batch_ms:>12.1f}{each_ms / batch_ms:>8.2f}x"
+              f"{1000 / batch_ms:>8.1f}{'yes' if same else 'NO':>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import os
+import sys
+import time
+import numpy as np
+
+from infer_pool import InferencePool
+
+# ================= CONFIGURATION =================
+MODEL_FILE = "yolov8n.onnx"
+INPUT_SIZE = (640, 640)
+FRAME_SIZE = (640, 480)
+WORKER_COUNTS = [1, 2, 3, 4]
+THREAD_COUNTS = [1, 2, 4]
+MAX_TOTAL_THREADS = 8      # Skip combinations that oversubscribe the Pi 4 badly
+FRAMES = 60
+CONF_THRESHOLD = 0.20
+NMS_THRESHOLD = 0.45
+
+
+def bench(model_file, workers, threads, frames):
+    """
+    Feeds frames as fast as slots free up.
+    Returns: throughput (FPS), p50 and p95 latency (ms), out-of-order results
+    """
+    pool = InferencePool(model_file, INPUT_SIZE, FRAME_SIZE, workers, threads,
+                         decode_kwargs={"conf_threshold": CONF_THRESHOLD, "nms_threshold": NMS_THRESHOLD})
+    try:
+        rng = np.random.default_rng(0)
+        img = rng.integers(0, 255, (FRAME_SIZE[1], FRAME_SIZE[0], 3), dtype=np.uint8)
+
+        # Warm-up: one frame per worker (first forward pass is slow)
+        for seq in range(1, workers + 1):
+            pool.submit(seq, img)
+        while pool.completed < workers:
+            pool.poll(timeout=0.1)
+        pool.latencies.clear()
+        pool.stale = 0
+
+        seq = workers
+        target = workers + frames
+        start = time.perf_counter()
+        while pool.completed < target:
+            while seq < target and pool.submit(seq + 1, img):
+                seq += 1
+            pool.poll(timeout=0.01)
+        elapsed = time.perf_counter() - start
+
+        latencies = np.array(pool.latencies) * 1000
+        return frames / elapsed, np.percentile(latencies, 50), np.percentile(latencies, 95), pool.stale
+    finally:
+        pool.close()
+
+
+def main():
+    model_file = sys.argv[1] if len(sys.argv) > 1 else MODEL_FILE
+    if not os.path.exists(model_file):
+        print(f"Model file {model_file} not found.")
+        return
+
+    print(f"{model_file}, {FRAMES} frames per run, {os.cpu_count()} CPUs (ooo = results finished out of order)")
+    print(f"{'workers':>8}{'threads':>8}{'FPS':>8}{'p50 ms':>9}{'p95 ms':>9}{'ooo':>7}")
+    for workers in WORKER_COUNTS:
+        for threads in THREAD_COUNTS:
+            if workers * threads > MAX_TOTAL_THREADS:
+                continue
+            fps, p50, p95, stale = bench(model_file, workers, threads, FRAMES)
+            print(f"{workers:>8}{threads:>8}{fps:>8.1f}{p50:>9.1f}{p95:>9.1f}{stale:>7}")
+
+
+if __name__ == "__main__":
+    main()
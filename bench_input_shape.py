@@ -0,0 +1,66 @@
+import os
+import sys
+import time
+import numpy as np
+import cv2
+
+from preprocess import Letterbox, rect_input_size
+from postprocess import decode_yolov8
+
+# ================= CONFIGURATION =================
+MODEL_TYPE = 'n'
+CAMERA_SIZE = (640, 480)
+LONG_SIDES = [640, 416]
+RUNS = 30
+CONF_THRESHOLD = 0.20
+NMS_THRESHOLD = 0.45
+
+
+def model_file(model_type, width, height):
+    # Stock download is 640x640; every other shape comes from export_onnx.py
+    if (width, height) == (640, 640):
+        return f"yolov8{model_type}.onnx"
+    return f"yolov8{model_type}_{width}x{height}.onnx"
+
+
+def bench(path, input_size, frame):
+    net = cv2.dnn.readNetFromONNX(path)
+    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+    letterbox = Letterbox(input_size)
+
+    def step():
+        blob, scale, pad = letterbox.prepare(frame)
+        net.setInput(blob)
+        outputs = net.forward()
+        decode_yolov8(outputs, scale, pad, CONF_THRESHOLD, NMS_THRESHOLD)
+        return outputs.shape[2]
+
+    anchors = step()  # warm-up
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        step()
+        samples.append(time.perf_counter() - start)
+    return anchors, np.median(samples) * 1000
+
+
+def main():
+    model_type = sys.argv[1] if len(sys.argv) > 1 else MODEL_TYPE
+    frame = np.random.randint(0, 255, (CAMERA_SIZE[1], CAMERA_SIZE[0], 3), dtype=np.uint8)
+
+    print(f"Camera {CAMERA_SIZE[0]}x{CAMERA_SIZE[1]}, {RUNS} runs, median per frame")
+    print(f"{'mode':<8}{'input':>10}{'anchors':>9}{'ms':>9}{'FPS':>8}")
+    for long_side in LONG_SIDES:
+        for mode, input_size in (("square", (long_side, long_side)),
+                                 ("rect", rect_input_size(CAMERA_SIZE, long_side))):
+            path = model_file(model_type, *input_size)
+            if not os.path.exists(path):
+                print(f"{mode:<8}{input_size[0]:>5}x{input_size[1]:<4}  skipped ({path} not found)")
+                continue
+            anchors, ms = bench(path, input_size, frame)
+            print(f"{mode:<8}{input_size[0]:>5}x{input_size[1]:<4}{anchors:>9}{ms:>9.1f}{1000 / ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import time
+import numpy as np
+import cv2
+
+from postprocess import decode_yolov8
+
+# ================= CONFIGURATION =================
+NUM_CLASSES = 80
+NUM_ANCHORS = 8400
+NUM_OBJECTS = 40      # Anchors given a high score (simulated objects)
+CONF_THRESHOLD = 0.20
+NMS_THRESHOLD = 0.45
+SCALE = 1.0           # 640x480 letterboxed into 640x640
+PAD = (80, 0)
+RUNS = 20
+# Garbage columns of the COCO head (see garbage_map in main_pi.py)
+GARBAGE_CLASS_IDS = np.array([39, 40, 41, 45, 46, 47, 48, 49, 50, 51, 52, 53, 54, 55])
+
+
+def make_outputs(seed=0):
+    """
+    Builds a synthetic (1, 84, 8400) YOLOv8 output with mostly low scores
+    and a handful of confident anchors.
+    """
+    rng = np.random.default_rng(seed)
+    outputs = np.empty((1, 4 + NUM_CLASSES, NUM_ANCHORS), dtype=np.float32)
+    outputs[0, 0] = rng.uniform(0, 640, NUM_ANCHORS)
+    outputs[0, 1] = rng.uniform(80, 560, NUM_ANCHORS)
+    outputs[0, 2] = rng.uniform(10, 200, NUM_ANCHORS)
+    outputs[0, 3] = rng.uniform(10, 200, NUM_ANCHORS)
+    outputs[0, 4:] = rng.uniform(0, 0.1, (NUM_CLASSES, NUM_ANCHORS))
+    hot = rng.choice(NUM_ANCHORS, NUM_OBJECTS, replace=False)
+    outputs[0, 4 + rng.integers(0, NUM_CLASSES, NUM_OBJECTS), hot] = rng.uniform(0.3, 0.95, NUM_OBJECTS)
+    return outputs
+
+
+def legacy_decode(outputs, scale, pad):
+    # The per-row loop previously inlined in main_pi.py / laptop_main.py
+    pad_top, pad_left = pad
+    rows = np.transpose(outputs, (0, 2, 1))[0]
+    boxes = []
+    confidences = []
+    class_ids = []
+    for row in rows:
+        classes_scores = row[4:]
+        max_score_idx = np.argmax(classes_scores)
+        max_score = classes_scores[max_score_idx]
+        if max_score >= CONF_THRESHOLD:
+            cx, cy, w, h = row[0], row[1], row[2], row[3]
+            cx = (cx - pad_left) / scale
+            cy = (cy - pad_top) / scale
+            w /= scale
+            h /= scale
+            boxes.append([int(cx - 0.5 * w), int(cy - 0.5 * h), int(w), int(h)])
+            confidences.append(float(max_score))
+            class_ids.append(max_score_idx)
+    indices = cv2.dnn.NMSBoxes(boxes, confidences, CONF_THRESHOLD, NMS_THRESHOLD)
+    return [(boxes[i], confidences[i], class_ids[i]) for i in np.asarray(indices).reshape(-1)]
+
+
+def time_it(fn, *args):
+    fn(*args)  # warm-up
+    samples = []
+    for _ in range(RUNS):
+        start = time.perf_counter()
+        result = fn(*args)
+        samples.append(time.perf_counter() - start)
+    return np.median(samples) * 1000, result
+
+
+def main():
+    outputs = make_outputs()
+
+    legacy_ms, legacy = time_it(legacy_decode, outputs, SCALE, PAD)
+    fast_ms, fast = time_it(
+        lambda o: decode_yolov8(o, SCALE, PAD, CONF_THRESHOLD, NMS_THRESHOLD), outputs)
+    thresholds = np.full(len(GARBAGE_CLASS_IDS), CONF_THRESHOLD, dtype=np.float32)
+    garbage_ms, garbage = time_it(
+        lambda o: decode_yolov8(o, SCALE, PAD, CONF_THRESHOLD, NMS_THRESHOLD,
+                                class_ids=GARBAGE_CLASS_IDS, class_thresholds=thresholds), outputs)
+
+    print(f"Anchors: {NUM_ANCHORS}  Classes: {NUM_CLASSES}  Runs: {RUNS}")
+    print(f"Legacy loop : {legacy_ms:8.2f} ms  ({len(legacy)} detections)")
+    print(f"Vectorized  : {fast_ms:8.2f} ms  ({len(fast)} detections)")
+    print(f"Garbage-only: {garbage_ms:8.2f} ms  ({len(garbage)} detections)")
+    print(f"Speedup     : {legacy_ms / fast_ms:8.1f}x (all classes), {legacy_ms / garbage_ms:.1f}x (garbage-only)")
+
+
+if __name__ == "__main__":
+    main()
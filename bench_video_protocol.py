@@ -0,0 +1,111 @@
+import pickle
+import socket
+import struct
+import sys
+import threading
+import time
+import numpy as np
+import cv2
+
+from video_protocol import send_frame, FrameReceiver, decode_frame
+
+# ================= CONFIGURATION =================
+FRAMES = 500
+FRAME_SIZE = (640, 480)
+JPEG_QUALITY = 80
+# Previous framing: length, frame ID, capture time, then a pickled JPEG array
+LEGACY_HEADER = struct.Struct("<QQd")
+
+
+def make_jpeg(frame_size, quality):
+    # Smooth gradients plus noise compress like a camera frame (~50-100 KB)
+    w, h = frame_size
+    rng = np.random.default_rng(0)
+    x = np.linspace(0, 255, w, dtype=np.float32)
+    y = np.linspace(0, 255, h, dtype=np.float32)[:, None]
+    img = np.dstack([x + 0 * y, y + 0 * x, (x + y) / 2]) + rng.normal(0, 12, (h, w, 3))
+    ok, buffer = cv2.imencode('.jpg', np.clip(img, 0, 255).astype(np.uint8), [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+    return buffer
+
+
+def legacy_send(sock, seq, buffer):
+    data = pickle.dumps(buffer)
+    sock.sendall(LEGACY_HEADER.pack(len(data), seq, time.time()) + data)
+
+
+def legacy_receiver(sock, frames, decode):
+    # The loop previously in laptop_main.video_receiver
+    data = b""
+    payload_size = LEGACY_HEADER.size
+    for _ in range(frames):
+        while len(data) < payload_size:
+            data += sock.recv(4 * 1024)
+        msg_size, frame_id, t_capture = LEGACY_HEADER.unpack(data[:payload_size])
+        data = data[payload_size:]
+        while len(data) < msg_size:
+            data += sock.recv(4 * 1024)
+        frame_data = data[:msg_size]
+        data = data[msg_size:]
+        frame_buffer = pickle.loads(frame_data)
+        if decode:
+            cv2.imdecode(frame_buffer, cv2.IMREAD_COLOR)
+
+
+def binary_send(sock, seq, buffer):
+    send_frame(sock, seq, time.time(), FRAME_SIZE[0], FRAME_SIZE[1], buffer)
+
+
+def binary_receiver(sock, frames, decode):
+    receiver = FrameReceiver(sock)
+    for _ in range(frames):
+        header, payload = receiver.receive()
+        if decode:
+            decode_frame(header, payload)
+
+
+def bench(send, receive, buffer, frames, decode):
+    """
+    Streams frames over loopback as fast as the receiver takes them.
+    Returns: (frames per second, receiver CPU ms per frame)
+    """
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+
+    def sender():
+        conn, _ = server.accept()
+        with conn:
+            for seq in range(frames):
+                send(conn, seq, buffer)
+
+    t_send = threading.Thread(target=sender, daemon=True)
+    t_send.start()
+    client = socket.create_connection(server.getsockname())
+    try:
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        receive(client, frames, decode)
+        cpu = time.thread_time() - cpu_start
+        elapsed = time.perf_counter() - start
+    finally:
+        client.close()
+        t_send.join()
+        server.close()
+    return frames / elapsed, 1000 * cpu / frames
+
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else FRAMES
+    buffer = make_jpeg(FRAME_SIZE, JPEG_QUALITY)
+    print(f"{frames} frames of {buffer.nbytes / 1024:.0f} KB JPEG over loopback "
+          f"(receiver CPU = receiving thread only)")
+    print(f"{'protocol':<10}{'decode':>8}{'FPS':>9}{'MB/s':>8}{'recv CPU ms':>13}")
+    for decode in (False, True):
+        for name, send, receive in (("pickle", legacy_send, legacy_receiver),
+                                    ("binary", binary_send, binary_receiver)):
+            fps, cpu_ms = bench(send, receive, buffer, frames, decode)
+            print(f"{name:<10}{'yes' if decode else 'no':>8}{fps:>9.0f}{fps * buffer.nbytes / 1e6:>8.1f}{cpu_ms:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import time
+import cv2
+import numpy as np
+
+from metrics import stage_timer
+from preprocess import Letterbox, BatchLetterbox, Stretch
+from postprocess import decode_yolov8, decode_darknet, tag_camera, CAMERA_DETECTION_DTYPE
+from ort_net import OrtNet
+
+# Backend names accepted by create_detector()
+BACKENDS = ("opencv", "opencv-cuda", "onnxruntime", "darknet")
+
+PREPROCESS_SECONDS = stage_timer("preprocess")
+FORWARD_SECONDS = stage_timer("forward")
+DECODE_SECONDS = stage_timer("decode")
+
+
+class Detector:
+    """
+    Common contract shared by every inference backend:
+      preprocessor(frame_size) -> object whose prepare(img) returns (blob, scale, pad)
+      infer(blob)              -> raw network outputs
+      decode(outputs, scale, pad, **decode_kwargs)
+                               -> postprocess.DETECTION_DTYPE array in camera coordinates
+    detect(img) chains the three with a preprocessor owned by the detector
+    and records their latencies in the stage metrics.
+    detect_batch(imgs) does the same for one frame per camera in a single
+    forward pass (needs a model exported with that batch size, see
+    export_onnx.py); detect_each(imgs) is the one-call-per-camera equivalent.
+    The staged loops call the steps separately (one preprocessor per buffer).
+    decode_kwargs are the decode_yolov8 options (thresholds, class filter).
+    A detector is not thread-safe: only one thread may call infer() at a time.
+    """
+    name = "base"
+
+    def __init__(self, input_size):
+        self.input_size = tuple(input_size)
+        self._preprocessor = None
+        self._batch_preprocessor = None
+
+    def preprocessor(self, frame_size=None):
+        return Letterbox(self.input_size, frame_size)
+
+    def batch_preprocessor(self, batch_size, frame_size=None):
+        return BatchLetterbox(self.input_size, batch_size, frame_size)
+
+    def infer(self, blob):
+        raise NotImplementedError
+
+    def decode(self, outputs, scale, pad, **decode_kwargs):
+        return decode_yolov8(outputs, scale, pad, **decode_kwargs)
+
+    def detect(self, img, **decode_kwargs):
+        if self._preprocessor is None:
+            self._preprocessor = self.preprocessor()
+        start = time.perf_counter()
+        blob, scale, pad = self._preprocessor.prepare(img)
+        t_pre = time.perf_counter()
+        outputs = self.infer(blob)
+        t_fwd = time.perf_counter()
+        detections = self.decode(outputs, scale, pad, **decode_kwargs)
+        PREPROCESS_SECONDS.observe(t_pre - start)
+        FORWARD_SECONDS.observe(t_fwd - t_pre)
+        DECODE_SECONDS.observe(time.perf_counter() - t_fwd)
+        return detections
+
+    def detect_batch(self, imgs, **decode_kwargs):
+        """
+        Stacks imgs (one frame per camera) into one NCHW blob and runs a
+        single forward pass, so the per-call overhead (graph dispatch, thread
+        pool wake-up, small-layer inefficiency) is paid once for all cameras.
+        Returns: CAMERA_DETECTION_DTYPE array, camera = index in imgs
+        """
+        if self._batch_preprocessor is None or len(self._batch_preprocessor.slots) != len(imgs):
+            self._batch_preprocessor = self.batch_preprocessor(len(imgs))
+        start = time.perf_counter()
+        blob, scales, pads = self._batch_preprocessor.prepare(imgs)
+        t_pre = time.perf_counter()
+        outputs = self.infer(blob)
+        t_fwd = time.perf_counter()
+        if outputs.shape[0] != len(imgs):
+            # A batch-1 export accepts the blob but folds the batch into the
+            # anchor axis, so the boxes would be garbage
+            raise ValueError(f"Model returned a batch of {outputs.shape[0]} for {len(imgs)} frames; "
+                             f"export one with batch size {len(imgs)} (see export_onnx.py)")
+        detections = [tag_camera(self.decode(outputs[i:i + 1], scales[i], pads[i], **decode_kwargs), i)
+                      for i in range(len(imgs))]
+        PREPROCESS_SECONDS.observe(t_pre - start)
+        FORWARD_SECONDS.observe(t_fwd - t_pre)
+        DECODE_SECONDS.observe(time.perf_counter() - t_fwd)
+        return np.concatenate(detections) if detections else np.zeros(0, dtype=CAMERA_DETECTION_DTYPE)
+
+    def detect_each(self, imgs, **decode_kwargs):
+        """
+        detect_batch() with one forward pass per camera (batch-1 model).
+        """
+        detections = [tag_camera(self.detect(img, **decode_kwargs), i) for i, img in enumerate(imgs)]
+        return np.concatenate(detections) if detections else np.zeros(0, dtype=CAMERA_DETECTION_DTYPE)
+
+
+class OpenCVDetector(Detector):
+    """
+    YOLOv8 ONNX model on OpenCV DNN. cuda=True uses the CUDA backend when
+    OpenCV was built with it and a device is present, otherwise the CPU.
+    """
+    name = "opencv"
+
+    def __init__(self, model_path, input_size, cuda=False):
+        super().__init__(input_size)
+        self.net = cv2.dnn.readNetFromONNX(model_path)
+        self.device = "cuda" if cuda and cuda_available() else "cpu"
+        if self.device == "cuda":
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
+        else:
+            if cuda:
+                print("CUDA not available, running on CPU.")
+            self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+            self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+
+    def infer(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward()
+
+
+class OrtDetector(Detector):
+    """
+    YOLOv8 ONNX model (FP32 or INT8) on the onnxruntime CPU provider.
+    threads: intra-op threads (0 = onnxruntime default).
+    optimization: graph optimization level, see ort_net.OPTIMIZATION_LEVELS.
+    """
+    name = "onnxruntime"
+
+    def __init__(self, model_path, input_size, threads=0, optimization="all"):
+        super().__init__(input_size)
+        self.net = OrtNet(model_path, threads, optimization)
+        self.device = "cpu"
+
+    def infer(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward()
+
+
+class DarknetDetector(Detector):
+    """
+    Darknet YOLO (e.g. yolov4-tiny .cfg/.weights) on OpenCV DNN.
+    Uses a stretched resize instead of letterboxing, as the model was trained.
+    """
+    name = "darknet"
+
+    def __init__(self, weights_path, input_size=(416, 416), config_path=None):
+        super().__init__(input_size)
+        self.net = cv2.dnn.readNet(weights_path, config_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.output_layers = self.net.getUnconnectedOutLayersNames()
+        self.device = "cpu"
+
+    def preprocessor(self, frame_size=None):
+        return Stretch(self.input_size, frame_size)
+
+    def infer(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward(self.output_layers)
+
+    def decode(self, outputs, scale, pad, **decode_kwargs):
+        return decode_darknet(outputs, self.input_size, scale, pad, **decode_kwargs)
+
+    def detect_batch(self, imgs, **decode_kwargs):
+        # Region layer outputs are not split per image, run one pass per camera
+        return self.detect_each(imgs, **decode_kwargs)
+
+
+def cuda_available():
+    try:
+        return cv2.cuda.getCudaEnabledDeviceCount() > 0
+    except (AttributeError, cv2.error):
+        return False
+
+
+def create_detector(backend, model_path, input_size, **options):
+    """
+    Builds a detector by backend name (see BACKENDS).
+    options are passed to the backend, e.g. threads=2 for onnxruntime or
+    config_path="yolo/yolov4-tiny.cfg" for darknet.
+    """
+    if backend == "opencv":
+        return OpenCVDetector(model_path, input_size, **options)
+    if backend == "opencv-cuda":
+        return OpenCVDetector(model_path, input_size, cuda=True, **options)
+    if backend == "onnxruntime":
+        return OrtDetector(model_path, input_size, **options)
+    if backend == "darknet":
+        return DarknetDetector(model_path, input_size, **options)
+    raise ValueError(f"Unknown detector backend {backend!r}, expected one of {BACKENDS}")
@@ -1,8 +1,9 @@
 import cv2
-import numpy as np
 import time
 import threading
 
+from detector import DarknetDetector
+
 try:
     import RPi.GPIO as GPIO
 except ImportError:
@@ -262,16 +263,14 @@ def run_automation():
 def load_yolo():
     # Attempt to load YOLOv4-tiny if present, else warn or fallback?
     # Hardcoded to yolo/yolov4-tiny... as per request.
-    net = cv2.dnn.readNet("yolo/yolov4-tiny.weights", "yolo/yolov4-tiny.cfg")
+    detector = DarknetDetector("yolo/yolov4-tiny.weights", (416, 416), "yolo/yolov4-tiny.cfg")
     with open("yolo/coco.names", "r") as f:
         classes = [line.strip() for line in f.readlines()]
-    layer_names = net.getLayerNames()
-    output_layers = [layer_names[i - 1] for i in net.getUnconnectedOutLayers()]
-    return net, classes, output_layers
+    return detector, classes
 
 def main():
     init_gpio()
-    net, classes, output_layers = load_yolo()
+    detector, classes = load_yolo()
     cap = cv2.VideoCapture(0)
     cap.set(3, 320)
     cap.set(4, 240)
@@ -284,51 +283,23 @@ def main():
             if not ret: break
             
             height, width, _ = frame.shape
-            blob = cv2.dnn.blobFromImage(frame, 0.00392, (416, 416), (0, 0, 0), True, crop=False)
-            net.setInput(blob)
-            outs = net.forward(output_layers)
-            
-            class_ids = []
-            confidences = []
-            boxes = []
-            
-            # Parse detections
-            for out in outs:
-                for detection in out:
-                    scores = detection[5:]
-                    class_id = np.argmax(scores)
-                    confidence = scores[class_id]
-                    if confidence > 0.3:
-                        # Object detected
-                        center_x = int(detection[0] * width)
-                        center_y = int(detection[1] * height)
-                        w = int(detection[2] * width)
-                        h = int(detection[3] * height)
-                        
-                        x = int(center_x - w / 2)
-                        y = int(center_y - h / 2)
-                        
-                        boxes.append([x, y, w, h])
-                        confidences.append(float(confidence))
-                        class_ids.append(class_id)
-            
-            indexes = cv2.dnn.NMSBoxes(boxes, confidences, 0.5, 0.4)
+            # Class score above 0.5 (the old NMS score threshold), NMS IoU 0.4
+            detections = detector.detect(frame, conf_threshold=0.5, nms_threshold=0.4)
             
             target_box = None
             max_area = 0
             
-            if len(indexes) > 0:
-                for i in indexes.flatten():
-                    x, y, w, h = boxes[i]
-                    # Draw box
-                    color = (0, 255, 0)
-                    cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
-                    
-                    # Find largest object (assumed to be the target garbage)
-                    area = w * h
-                    if area > max_area:
-                        max_area = area
-                        target_box = (x, y, w, h)
+            for det in detections:
+                x, y, w, h = int(det["left"]), int(det["top"]), int(det["width"]), int(det["height"])
+                # Draw box
+                color = (0, 255, 0)
+                cv2.rectangle(frame, (x, y), (x + w, y + h), color, 2)
+                
+                # Find largest object (assumed to be the target garbage)
+                area = w * h
+                if area > max_area:
+                    max_area = area
+                    target_box = (x, y, w, h)
 
             # Control Logic
             if target_box:
@@ -0,0 +1,49 @@
+import sys
+import shutil
+import tempfile
+
+# Configuration
+MODEL_TYPE = 'n'      # 'n' or 's'
+INPUT_WIDTH = 640     # Multiples of 32, matching the camera aspect ratio
+INPUT_HEIGHT = 480
+BATCH_SIZE = 1        # >1 for batched multi-camera inference (one frame per camera)
+
+def export(model_type, width, height, batch=1):
+    from ultralytics import YOLO
+
+    # The batch size is fixed in the graph: a batch-1 model run on a stacked
+    # blob mixes the frames' anchors together
+    target = f"yolov8{model_type}_{width}x{height}.onnx"
+    if batch > 1:
+        target = target.replace(".onnx", f"_b{batch}.onnx")
+    model_name = f"yolov8{model_type}.pt"
+
+    # Export from a temporary copy so the stock yolov8{n,s}.onnx next to the
+    # weights is never overwritten
+    YOLO(model_name)  # downloads the weights if missing
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_weights = shutil.copy(model_name, tmp)
+        onnx_path = YOLO(tmp_weights).export(format="onnx", imgsz=(height, width), batch=batch,
+                                             opset=12, simplify=True)
+        shutil.move(onnx_path, target)
+
+    print(f"Exported {target} (input {batch}x3x{height}x{width})")
+    return target
+
+if __name__ == "__main__":
+    # Usage: python export_onnx.py [n|s] [width] [height] [batch]
+    model_type = sys.argv[1] if len(sys.argv) > 1 else MODEL_TYPE
+    width = int(sys.argv[2]) if len(sys.argv) > 2 else INPUT_WIDTH
+    height = int(sys.argv[3]) if len(sys.argv) > 3 else INPUT_HEIGHT
+    batch = int(sys.argv[4]) if len(sys.argv) > 4 else BATCH_SIZE
+
+    if width % 32 or height % 32:
+        print("Error: width and height must be multiples of 32.")
+        sys.exit(1)
+
+    try:
+        import ultralytics
+        print(f"Ultralytics version: {ultralytics.__version__}")
+        export(model_type, width, height, batch)
+    except ImportError:
+        print("Please install ultralytics first: pip install ultralytics")
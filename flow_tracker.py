@@ -0,0 +1,89 @@
+import cv2
+import numpy as np
+
+# Lucas-Kanade parameters
+LK_PARAMS = dict(winSize=(15, 15), maxLevel=2,
+                 criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+FEATURE_PARAMS = dict(maxCorners=40, qualityLevel=0.01, minDistance=5, blockSize=5)
+
+
+class FlowTracker:
+    """
+    Follows one box between detector runs with sparse optical flow.
+    Corners inside the box are tracked forward and backward; points that do not
+    return to where they started are dropped. The box moves by the median
+    displacement and scales by the median change in point spread.
+    """
+    def __init__(self, min_points=6, fb_threshold=1.0):
+        self.min_points = min_points
+        self.fb_threshold = fb_threshold
+        self.reset()
+
+    def reset(self):
+        self.active = False
+        self.points = None
+        self.prev_gray = None
+        self.box = None
+        self.initial_count = 0
+
+    def init(self, gray, box):
+        left, top, width, height = [int(v) for v in box]
+        h, w = gray.shape[:2]
+        x0, y0 = max(0, left), max(0, top)
+        x1, y1 = min(w, left + width), min(h, top + height)
+        if x1 - x0 < 4 or y1 - y0 < 4:
+            self.reset()
+            return False
+
+        mask = np.zeros_like(gray)
+        mask[y0:y1, x0:x1] = 255
+        points = cv2.goodFeaturesToTrack(gray, mask=mask, **FEATURE_PARAMS)
+        if points is None or len(points) < self.min_points:
+            self.reset()
+            return False
+
+        self.points = points
+        self.prev_gray = gray
+        self.box = np.array([left, top, width, height], dtype=np.float32)
+        self.initial_count = len(points)
+        self.active = True
+        return True
+
+    def update(self, gray):
+        """
+        Returns: ok, (left, top, width, height), confidence in [0, 1]
+        Confidence is the fraction of the initial points still tracked.
+        """
+        if not self.active:
+            return False, None, 0.0
+
+        new_points, status, _ = cv2.calcOpticalFlowPyrLK(self.prev_gray, gray, self.points, None, **LK_PARAMS)
+        back_points, back_status, _ = cv2.calcOpticalFlowPyrLK(gray, self.prev_gray, new_points, None, **LK_PARAMS)
+
+        fb_error = np.linalg.norm((self.points - back_points).reshape(-1, 2), axis=1)
+        good = (status.ravel() == 1) & (back_status.ravel() == 1) & (fb_error < self.fb_threshold)
+        if good.sum() < self.min_points:
+            self.reset()
+            return False, None, 0.0
+
+        old = self.points.reshape(-1, 2)[good]
+        new = new_points.reshape(-1, 2)[good]
+
+        # Translation from median displacement, scale from median pairwise spread
+        dx, dy = np.median(new - old, axis=0)
+        old_spread = np.linalg.norm(old - old.mean(axis=0), axis=1)
+        new_spread = np.linalg.norm(new - new.mean(axis=0), axis=1)
+        valid = old_spread > 1e-3
+        scale = float(np.median(new_spread[valid] / old_spread[valid])) if valid.any() else 1.0
+
+        left, top, width, height = self.box
+        cx = left + width / 2 + dx
+        cy = top + height / 2 + dy
+        width *= scale
+        height *= scale
+        self.box = np.array([cx - width / 2, cy - height / 2, width, height], dtype=np.float32)
+
+        self.points = new.reshape(-1, 1, 2)
+        self.prev_gray = gray
+        confidence = len(new) / self.initial_count
+        return True, tuple(int(round(v)) for v in self.box), confidence
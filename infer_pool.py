@@ -0,0 +1,161 @@
+import collections
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from detector import create_detector
+
+
+def _worker(model_path, threads, input_size, frame_shms, frame_shape, decode_kwargs, backend, backend_options,
+            tasks, results):
+    # Results are (seq, slot, detections, seconds, error); errors are reported
+    # instead of raised so the slot is freed and the parent sees them
+    # Each process gets its own detector and OpenCV thread pool
+    cv2.setNumThreads(threads)
+    if backend == "onnxruntime":
+        backend_options = dict(backend_options, threads=threads)
+    try:
+        detector = create_detector(backend, model_path, input_size, **backend_options)
+        preprocessor = detector.preprocessor()
+    except Exception as e:
+        results.put((None, None, None, 0.0, f"detector load failed: {e}"))
+        return
+    frames = [np.ndarray(frame_shape, dtype=np.uint8, buffer=shm.buf) for shm in frame_shms]
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        slot, seq, h, w = task
+        start = time.perf_counter()
+        try:
+            blob, scale, pad = preprocessor.prepare(frames[slot][:h, :w])
+            detections = detector.decode(detector.infer(blob), scale, pad, **decode_kwargs)
+        except Exception as e:
+            results.put((seq, slot, None, time.perf_counter() - start, str(e)))
+            continue
+        results.put((seq, slot, detections, time.perf_counter() - start, None))
+
+
+class InferencePool:
+    """
+    Runs the detector in worker processes, each with its own detector.Detector
+    instance (backend / backend_options as for create_detector) and
+    cv2.setNumThreads(threads_per_worker).
+    Frames are copied into shared-memory slots (no pickling of pixels); only
+    slot/sequence numbers and the small detection arrays cross the queues.
+    Results can complete out of order; poll() only ever returns a result newer
+    than the last one it returned, so the controller acts on the newest frame.
+    Failed frames free their slot and are counted in errors. poll() raises
+    RuntimeError once no worker process is left.
+
+    Create the pool before the parent process uses any OpenCV threading:
+    workers are forked so the main script is not re-imported in them.
+    """
+    def __init__(self, model_path, input_size, frame_size, workers=2, threads_per_worker=2,
+                 slots_per_worker=2, decode_kwargs=None, backend="opencv", backend_options=None):
+        ctx = mp.get_context("fork")
+        frame_w, frame_h = frame_size
+        self.frame_shape = (frame_h, frame_w, 3)
+        nbytes = int(np.prod(self.frame_shape))
+
+        num_slots = workers * slots_per_worker
+        self.shms = [shared_memory.SharedMemory(create=True, size=nbytes) for _ in range(num_slots)]
+        self.frames = [np.ndarray(self.frame_shape, dtype=np.uint8, buffer=shm.buf) for shm in self.shms]
+        self.free_slots = list(range(num_slots))
+
+        self.tasks = ctx.Queue()
+        self.results = ctx.Queue()
+        self.workers = []
+        for _ in range(workers):
+            p = ctx.Process(target=_worker, args=(model_path, threads_per_worker, input_size, self.shms,
+                                                  self.frame_shape, decode_kwargs or {}, backend, backend_options or {},
+                                                  self.tasks, self.results))
+            p.daemon = True
+            p.start()
+            self.workers.append(p)
+
+        self.in_flight = {}   # seq -> (img, submit time)
+        self.last_seq = 0
+        self.submitted = 0
+        self.skipped = 0      # frames not submitted because every slot was busy
+        self.stale = 0        # results that completed after a newer frame
+        self.completed = 0
+        self.errors = 0       # frames (or worker startups) that failed in a worker
+        self.exited = set()   # workers found dead
+        self.latencies = collections.deque(maxlen=1000)  # submit -> result, seconds
+
+    def submit(self, seq, img):
+        """
+        Queues img for inference. Returns False (frame skipped) when all
+        shared-memory slots are in use.
+        """
+        if not self.free_slots:
+            self.skipped += 1
+            return False
+        slot = self.free_slots.pop()
+        h, w = img.shape[:2]
+        self.frames[slot][:h, :w] = img
+        self.in_flight[seq] = (img, time.perf_counter())
+        self.tasks.put((slot, seq, h, w))
+        self.submitted += 1
+        return True
+
+    def poll(self, timeout=0.0):
+        """
+        Collects finished results.
+        Returns: (seq, img, detections, latency) of the newest completed frame,
+        or None if nothing newer than the last returned frame has finished.
+        """
+        newest = None
+        block = timeout > 0
+        while True:
+            try:
+                seq, slot, detections, _, error = self.results.get(block, timeout)
+            except queue.Empty:
+                break
+            block = False
+            if error is not None:
+                self.errors += 1
+                print(f"❌ Inference worker error: {error}")
+                if seq is None:
+                    continue  # startup failure, the worker has exited
+            self.free_slots.append(slot)
+            img, submitted_at = self.in_flight.pop(seq)
+            if detections is None:
+                continue
+            latency = time.perf_counter() - submitted_at
+            self.completed += 1
+            self.latencies.append(latency)
+            if seq > self.last_seq:
+                self.last_seq = seq
+                newest = (seq, img, detections, latency)
+            else:
+                self.stale += 1
+        self._check_workers()
+        return newest
+
+    def _check_workers(self):
+        # A crashed worker (segfault, OOM kill) takes the task it was running,
+        # and that slot, with it; the others carry on with the remaining slots
+        for i, p in enumerate(self.workers):
+            if i not in self.exited and not p.is_alive():
+                self.exited.add(i)
+                print(f"❌ Inference worker {i} exited (code {p.exitcode})")
+        if len(self.exited) == len(self.workers):
+            raise RuntimeError("All inference workers have exited")
+
+    def close(self):
+        for _ in self.workers:
+            self.tasks.put(None)
+        for p in self.workers:
+            p.join(timeout=2.0)
+            if p.is_alive():
+                p.terminate()
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
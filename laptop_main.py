@@ -1,12 +1,21 @@
 import cv2
 import socket
-import struct
-import pickle
 import numpy as np
 import threading
 import time
 import os
 import urllib.request
+import atexit
+from postprocess import build_class_filter
+from sort_tracker import SortTracker, TargetLock
+from detector import create_detector
+from autotune import load_tuned
+from viewer import Display
+from metrics import counter, histogram, stage_timer, serve as serve_metrics
+from tracing import Tracer, ClockSync
+from motion_gate import MotionGate
+from video_protocol import (FrameReceiver, decode_frame, send_credit, FRAME_HEADER,
+                            CREDIT_INITIAL, CREDIT_DONE, CREDIT_STALE)
 
 # ================= USER CONFIGURATION =================
 # 🔴 REPLACE THIS WITH THE IP ADDRESS OF YOUR RASPBERRY PI 🔴
@@ -15,11 +24,60 @@ RPI_IP = "192.168.1.100"
 
 VIDEO_PORT = 5555
 CMD_PORT = 5556
+# Flow control (see rpi_main.py FLOW_CONTROL): the Pi only sends a frame for
+# each credit granted here. A credit goes back once the detection loop has
+# decided on a frame (or a frame is replaced before it was processed), so at
+# most STREAM_CREDITS frames are in flight and the loop waits for new frames
+# instead of re-running on the last one.
+# 1 = every frame is captured after the previous decision (freshest frames);
+# 2 = the next frame is transferred during inference (more FPS on a slow link,
+# frames up to one inference older)
+FLOW_CONTROL = True
+STREAM_CREDITS = 1
+# Watch only: detect and display the stream but never connect to the command
+# server, e.g. a second laptop next to the one driving (no TRACE clock sync)
+WATCH_ONLY = False
+# Video frames use video_protocol.py (frame ID, capture time on the Pi clock).
+# Commands are sent as "<COMMAND> <frame ID> <capture time>\n". Must match rpi_main.py.
 
 # --- YOLO CONFIGURATION ---
 MODEL_TYPE = 'n' 
 MODEL_FILE = "yolov8n.onnx"
+# 'fp32' = float model on OpenCV DNN
+# 'int8' = statically quantized model on onnxruntime (build it with quantize_model.py)
+MODEL_PRECISION = 'fp32'
+INT8_MODEL_FILE = MODEL_FILE.replace(".onnx", "_int8.onnx")
+# 'opencv' | 'opencv-cuda' | 'onnxruntime' (see detector.py; int8 always uses onnxruntime)
+DETECTOR_BACKEND = 'opencv'
 INPUT_SIZE = 640
+# fp32: use the model/input size/backend/threads autotune.py measured on this laptop
+USE_AUTOTUNE = True
+
+# 'window' = draw + imshow every frame, 'viewer' = separate viewer thread at
+# VIEWER_FPS, 'headless' = no drawing or GUI calls (stop with Ctrl+C)
+DISPLAY_MODE = 'window'
+VIEWER_FPS = 5
+
+# Motion gate (see motion_gate.py): reuse the last detections while the
+# scene is static (e.g. the Pi is running AUTO, or no new frame arrived);
+# re-run inference when more than MOTION_THRESHOLD of the pixels changed by
+# over MOTION_PIXEL_DELTA grey levels or after MOTION_MAX_AGE seconds
+MOTION_GATE = True
+MOTION_THRESHOLD = 0.01
+MOTION_PIXEL_DELTA = 15
+MOTION_MAX_AGE = 1.0
+STATS_INTERVAL = 5.0  # seconds between motion gate reports
+
+# Prometheus metrics (see metrics.py) at http://127.0.0.1:METRICS_PORT/metrics (0 = off)
+METRICS_PORT = 9109
+
+# Per-frame spans (recv, decode, detect, select, control, send_command) written
+# to TRACE_FILE on exit in Pi clock time (offset estimated by pinging the
+# command server every CLOCK_SYNC_INTERVAL s). Merge with the Pi's file:
+# python tracing.py trace.json trace_pi.json trace_laptop.json
+TRACE = False
+TRACE_FILE = "trace_laptop.json"
+CLOCK_SYNC_INTERVAL = 1.0
 CONF_THRESHOLD = 0.4
 NMS_THRESHOLD = 0.45
 
@@ -41,6 +99,21 @@ garbage_map = {
     "donut": "Organic", "cake": "Organic",
 }
 
+# Garbage-only decoding with per-category thresholds (others use CONF_THRESHOLD)
+GARBAGE_ONLY_DECODE = True
+CATEGORY_THRESHOLDS = {"Plastic Bottle": 0.30, "Metal Can": 0.40, "Organic": 0.45}
+GARBAGE_CLASS_IDS, GARBAGE_THRESHOLDS = build_class_filter(classNames, garbage_map, CATEGORY_THRESHOLDS, CONF_THRESHOLD)
+
+# Target lock: stay on one SORT track ID until it is collected or lost
+TARGET_LOCK = True
+TRACK_MAX_AGE = 5
+
+# Alignment control
+TRIGGER_COOLDOWN = 8 # Seconds (Give auto time to finish)
+CENTER_TOLERANCE = 50
+TARGET_MIN = 14
+TARGET_MAX = 20
+
 KNOWN_WIDTH = 7.0  # cm
 FOCAL_LENGTH = 500 # Needs calibration
 
@@ -48,13 +121,54 @@ def calculate_distance(pixel_width):
     if pixel_width == 0: return 0
     return (KNOWN_WIDTH * FOCAL_LENGTH) / pixel_width
 
+# Detector stages (preprocess/forward/decode/nms) are recorded by detector.py
+JPEG_DECODE_SECONDS = stage_timer("jpeg_decode")
+SELECT_SECONDS = stage_timer("select")
+CONTROL_SECONDS = stage_timer("control")
+RECV_SECONDS = histogram("wastexpert_socket_seconds", "Socket send/recv duration in seconds.", op="video_recv")
+SEND_SECONDS = histogram("wastexpert_socket_seconds", "Socket send/recv duration in seconds.", op="command_send")
+RECV_BYTES = counter("wastexpert_socket_bytes_total", "Bytes sent/received.", op="video_recv")
+FRAMES = counter("wastexpert_frames_total", "Frames processed by the detection loop.")
+FRAME_AGE_SECONDS = histogram("wastexpert_frame_age_seconds",
+                              "Pi capture to laptop command send, in seconds (Pi clock).")
+
 # Global Frame
 current_frame = None
+current_frame_info = (0, 0.0)  # (frame ID, capture time on the Pi)
+current_frame_received = 0.0   # time.time() the frame was received, for the processing time
 lock = threading.Lock()
 frame_ready = False
+frame_taken = True  # current_frame was picked up by the detection loop (or replaced)
+
+# Video socket, for returning flow control credits
+video_socket = None
+credit_lock = threading.Lock()  # credits are sent from the receiver and the main loop
 
 # Command Sender
 cmd_socket = None
+cmd_lock = threading.Lock()  # send_command and clock pings share the socket
+decision_frame = (0, 0.0)    # frame the current commands are decided on
+
+tracer = None
+clock = ClockSync()
+
+def sync_clock(s):
+    """
+    One PING/PONG exchange with the command server for the clock offset.
+    """
+    t0 = time.time()
+    with cmd_lock:
+        s.sendall(f"PING {t0:.6f}\n".encode('utf-8'))
+    reply = b""
+    while not reply.endswith(b"\n"):
+        packet = s.recv(256)
+        if not packet:
+            raise ConnectionError("Command server closed the connection")
+        reply += packet
+    t2 = time.time()
+    fields = reply.decode('utf-8').split()
+    if len(fields) == 3 and fields[0] == "PONG":
+        clock.add(float(fields[1]), float(fields[2]), t2)
 
 def maintain_command_connection():
     global cmd_socket
@@ -66,7 +180,11 @@ def maintain_command_connection():
                 s.connect((RPI_IP, CMD_PORT))
                 cmd_socket = s
                 print("✅ Connected to Command Server")
-            time.sleep(1)
+            if TRACE:
+                sync_clock(cmd_socket)
+                time.sleep(CLOCK_SYNC_INTERVAL)
+            else:
+                time.sleep(1)
         except Exception as e:
             print(f"Command Connection Failed (Retrying): {e}")
             cmd_socket = None
@@ -76,13 +194,34 @@ def send_command(cmd):
     global cmd_socket
     if cmd_socket:
         try:
-            cmd_socket.sendall(cmd.encode('utf-8'))
+            frame_id, t_capture = decision_frame
+            start = time.time()
+            with cmd_lock:
+                cmd_socket.sendall(f"{cmd} {frame_id} {t_capture:.6f}\n".encode('utf-8'))
+            end = time.time()
+            SEND_SECONDS.observe(end - start)
+            counter("wastexpert_commands_total", "Drive/automation commands sent.", command=cmd).inc()
+            if t_capture:
+                FRAME_AGE_SECONDS.observe(end + clock.offset - t_capture)
+            if tracer is not None:
+                tracer.add(f"send_command {cmd}", start, end, frame_id)
         except Exception as e:
             print(f"Send Error: {e}")
             cmd_socket = None # Force reconnect
 
+def return_credit(kind, frame_id, processing=0.0):
+    # processing: receive to decision in seconds, for the Pi's stream quality control
+    s = video_socket
+    if not FLOW_CONTROL or s is None:
+        return
+    try:
+        with credit_lock:
+            send_credit(s, kind, frame_id, processing=processing)
+    except OSError as e:
+        print(f"Credit Send Error: {e}")  # The receiver reconnects
+
 def video_receiver():
-    global current_frame, frame_ready
+    global current_frame, current_frame_info, current_frame_received, frame_ready, frame_taken, video_socket
     
     while True:
         try:
@@ -91,161 +230,113 @@ def video_receiver():
             client_socket.connect((RPI_IP, VIDEO_PORT))
             print("✅ Connected to Video Stream")
             
-            data = b""
-            payload_size = struct.calcsize("Q")
+            receiver = FrameReceiver(client_socket)
+            if FLOW_CONTROL:
+                with lock:
+                    frame_taken = True  # no credit is owed for a frame of the last connection
+                with credit_lock:
+                    send_credit(client_socket, CREDIT_INITIAL, credits=STREAM_CREDITS)
+                video_socket = client_socket
             
             while True:
-                while len(data) < payload_size:
-                    packet = client_socket.recv(4*1024)
-                    if not packet: break
-                    data += packet
-                
-                if len(data) < payload_size:
-                    break # Connection lost
+                # Measured per message: includes waiting for the Pi to send it
+                start = time.perf_counter()
+                header, payload = receiver.receive()
+                frame_id, t_capture = header.seq, header.t_capture
+                RECV_SECONDS.observe(time.perf_counter() - start)
+                RECV_BYTES.inc(FRAME_HEADER.size + header.length)
+                t_received = time.time()
                 
-                packed_msg_size = data[:payload_size]
-                data = data[payload_size:]
-                msg_size = struct.unpack("Q", packed_msg_size)[0]
-                
-                # Safety limit for buffer
-                if msg_size > 10_000_000:
-                    print("Image too large, skipping")
+                # Decode straight from the receive buffer
+                frame = decode_frame(header, payload)
+                t_decoded = time.time()
+                JPEG_DECODE_SECONDS.observe(t_decoded - t_received)
+                if tracer is not None:
+                    tracer.add("recv", receiver.t_header, t_received, frame_id, bytes=FRAME_HEADER.size + header.length)
+                    tracer.add("jpeg_decode", t_received, t_decoded, frame_id)
+                if frame is None:
+                    return_credit(CREDIT_STALE, frame_id)
                     continue
-
-                while len(data) < msg_size:
-                    packet = client_socket.recv(4*1024)
-                    if not packet: break
-                    data += packet
-                
-                if len(data) < msg_size:
-                    break
-
-                frame_data = data[:msg_size]
-                data = data[msg_size:]
-                
-                # Decode
-                frame_buffer = pickle.loads(frame_data)
-                frame = cv2.imdecode(frame_buffer, cv2.IMREAD_COLOR)
                 
                 with lock:
+                    # The previous frame was never processed: its credit comes back now
+                    replaced = None if frame_taken else current_frame_info[0]
                     current_frame = frame
+                    current_frame_info = (frame_id, t_capture)
+                    current_frame_received = t_received
                     frame_ready = True
+                    frame_taken = False
+                if replaced is not None:
+                    return_credit(CREDIT_STALE, replaced)
                     
         except Exception as e:
             print(f"Video Stream Error: {e}")
             time.sleep(2)
         finally:
+            video_socket = None
             client_socket.close()
 
-def preprocess_image(img, input_size):
-    h, w = img.shape[:2]
-    scale = min(input_size[0] / h, input_size[1] / w)
-    nh, nw = int(h * scale), int(w * scale)
-    resized_img = cv2.resize(img, (nw, nh))
-    padded_img = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
-    pad_top = (input_size[1] - nh) // 2
-    pad_left = (input_size[0] - nw) // 2
-    padded_img[pad_top:pad_top+nh, pad_left:pad_left+nw] = resized_img
-    return padded_img, scale, (pad_top, pad_left)
+def decode_settings():
+    settings = {"conf_threshold": CONF_THRESHOLD, "nms_threshold": NMS_THRESHOLD}
+    if GARBAGE_ONLY_DECODE:
+        settings.update(class_ids=GARBAGE_CLASS_IDS, class_thresholds=GARBAGE_THRESHOLDS)
+    return settings
 
-def main():
-    print(f"Starting Laptop Main Control - Target RPi: {RPI_IP}")
+def select_target(detections, sort_tracker, target_lock):
+    """
+    Keeps garbage classes, estimates distances and picks the target.
+    Returns: (overlay boxes (x, y, w, h, label), target box (x, y, w, h, dist) or None)
+    """
+    if TARGET_LOCK:
+        # Garbage-only tracks with stable IDs
+        detections = sort_tracker.update(detections[np.isin(detections["class_id"], GARBAGE_CLASS_IDS)])
     
-    # Init DNN
-    if not os.path.exists(MODEL_FILE):
-        print(f"Downloading {MODEL_FILE}...")
-        urllib.request.urlretrieve("https://github.com/yoobright/yolo-onnx/raw/main/yolov8n.onnx", MODEL_FILE)
-        
-    net = cv2.dnn.readNetFromONNX(MODEL_FILE)
-    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-
-    # Start Threads
-    t_vid = threading.Thread(target=video_receiver)
-    t_vid.daemon = True
-    t_vid.start()
-    
-    t_cmd = threading.Thread(target=maintain_command_connection)
-    t_cmd.daemon = True
-    t_cmd.start()
-    
-    last_trigger_time = 0
-    TRIGGER_COOLDOWN = 8 # Seconds (Give auto time to finish)
+    target_box = None
+    closest_dist = float('inf')
+    candidates = []
+    overlay_boxes = []
     
-    CENTER_TOLERANCE = 50
-    TARGET_MIN = 14
-    TARGET_MAX = 20
-    
-    while True:
-        with lock:
-            if not frame_ready or current_frame is None:
-                time.sleep(0.01)
-                continue
-            img = current_frame.copy()
-        
-        # YOLO Processing
-        INPUT_WIDTH = INPUT_SIZE
-        INPUT_HEIGHT = INPUT_SIZE
-        padded_img, scale, (pad_top, pad_left) = preprocess_image(img, (INPUT_WIDTH, INPUT_HEIGHT))
-        
-        blob = cv2.dnn.blobFromImage(padded_img, 1/255.0, (INPUT_WIDTH, INPUT_HEIGHT), swapRB=True, crop=False)
-        net.setInput(blob)
-        outputs = net.forward()
-        outputs = np.transpose(outputs, (0, 2, 1))
-        
-        rows = outputs[0]
-        boxes = []
-        confidences = []
-        class_ids = []
-        
-        for row in rows:
-            classes_scores = row[4:]
-            max_score_idx = np.argmax(classes_scores)
-            max_score = classes_scores[max_score_idx]
-            if max_score >= CONF_THRESHOLD:
-                cx, cy, w, h = row[0], row[1], row[2], row[3]
-                cx = (cx - pad_left) / scale
-                cy = (cy - pad_top) / scale
-                w /= scale
-                h /= scale
-                left = int(cx - 0.5 * w)
-                top = int(cy - 0.5 * h)
-                boxes.append([left, top, int(w), int(h)])
-                confidences.append(float(max_score))
-                class_ids.append(max_score_idx)
-
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, CONF_THRESHOLD, NMS_THRESHOLD)
-        
-        target_box = None
-        closest_dist = float('inf')
-        
-        if len(indices) > 0:
-            for i in indices:
-                idx = i if isinstance(i, (int, np.integer)) else i[0]
-                box = boxes[idx]
-                cls_id = class_ids[idx]
-                
-                if cls_id < len(classNames):
-                    cls_name = classNames[cls_id]
-                    if cls_name in garbage_map:
-                        x, y, w, h = box
-                        dist = calculate_distance(min(w, h))
-                        
-                        color = (0, 255, 0)
-                        cv2.rectangle(img, (x, y), (x+w, y+h), color, 2)
-                        cv2.putText(img, f"{garbage_map[cls_name]} {int(dist)}cm", (x, y-10), 
-                                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                        
-                        if dist < closest_dist:
-                            closest_dist = dist
-                            target_box = (x, y, w, h, dist)
-
-        # Logic
+    if len(detections) > 0:
+        for det in detections:
+            box = (int(det["left"]), int(det["top"]), int(det["width"]), int(det["height"]))
+            cls_id = int(det["class_id"])
+            
+            if cls_id < len(classNames):
+                cls_name = classNames[cls_id]
+                if cls_name in garbage_map:
+                    x, y, w, h = box
+                    dist = calculate_distance(min(w, h))
+                    candidates.append((x, y, w, h, dist))
+                    overlay_boxes.append((x, y, w, h, f"{garbage_map[cls_name]} {int(dist)}cm"))
+                    
+                    if dist < closest_dist:
+                        closest_dist = dist
+                        target_box = (x, y, w, h, dist)
+
+    if TARGET_LOCK:
+        # Stay on the locked track; pick the closest one only when it is lost
+        idx = target_lock.select(detections, [c[4] for c in candidates])
+        target_box = candidates[idx] if idx is not None else None
+    return overlay_boxes, target_box
+
+class AlignmentController:
+    """
+    Turns the target box into drive commands for the RPi and triggers the
+    pickup automation (AUTO) once the target is centred and in range.
+    """
+    def __init__(self, on_collected=None):
+        self.last_trigger_time = 0
+        self.on_collected = on_collected
+
+    def step(self, target_box, frame_width):
+        """
+        Returns: status text
+        """
         status = "Idle"
         if target_box:
             x, y, w, h, dist = target_box
             cx = x + w // 2
-            img_center = img.shape[1] // 2
+            img_center = frame_width // 2
             offset = cx - img_center
             
             if abs(offset) > CENTER_TOLERANCE:
@@ -264,23 +355,145 @@ def main():
                     send_command("BACKWARD")
                 else:
                     status = "Aligned"
-                    if time.time() - last_trigger_time > TRIGGER_COOLDOWN:
+                    if time.time() - self.last_trigger_time > TRIGGER_COOLDOWN:
                         status = "Starting Auto"
                         send_command("STOP")
                         time.sleep(0.5)
                         send_command("AUTO")
-                        last_trigger_time = time.time()
+                        self.last_trigger_time = time.time()
+                        # Collected: move on to the next track
+                        if self.on_collected:
+                            self.on_collected()
                     else:
                          send_command("STOP")
         else:
             send_command("STOP")
+        return status
+
+def render_overlay(img, overlay):
+    boxes, status = overlay
+    color = (0, 255, 0)
+    for x, y, w, h, label in boxes:
+        cv2.rectangle(img, (x, y), (x+w, y+h), color, 2)
+        cv2.putText(img, label, (x, y-10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    cv2.putText(img, f"CMD: {status}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+
+def load_detector():
+    """
+    Returns: the detector for the configured model/backend, or None when the
+    INT8 model has not been built
+    """
+    # Init DNN
+    if not os.path.exists(MODEL_FILE):
+        print(f"Downloading {MODEL_FILE}...")
+        urllib.request.urlretrieve("https://github.com/yoobright/yolo-onnx/raw/main/yolov8n.onnx", MODEL_FILE)
+        
+    if MODEL_PRECISION == 'int8':
+        if not os.path.exists(INT8_MODEL_FILE):
+            print(f"{INT8_MODEL_FILE} not found. Build it with: python quantize_model.py {MODEL_FILE}")
+            return None
+        detector = create_detector('onnxruntime', INT8_MODEL_FILE, (INPUT_SIZE, INPUT_SIZE))
+    else:
+        tuned = load_tuned() if USE_AUTOTUNE else None
+        if tuned:
+            print(f"Using autotuned {tuned['model_file']} x{tuned['threads']} threads ({tuned['latency_ms']} ms measured)")
+            cv2.setNumThreads(tuned["threads"])
+            options = {"threads": tuned["threads"]} if tuned["backend"] == "onnxruntime" else {}
+            detector = create_detector(tuned["backend"], tuned["model_file"], tuned["input_size"], **options)
+        else:
+            detector = create_detector(DETECTOR_BACKEND, MODEL_FILE, (INPUT_SIZE, INPUT_SIZE))
+    print(f"Using {detector.name} on {detector.device.upper()} for inference")
+    return detector
+
+def main():
+    global tracer, decision_frame, frame_taken
+    print(f"Starting Laptop Main Control - Target RPi: {RPI_IP}")
+    
+    detector = load_detector()
+    if detector is None:
+        return
+
+    if METRICS_PORT:
+        try:
+            serve_metrics(METRICS_PORT)
+        except OSError as e:
+            print(f"Metrics endpoint failed: {e}")
+
+    if TRACE:
+        tracer = Tracer("laptop_main")
+        # Exported in Pi clock time so both files share one timeline
+        atexit.register(lambda: tracer.export(TRACE_FILE, clock.offset))
+
+    # Start Threads
+    t_vid = threading.Thread(target=video_receiver)
+    t_vid.daemon = True
+    t_vid.start()
+    
+    if WATCH_ONLY:
+        print("Watch only: no commands are sent")
+    else:
+        t_cmd = threading.Thread(target=maintain_command_connection)
+        t_cmd.daemon = True
+        t_cmd.start()
+    
+    sort_tracker = SortTracker(max_age=TRACK_MAX_AGE)
+    target_lock = TargetLock(max_missed=TRACK_MAX_AGE)
+
+    controller = AlignmentController(on_collected=target_lock.release)
+
+    display = Display(DISPLAY_MODE, "Laptop Control", render_overlay, VIEWER_FPS)
+
+    gate = MotionGate(MOTION_THRESHOLD, MOTION_PIXEL_DELTA, MOTION_MAX_AGE) if MOTION_GATE else None
+    last_report = time.time()
+    
+    while True:
+        with lock:
+            if not frame_ready or current_frame is None:
+                time.sleep(0.01)
+                continue
+            img = current_frame.copy()
+            decision_frame = current_frame_info
+            t_received = current_frame_received
+            new_frame, frame_taken = not frame_taken, True
+        frame_id = decision_frame[0]
+        if FLOW_CONTROL and not new_frame:
+            time.sleep(0.002)
+            continue
+        
+        # YOLO Processing
+        t_start = time.time()
+        detections = None
+        if gate is not None:
+            detections, signature = gate.check(img)
+        if detections is None:
+            detections = detector.detect(img, **decode_settings())
+            if gate is not None:
+                gate.update(signature, detections)
+        t_detected = time.time()
+        overlay_boxes, target_box = select_target(detections, sort_tracker, target_lock)
+        t_selected = time.time()
+        SELECT_SECONDS.observe(t_selected - t_detected)
+
+        # Logic (send_command tags its commands with decision_frame)
+        status = controller.step(target_box, img.shape[1])
+        t_decided = time.time()
+        CONTROL_SECONDS.observe(t_decided - t_selected)
+        FRAMES.inc()
+        if new_frame:
+            # Decided: the Pi may send its newest frame
+            return_credit(CREDIT_DONE, frame_id, t_decided - t_received)
+        if tracer is not None:
+            tracer.add("detect", t_start, t_detected, frame_id)
+            tracer.add("select", t_detected, t_selected, frame_id)
+            tracer.add("control", t_selected, t_decided, frame_id)
+        if gate is not None and t_decided - last_report >= STATS_INTERVAL:
+            print(f"📊 {gate.summary()}")
+            last_report = t_decided
             
-        cv2.putText(img, f"CMD: {status}", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
-        cv2.imshow("Laptop Control", img)
-        if cv2.waitKey(1) == ord('q'):
+        if not display.show(img, (overlay_boxes, status)):
             break
 
-    cv2.destroyAllWindows()
+    display.close()
 
 if __name__ == "__main__":
     main()
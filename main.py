@@ -1,10 +1,10 @@
 import cv2
-import cvzone
 import math
-import numpy as np
 import os
 import urllib.request
 import sys
+from detector import create_detector
+from viewer import Display
 
 # Constants
 MODEL_FILE = "yolov8s.onnx"
@@ -13,6 +13,12 @@ CONF_THRESHOLD = 0.25
 NMS_THRESHOLD = 0.45
 INPUT_WIDTH = 640
 INPUT_HEIGHT = 640
+# 'opencv-cuda' tries CUDA and falls back to the CPU; 'opencv' | 'onnxruntime' (see detector.py)
+DETECTOR_BACKEND = 'opencv-cuda'
+# 'window' = draw + imshow every frame, 'viewer' = separate viewer thread at
+# VIEWER_FPS, 'headless' = no drawing or GUI calls (stop with Ctrl+C)
+DISPLAY_MODE = 'window'
+VIEWER_FPS = 5
 
 # Object classes for COCO dataset
 classNames = ["person", "bicycle", "car", "motorbike", "aeroplane", "bus", "train", "truck", "boat",
@@ -54,6 +60,22 @@ def calculate_distance(focal_length, known_width, pixel_width):
         return 0
     return (known_width * focal_length) / pixel_width
 
+def render_overlay(img, targets):
+    import cvzone  # Only needed when rendering is enabled
+
+    for displayName, left, top, width, height, distance in targets:
+        # Color Logic
+        if distance < 20: 
+            color = (0, 255, 0) # Green
+        else:
+            color = (0, 0, 255) # Red
+
+        # Draw Visuals
+        cvzone.cornerRect(img, (left, top, width, height), l=9, rt=5, colorR=color, colorC=color)
+        
+        text = f'{displayName} {int(distance)}cm'
+        cvzone.putTextRect(img, text, (max(0, left), max(35, top)), scale=1.5, thickness=2, offset=5, colorR=color)
+
 def download_model(url, path):
     print(f"Downloading {path} from {url}...")
     try:
@@ -73,17 +95,9 @@ def main():
              input("Press Enter to exit...")
              return
 
-    # Initialize OpenCV DNN Network
-    net = cv2.dnn.readNetFromONNX(MODEL_FILE)
-    
-    # Try to use CUDA if available, else CPU
-    try:
-        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
-        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CUDA)
-    except:
-        print("CUDA not available, running on CPU.")
-        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-        net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+    # Initialize the detector
+    detector = create_detector(DETECTOR_BACKEND, MODEL_FILE, (INPUT_WIDTH, INPUT_HEIGHT))
+    print(f"Using {detector.name} on {detector.device.upper()} for inference")
 
     # Initialize Webcam
     cap = cv2.VideoCapture(0)
@@ -94,62 +108,21 @@ def main():
         print("Error: Could not open webcam.")
         return
 
+    display = Display(DISPLAY_MODE, "Garbage Detection", render_overlay, VIEWER_FPS)
+
     while True:
         success, img = cap.read()
         if not success:
             break
 
-        # Preprocess Image
-        blob = cv2.dnn.blobFromImage(img, 1/255.0, (INPUT_WIDTH, INPUT_HEIGHT), swapRB=True, crop=False)
-        net.setInput(blob)
-        
-        # Forward Pass
-        outputs = net.forward()
-        
-        # Output shape is (1, 84, 8400) -> Transpose to (1, 8400, 84)
-        outputs = np.transpose(outputs, (0, 2, 1)) 
-        
-        # Extract rows
-        rows = outputs[0]
-        
-        boxes = []
-        confidences = []
-        class_ids = []
-
-        image_h, image_w, _ = img.shape
-        x_factor = image_w / INPUT_WIDTH
-        y_factor = image_h / INPUT_HEIGHT
-
-        for row in rows:
-            classes_scores = row[4:]
-            max_score_idx = np.argmax(classes_scores)
-            max_score = classes_scores[max_score_idx]
-            
-            if max_score >= CONF_THRESHOLD:
-                # Get box coordinates (cx, cy, w, h)
-                cx, cy, w, h = row[0], row[1], row[2], row[3]
-                
-                # Scale back to original image
-                left = int((cx - 0.5 * w) * x_factor)
-                top = int((cy - 0.5 * h) * y_factor)
-                width = int(w * x_factor)
-                height = int(h * y_factor)
-                
-                boxes.append([left, top, width, height])
-                confidences.append(float(max_score))
-                class_ids.append(max_score_idx)
+        # Letterbox, forward pass and decode, boxes in original image coordinates
+        detections = detector.detect(img, conf_threshold=CONF_THRESHOLD, nms_threshold=NMS_THRESHOLD)
+        targets = []
 
-        # NMS
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, CONF_THRESHOLD, NMS_THRESHOLD)
-
-        for i in indices:
-            # Depending on opencv version, i might be a list or int
-            idx = i if isinstance(i, (int, np.integer)) else i[0]
-            
-            box = boxes[idx]
-            left, top, width, height = box[0], box[1], box[2], box[3]
-            conf = confidences[idx]
-            cls_id = class_ids[idx]
+        for det in detections:
+            left, top, width, height = int(det["left"]), int(det["top"]), int(det["width"]), int(det["height"])
+            conf = float(det["conf"])
+            cls_id = int(det["class_id"])
             
             if cls_id < len(classNames):
                 currentClass = classNames[cls_id]
@@ -160,25 +133,13 @@ def main():
                     
                     # Distance Calculation
                     distance = calculate_distance(FOCAL_LENGTH, KNOWN_WIDTH, min(width, height))
-                    
-                    # Color Logic
-                    if distance < 20: 
-                        color = (0, 255, 0) # Green
-                    else:
-                        color = (0, 0, 255) # Red
-
-                    # Draw Visuals
-                    cvzone.cornerRect(img, (left, top, width, height), l=9, rt=5, colorR=color, colorC=color)
-                    
-                    text = f'{displayName} {int(distance)}cm'
-                    cvzone.putTextRect(img, text, (max(0, left), max(35, top)), scale=1.5, thickness=2, offset=5, colorR=color)
+                    targets.append((displayName, left, top, width, height, distance))
 
-        cv2.imshow("Garbage Detection", img)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
+        if not display.show(img, targets):
             break
 
     cap.release()
-    cv2.destroyAllWindows()
+    display.close()
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,4 @@
 import cv2
-import cvzone
 import math
 import numpy as np
 import os
@@ -7,8 +6,22 @@ import urllib.request
 import sys
 import time
 import threading
+import atexit
 import automation_pre_test
 import base_motors
+from postprocess import build_class_filter, split_cameras
+from preprocess import rect_input_size, roi_window
+from flow_tracker import FlowTracker
+from sort_tracker import SortTracker, TargetLock
+from pipeline import LatestQueue, Stage, StageStats, BufferPool
+from infer_pool import InferencePool
+from detector import create_detector
+from autotune import load_tuned
+from startup import StartupTimeline, find_camera, find_cameras
+from viewer import Display
+from motion_gate import MotionGate
+from recorder import Recorder, session_dir
+from metrics import counter, gauge, stage_timer, serve as serve_metrics
 
 # --- CONFIGURATION ---
 # 'n' = Nano (Faster, Standard Accuracy)
@@ -17,6 +30,27 @@ import base_motors
 # 'n' = Nano (Faster, Standard Accuracy)
 # 's' = Small (Slower, Higher Accuracy)
 MODEL_TYPE = 'n' 
+# 'square' = letterbox into INPUT_SIZE x INPUT_SIZE (stock ONNX model)
+# 'rect'   = stride-32 shape matching the camera aspect ratio with INPUT_SIZE as
+#            the long side, e.g. 640 -> 640x480, 416 -> 416x320
+#            (needs a matching model, see export_onnx.py)
+INFERENCE_SHAPE = 'square'
+# 'fp32' = float model on OpenCV DNN
+# 'int8' = statically quantized model on onnxruntime (build it with quantize_model.py)
+MODEL_PRECISION = 'fp32'
+# Inference backend (see detector.py):
+# 'opencv'      = OpenCV DNN on the CPU
+# 'onnxruntime' = onnxruntime CPU with ORT_THREADS threads (0 = one per core)
+# 'darknet'     = YOLOv4-tiny from DARKNET_CONFIG/DARKNET_WEIGHTS at 416x416 (no ROI mode)
+# MODEL_PRECISION 'int8' always runs on onnxruntime.
+DETECTOR_BACKEND = 'opencv'
+ORT_THREADS = 0
+DARKNET_CONFIG = "yolo/yolov4-tiny.cfg"
+DARKNET_WEIGHTS = "yolo/yolov4-tiny.weights"
+OPENCV_THREADS = 0  # cv2.setNumThreads for the in-process detector (0 = OpenCV default)
+# Use the model, square input size, backend and thread count measured by
+# autotune.py on this machine instead of the values above (fp32 'square' only)
+USE_AUTOTUNE = True
 # ---------------------
 
 if MODEL_TYPE == 'n':
@@ -36,8 +70,39 @@ else:
     INPUT_SIZE = 640
 
 
-INPUT_WIDTH = INPUT_SIZE
-INPUT_HEIGHT = INPUT_SIZE
+# Camera capture resolution (ThreadedCamera)
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+
+if INFERENCE_SHAPE == 'rect':
+    # No padding rows: 640x480 camera -> 640x480 input (6300 anchors instead of 8400)
+    INPUT_WIDTH, INPUT_HEIGHT = rect_input_size((CAMERA_WIDTH, CAMERA_HEIGHT), INPUT_SIZE)
+    MODEL_FILE = f"yolov8{MODEL_TYPE}_{INPUT_WIDTH}x{INPUT_HEIGHT}.onnx"
+    MODEL_URL = None
+else:
+    INPUT_WIDTH = INPUT_SIZE
+    INPUT_HEIGHT = INPUT_SIZE
+
+FP32_MODEL_FILE = MODEL_FILE
+if MODEL_PRECISION == 'int8':
+    MODEL_FILE = FP32_MODEL_FILE.replace(".onnx", "_int8.onnx")
+    MODEL_URL = None
+    DETECTOR_BACKEND = 'onnxruntime'
+elif DETECTOR_BACKEND == 'darknet':
+    MODEL_FILE = DARKNET_WEIGHTS
+    MODEL_URL = None
+    INPUT_WIDTH = INPUT_HEIGHT = 416
+
+TUNED = None
+if USE_AUTOTUNE and MODEL_PRECISION == 'fp32' and INFERENCE_SHAPE == 'square' and DETECTOR_BACKEND != 'darknet':
+    TUNED = load_tuned()
+if TUNED:
+    MODEL_TYPE = TUNED["model_type"]
+    MODEL_FILE = FP32_MODEL_FILE = TUNED["model_file"]
+    MODEL_URL = None
+    INPUT_WIDTH, INPUT_HEIGHT = TUNED["input_size"]
+    DETECTOR_BACKEND = TUNED["backend"]
+    OPENCV_THREADS = ORT_THREADS = TUNED["threads"]
 CONF_THRESHOLD = 0.20
 NMS_THRESHOLD = 0.45
 
@@ -72,10 +137,124 @@ garbage_map = {
     "cake": "Organic",
 }
 
+# Garbage-only decoding: score just the garbage_map columns of the output
+# and apply a confidence threshold per category (others use CONF_THRESHOLD)
+GARBAGE_ONLY_DECODE = True
+CATEGORY_THRESHOLDS = {
+    "Plastic Bottle": 0.20,
+    "Metal Can": 0.30,
+    "Organic": 0.40,
+}
+GARBAGE_CLASS_IDS, GARBAGE_THRESHOLDS = build_class_filter(classNames, garbage_map, CATEGORY_THRESHOLDS, CONF_THRESHOLD)
+
+# Detect-then-track: run YOLO every DETECT_EVERY frames, or sooner when the
+# optical-flow tracker loses confidence, and track the target in between
+TRACK_MODE = True
+DETECT_EVERY = 5
+TRACK_MIN_CONF = 0.5
+STATS_INTERVAL = 5.0  # seconds between per-mode FPS/latency reports
+
+# Target lock: a SORT tracker gives garbage detections stable IDs and the
+# controller stays on one ID until it is collected or lost
+TARGET_LOCK = True
+TRACK_MAX_AGE = 5  # detector runs a track may go unmatched before it is lost
+
+# ROI re-detection: once a target is locked, run the detector on a crop around
+# it at ROI_SIZE, with a full-frame pass every ROI_FULL_EVERY runs or when the
+# target is not found in the crop (needs a ROI_SIZE model, see export_onnx.py)
+ROI_MODE = True
+ROI_SIZE = 320
+ROI_MARGIN = 1.0       # crop extends this many box sizes beyond each side
+ROI_FULL_EVERY = 5
+ROI_MODEL_FILE = f"yolov8{MODEL_TYPE}_{ROI_SIZE}x{ROI_SIZE}.onnx"
+if MODEL_PRECISION == 'int8':
+    ROI_MODEL_FILE = ROI_MODEL_FILE.replace(".onnx", "_int8.onnx")
+
+# Pipelined loop: capture, preprocess, inference, decode, motor control and
+# rendering run on their own threads linked by drop-oldest queues, so
+# preprocessing of frame N+1 overlaps inference of frame N.
+# False = original serial loop. Optical-flow tracking (TRACK_MODE) needs every
+# frame in order and is only used by the serial loop.
+PIPELINED = False
+QUEUE_DEPTH = 1
+# Pipelined loop and process pool: stop the motors when no detection result
+# has arrived for RESULT_TIMEOUT s (a failing stage must not leave the robot
+# driving on its last command)
+RESULT_TIMEOUT = 1.0
+
+# Process-pool inference: INFER_WORKERS processes, each with its own detector and
+# THREADS_PER_WORKER OpenCV threads; frames are passed through shared memory.
+# 0 = single in-process detector. Full-frame detection only (no ROI / flow tracking).
+# Tune with bench_infer_pool.py.
+INFER_WORKERS = 0
+THREADS_PER_WORKER = 2
+
+# Multi-camera: CAMERA_COUNT cameras (e.g. a second, downward-facing one on the
+# pickup zone) and one batched forward pass over the newest frame of each.
+# The first camera found drives alignment; the others are detected and shown
+# next to it. Needs BATCH_MODEL_FILE, exported with batch size CAMERA_COUNT
+# (python export_onnx.py n 640 640 2), otherwise every camera gets its own
+# forward pass; bench_batch.py compares the two. In-process detector only
+# (no worker pool, pipeline, ROI, flow tracking or motion gate).
+CAMERA_COUNT = 1
+BATCH_MODEL_FILE = f"yolov8{MODEL_TYPE}_{INPUT_WIDTH}x{INPUT_HEIGHT}_b{CAMERA_COUNT}.onnx"
+if MODEL_PRECISION == 'int8':
+    BATCH_MODEL_FILE = BATCH_MODEL_FILE.replace(".onnx", "_int8.onnx")
+
+# Cold start: forward passes run on a blank frame while the lift homes, so
+# the first camera frame does not pay for lazy allocation
+WARMUP_RUNS = 1
+
+# Display: 'window' = draw + imshow every frame on the loop thread,
+# 'viewer' = loop only hands frames to a viewer thread drawing at VIEWER_FPS,
+# 'headless' = no drawing or GUI calls (no monitor; stop with Ctrl+C)
+DISPLAY_MODE = 'window'
+VIEWER_FPS = 5
+
+# Motion gate (see motion_gate.py): while the scene is static (robot stopped,
+# nothing moving) reuse the last detections instead of running inference.
+# Inference runs again once more than MOTION_THRESHOLD of the pixels changed
+# by over MOTION_PIXEL_DELTA grey levels, or the cached result is older than
+# MOTION_MAX_AGE seconds. Not used for optical-flow tracked frames.
+MOTION_GATE = True
+MOTION_THRESHOLD = 0.01
+MOTION_PIXEL_DELTA = 15
+MOTION_MAX_AGE = 1.0
+
+# Session recording (see recorder.py): camera frames, detections, base motor
+# commands and lift sensor readings are written to RECORD_DIR/<date_time>/
+# by a background thread. Inspect with: python recorder.py <session dir>
+RECORD_SESSION = False
+RECORD_DIR = "recordings"
+
+# Prometheus metrics (see metrics.py): per-stage latency histograms, decision
+# and frame counters at http://METRICS_HOST:METRICS_PORT/metrics (0 = off).
+# METRICS_HOST "0.0.0.0" lets another machine scrape the Pi.
+METRICS_PORT = 9108
+METRICS_HOST = "127.0.0.1"
+
+# Alignment control
+CENTER_TOLERANCE = 50   # pixels
+TARGET_MIN = 5          # cm
+TARGET_MAX = 10         # cm
+TRIGGER_COOLDOWN = 5    # seconds
+
 # Distance Estimation Constants
 KNOWN_WIDTH = 7.0  # cm
 FOCAL_LENGTH = 500 # Adjusted for lower resolution (needs recalibration)
 
+# Detector stages (preprocess/forward/decode/nms) are recorded by detector.py
+CAPTURE_SECONDS = stage_timer("capture")
+PREPROCESS_SECONDS = stage_timer("preprocess")
+FORWARD_SECONDS = stage_timer("forward")
+DECODE_SECONDS = stage_timer("decode")
+SELECT_SECONDS = stage_timer("select")
+CONTROL_SECONDS = stage_timer("control")
+POOL_SECONDS = stage_timer("pool")  # submit -> result through the worker pool
+FRAMES = counter("wastexpert_frames_total", "Frames processed by the detection loop.")
+TARGETS = gauge("wastexpert_targets", "Garbage targets in the last processed frame.")
+LIFT_READY = gauge("wastexpert_lift_ready", "1 once the lift is homed.")
+
 def calculate_distance(focal_length, known_width, pixel_width):
     if pixel_width == 0:
         return 0
@@ -95,51 +274,32 @@ def download_model(url, path):
         print(f"Error downloading model: {e}")
         return False
 
-def preprocess_image(img, input_size):
-    """
-    Resizes image to input_size with letterboxing to preserve aspect ratio.
-    Returns: padded_img, scale, (pad_top, pad_left)
-    """
-    h, w = img.shape[:2]
-    scale = min(input_size[0] / h, input_size[1] / w)
-    nh, nw = int(h * scale), int(w * scale)
-    
-    # Resize
-    resized_img = cv2.resize(img, (nw, nh))
-    
-    # Create blank canvas
-    padded_img = np.zeros((input_size[1], input_size[0], 3), dtype=np.uint8)
-    
-    # Center the resized image
-    pad_top = (input_size[1] - nh) // 2
-    pad_left = (input_size[0] - nw) // 2
-    
-    padded_img[pad_top:pad_top+nh, pad_left:pad_left+nw] = resized_img
-    
-    return padded_img, scale, (pad_top, pad_left)
-
 class ThreadedCamera:
     def __init__(self, src=0):
         self.capture = cv2.VideoCapture(src)
-        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+        self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, CAMERA_WIDTH)
+        self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, CAMERA_HEIGHT)
         
         self.ret, self.frame = self.capture.read()
+        self.frame_id = 0  # Incremented on every captured frame
         self.stopped = False
         self.lock = threading.Lock()
         
         # Start the thread
-        self.thread = threading.Thread(target=self.update, args=())
+        self.thread = threading.Thread(target=self.update, args=(), name=f"camera{src}")
         self.thread.daemon = True
         self.thread.start()
 
     def update(self):
         while not self.stopped:
             if self.capture.isOpened():
+                start = time.perf_counter()
                 ret, frame = self.capture.read()
+                CAPTURE_SECONDS.observe(time.perf_counter() - start)
                 with self.lock:
                     self.ret = ret
                     self.frame = frame
+                    self.frame_id += 1
             else:
                 time.sleep(0.1)
 
@@ -155,10 +315,554 @@ class ThreadedCamera:
     def isOpened(self):
         return self.capture.isOpened()
 
-def main():
-    print(f"Starting Garbage Detection with {MODEL_FILE}...")
-    
-    # Initialize Automation
+class CameraGroup:
+    """
+    Several ThreadedCameras read as one: frame_id changes when any camera
+    captured a new frame and read() returns the newest frame of each.
+    """
+    def __init__(self, cameras):
+        self.cameras = cameras
+
+    @property
+    def frame_id(self):
+        return tuple(camera.frame_id for camera in self.cameras)
+
+    def read(self):
+        """
+        Returns: (True only if every camera has a frame, [frame per camera])
+        """
+        frames = [camera.read() for camera in self.cameras]
+        return all(ret for ret, _ in frames), [frame for _, frame in frames]
+
+    def release(self):
+        for camera in self.cameras:
+            camera.release()
+
+    def isOpened(self):
+        return all(camera.isOpened() for camera in self.cameras)
+
+    def __len__(self):
+        return len(self.cameras)
+
+class ModeStats:
+    """
+    Frame count and average latency per loop mode ('detect' / 'track')
+    over a reporting window.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.window_start = time.time()
+        self.frames = {}
+        self.busy = {}
+
+    def add(self, mode, seconds):
+        self.frames[mode] = self.frames.get(mode, 0) + 1
+        self.busy[mode] = self.busy.get(mode, 0.0) + seconds
+
+    def summary(self):
+        elapsed = max(time.time() - self.window_start, 1e-6)
+        parts = []
+        for mode, count in self.frames.items():
+            fps = count / elapsed
+            latency_ms = 1000 * self.busy[mode] / count
+            parts.append(f"{mode}: {fps:.1f} FPS, {latency_ms:.0f} ms")
+        return " | ".join(parts)
+
+def backend_options():
+    if DETECTOR_BACKEND == 'onnxruntime':
+        return {"threads": ORT_THREADS}
+    if DETECTOR_BACKEND == 'darknet':
+        return {"config_path": DARKNET_CONFIG}
+    return {}
+
+def load_detector(path, input_size):
+    detector = create_detector(DETECTOR_BACKEND, path, input_size, **backend_options())
+    print(f"Using {detector.name} on {detector.device.upper()} for inference ({path})")
+    return detector
+
+def decode_settings():
+    settings = {"conf_threshold": CONF_THRESHOLD, "nms_threshold": NMS_THRESHOLD}
+    if GARBAGE_ONLY_DECODE:
+        settings.update(class_ids=GARBAGE_CLASS_IDS, class_thresholds=GARBAGE_THRESHOLDS)
+    return settings
+
+def run_detector(detector, img):
+    """
+    Preprocess, forward pass and decode (confidence mask, un-letterbox,
+    class-aware NMS).
+    Returns: detections (postprocess.DETECTION_DTYPE) in camera coordinates
+    """
+    return detector.detect(img, **decode_settings())
+
+def run_camera_detector(detector, imgs, batched):
+    """
+    Detection on one frame per camera, in one forward pass when batched.
+    Returns: one DETECTION_DTYPE array per camera
+    """
+    if batched:
+        detections = detector.detect_batch(imgs, **decode_settings())
+    else:
+        detections = detector.detect_each(imgs, **decode_settings())
+    return split_cameras(detections, len(imgs))
+
+def run_roi_detector(detector, img, window):
+    """
+    Runs the detector on img[window] only and maps boxes back to the frame.
+    """
+    x0, y0, x1, y1 = window
+    detections = run_detector(detector, img[y0:y1, x0:x1])
+    detections["left"] += x0
+    detections["top"] += y0
+    return detections
+
+def garbage_targets(detections):
+    """
+    Keeps garbage classes and estimates their distance.
+    Returns: list of (displayName, left, top, width, height, distance)
+    """
+    targets = []
+    for det in detections:
+        cls_id = int(det["class_id"])
+        if cls_id < len(classNames) and classNames[cls_id] in garbage_map:
+            left, top, width, height = int(det["left"]), int(det["top"]), int(det["width"]), int(det["height"])
+            # min(width, height) is used as the reference dimension for KNOWN_WIDTH
+            distance = calculate_distance(FOCAL_LENGTH, KNOWN_WIDTH, min(width, height))
+            targets.append((garbage_map[classNames[cls_id]], left, top, width, height, distance))
+    return targets
+
+def select_target(detections, sort_tracker, target_lock):
+    """
+    Returns: (targets, closest) where closest is the target to align to or None
+    """
+    start = time.perf_counter()
+    if TARGET_LOCK:
+        # Garbage-only tracks with stable IDs
+        detections = sort_tracker.update(detections[np.isin(detections["class_id"], GARBAGE_CLASS_IDS)])
+    targets = garbage_targets(detections)
+
+    if TARGET_LOCK:
+        # Stay on the locked track; pick the closest one only when it is lost
+        idx = target_lock.select(detections, [t[5] for t in targets])
+        closest = targets[idx] if idx is not None else None
+    else:
+        # Track the closest target for alignment
+        closest = min(targets, key=lambda t: t[5], default=None)
+    SELECT_SECONDS.observe(time.perf_counter() - start)
+    TARGETS.set(len(targets))
+    FRAMES.inc()
+    return targets, closest
+
+class AlignmentController:
+    """
+    Turns the target box into base motor commands and triggers the pickup
+    automation once the target is centred and in range.
+    """
+    def __init__(self, on_collected=None, lift_ready=None, on_first_decision=None):
+        self.last_trigger_time = 0
+        self.on_collected = on_collected
+        self.lift_ready = lift_ready  # threading.Event, set once the lift is homed
+        self.on_first_decision = on_first_decision
+
+    def step(self, target_box, frame_width):
+        """
+        Returns: status text
+        """
+        start = time.perf_counter()
+        status = self.decide(target_box, frame_width)
+        # Includes the pickup automation when it runs (see wastexpert_automation_seconds)
+        CONTROL_SECONDS.observe(time.perf_counter() - start)
+        counter("wastexpert_decisions_total", "Alignment decisions by outcome.", decision=status).inc()
+        return status
+
+    def decide(self, target_box, frame_width):
+        if self.on_first_decision:
+            first_decision, self.on_first_decision = self.on_first_decision, None
+            first_decision()
+
+        if not target_box:
+            # No target found
+            base_motors.stop()
+            return "Idle"
+
+        # Unpack target
+        x, y, w, h, dist = target_box
+        cx = x + w // 2
+
+        # Offset from the image center (boxes are in camera coordinates)
+        offset = cx - frame_width // 2
+
+        # 1. Alignment (Left/Right)
+        if abs(offset) > CENTER_TOLERANCE:
+            if offset > 0:
+                base_motors.right()
+                return "Turning Right"
+            base_motors.left()
+            return "Turning Left"
+
+        # 2. Distance Control (Forward/Backward)
+        if dist > TARGET_MAX:
+            base_motors.forward()
+            return "Forward"
+        if dist < TARGET_MIN:
+            base_motors.backward()
+            return "Backward"
+
+        # 3. Trigger Automation
+        base_motors.stop()
+        if self.lift_ready is not None and not self.lift_ready.is_set():
+            return "Aligned, waiting for lift..."
+        print("✅ Target Aligned & In Range. Starting Automation.")
+
+        # Double check time cooldown
+        if time.time() - self.last_trigger_time > TRIGGER_COOLDOWN:
+            try:
+                automation_pre_test.automation_sequence()
+                self.last_trigger_time = time.time()
+                if self.on_collected:
+                    self.on_collected()
+            except Exception as e:
+                print(f"❌ Automation Error: {e}")
+        return "Aligned! Triggering..."
+
+def draw_target(img, displayName, left, top, width, height, distance):
+    import cvzone  # Only needed when rendering is enabled
+
+    # Green when close enough to pick up, red otherwise
+    color = (0, 255, 0) if distance < 20 else (0, 0, 255)
+    cvzone.cornerRect(img, (left, top, width, height), l=9, rt=5, colorR=color, colorC=color)
+    text = f'{displayName} {int(distance)}cm'
+    cvzone.putTextRect(img, text, (max(0, left), max(35, top)), scale=1.5, thickness=2, offset=5, colorR=color)
+
+def render_overlay(img, overlay):
+    """
+    Draws what a loop handed to Display.show().
+    overlay: (targets for draw_target, [(text, (x, y), font scale, color)])
+    """
+    targets, lines = overlay
+    for target in targets:
+        draw_target(img, *target)
+    for text, org, font_scale, color in lines:
+        cv2.putText(img, text, org, cv2.FONT_HERSHEY_SIMPLEX, font_scale, color, 2)
+
+def run_pipeline(cap, detector, roi_detector, sort_tracker, target_lock, controller, display, recorder=None, gate=None):
+    """
+    Staged loop: capture -> preprocess -> infer -> postprocess -> control,
+    with rendering on the main thread. Stages are linked by drop-oldest queues
+    of depth QUEUE_DEPTH, so every stage always works on the newest frame.
+    """
+    # Blob buffers are handed back after the forward pass (or when a queued
+    # frame is dropped), so a blob is never rewritten while inference reads it
+    pool = BufferPool(lambda: (detector.preprocessor(),
+                               roi_detector.preprocessor() if roi_detector is not None else None),
+                      QUEUE_DEPTH + 3)
+    release_blob = lambda item: pool.release(item["buffers"])
+
+    pre_q = LatestQueue(QUEUE_DEPTH)
+    infer_q = LatestQueue(QUEUE_DEPTH, on_drop=release_blob)
+    post_q = LatestQueue(QUEUE_DEPTH)
+    control_q = LatestQueue(1)
+    render_q = LatestQueue(1)
+
+    # Shared between the preprocess and postprocess stages
+    roi = {"last_target_box": None, "runs": 0}
+    latest = {"status": "Idle", "t_result": time.time(), "halted": False, "seq": 0}
+    e2e = StageStats("end-to-end")
+    stopped = threading.Event()
+
+    def capture():
+        seq = 0
+        last_id = -1
+        while not stopped.is_set():
+            if cap.frame_id == last_id:
+                time.sleep(0.002)
+                continue
+            last_id = cap.frame_id
+            success, img = cap.read()
+            if not success or img is None:
+                time.sleep(0.01)
+                continue
+            seq += 1
+            pre_q.put({"seq": seq, "t_capture": time.perf_counter(), "img": img})
+
+    def preprocess(item):
+        if gate is not None:
+            cached, item["signature"] = gate.check(item["img"])
+            if cached is not None:
+                # Static scene: skip inference, postprocess uses the cached result
+                item.update(window=None, detections=cached)
+                post_q.put(item)
+                return None
+        buffers = pool.acquire(timeout=0.5)
+        if buffers is None:
+            return None
+        full_pre, roi_pre = buffers
+        img = item["img"]
+        window = None
+        try:
+            if roi_detector is not None and roi["last_target_box"] and roi["runs"] < ROI_FULL_EVERY:
+                window = roi_window(roi["last_target_box"], (img.shape[1], img.shape[0]), ROI_MARGIN, ROI_SIZE)
+                x0, y0, x1, y1 = window
+                start = time.perf_counter()
+                blob, scale, pad = roi_pre.prepare(img[y0:y1, x0:x1])
+                roi["runs"] += 1
+            else:
+                start = time.perf_counter()
+                blob, scale, pad = full_pre.prepare(img)
+                roi["runs"] = 0
+        except Exception:
+            pool.release(buffers)
+            raise
+        PREPROCESS_SECONDS.observe(time.perf_counter() - start)
+        item.update(buffers=buffers, blob=blob, scale=scale, pad=pad, window=window)
+        return item
+
+    def infer(item):
+        model = roi_detector if item["window"] else detector
+        start = time.perf_counter()
+        try:
+            item["outputs"] = model.infer(item["blob"])
+        finally:
+            # Also on errors, or the pool runs dry and preprocess stalls
+            pool.release(item.pop("buffers"))
+        FORWARD_SECONDS.observe(time.perf_counter() - start)
+        return item
+
+    def decode(item):
+        model = roi_detector if item["window"] else detector
+        start = time.perf_counter()
+        detections = model.decode(item["outputs"], item["scale"], item["pad"], **decode_settings())
+        DECODE_SECONDS.observe(time.perf_counter() - start)
+        if item["window"]:
+            x0, y0 = item["window"][:2]
+            detections["left"] += x0
+            detections["top"] += y0
+            if not np.isin(detections["class_id"], GARBAGE_CLASS_IDS).any():
+                roi["runs"] = ROI_FULL_EVERY  # Lost in the crop: next frame is full-frame
+        return detections
+
+    def postprocess(item):
+        # Cached (static scene) frames skip inference and can overtake a
+        # frame still being inferred: never act on an older frame
+        if item["seq"] < latest["seq"]:
+            return None
+        latest["seq"] = item["seq"]
+        if "detections" in item:
+            detections = item["detections"]
+        else:
+            detections = decode(item)
+            if gate is not None:
+                gate.update(item["signature"], detections)
+        if recorder is not None:
+            recorder.frame(item["img"])
+            recorder.detections(detections)
+
+        targets, closest = select_target(detections, sort_tracker, target_lock)
+        item["targets"] = targets
+        item["target_box"] = closest[1:] if closest else None
+        roi["last_target_box"] = item["target_box"]
+        e2e.add(time.perf_counter() - item["t_capture"])
+
+        latest["t_result"] = time.time()
+        control_q.put(item)
+        render_q.put(item)
+        return None
+
+    def control(item):
+        latest["status"] = controller.step(item["target_box"], item["img"].shape[1])
+        latest["halted"] = False
+        return None
+
+    stages = [
+        Stage("preprocess", preprocess, pre_q, infer_q).start(),
+        Stage("infer", infer, infer_q, post_q).start(),
+        Stage("postprocess", postprocess, post_q).start(),
+        Stage("control", control, control_q).start(),
+    ]
+    t_capture = threading.Thread(target=capture, name="capture")
+    t_capture.daemon = True
+    t_capture.start()
+
+    # Hand frames to the display on the main thread
+    last_report = time.time()
+    frames = 0
+    while True:
+        item = render_q.get(timeout=0.1)
+        if item is not None:
+            frames += 1
+            mode = "reuse" if "detections" in item else "roi" if item["window"] else "detect"
+            lines = [(f"Pipelined ({mode}) Model: {MODEL_TYPE.upper()} Res: {INPUT_WIDTH}x{INPUT_HEIGHT}", (20, 30), 0.7, (255, 0, 0)),
+                     (f"CMD: {latest['status']}", (20, 60), 0.8, (0, 255, 255))]
+            if not display.show(item["img"], (item["targets"], lines)):
+                break
+
+        if not latest["halted"] and time.time() - latest["t_result"] > RESULT_TIMEOUT:
+            print(f"⚠️ No detection result for {RESULT_TIMEOUT:.1f} s, stopping motors")
+            base_motors.stop()
+            latest["halted"] = True
+            latest["status"] = "Stalled"
+
+        if time.time() - last_report >= STATS_INTERVAL:
+            elapsed = time.time() - last_report
+            print(f"📊 Pipeline: {frames / elapsed:.1f} FPS | " + " | ".join(stage.stats.summary() for stage in stages)
+                  + f" | {e2e.summary()} | dropped pre/infer/post: {pre_q.dropped}/{infer_q.dropped}/{post_q.dropped}"
+                  + (f" | {gate.summary()}" if gate is not None else ""))
+            for stage in stages:
+                stage.stats.reset()
+            e2e.reset()
+            frames = 0
+            last_report = time.time()
+
+    stopped.set()
+    for stage in stages:
+        stage.stop()
+    base_motors.stop()
+
+def run_worker_pool(cap, pool, sort_tracker, target_lock, controller, display, recorder=None, gate=None):
+    """
+    Submits new camera frames to the inference pool and acts on the newest
+    completed result; older results that finish late are discarded.
+    Frames the motion gate finds static are handled right away with the
+    cached detections instead of being submitted; a pool result older than
+    the last frame handled is then discarded (counted as overtaken).
+    """
+    seq = 0
+    last_id = -1
+    frames = 0
+    last_report = time.time()
+    last_result = time.time()
+    halted = False
+    handled = 0      # seq of the newest frame acted on
+    overtaken = 0    # pool results discarded because a newer cached frame was handled first
+    signatures = {}  # seq -> motion gate signature of submitted frames
+    while True:
+        result = None
+        if cap.frame_id != last_id:
+            last_id = cap.frame_id
+            success, img = cap.read()
+            if success and img is not None:
+                seq += 1
+                cached = None
+                if gate is not None:
+                    cached, signature = gate.check(img)
+                if cached is not None:
+                    result = (seq, img, cached, 0.0)
+                else:
+                    if gate is not None:
+                        signatures[seq] = signature
+                    pool.submit(seq, img)
+
+        if result is None:
+            result = pool.poll(timeout=0.005)
+            if result is not None:
+                POOL_SECONDS.observe(result[3])
+                signature = signatures.pop(result[0], None)
+                if signature is not None:
+                    gate.update(signature, result[2])
+                    # Results the pool skipped never come back
+                    for old in [s for s in signatures if s < result[0]]:
+                        del signatures[old]
+                if result[0] < handled:
+                    # Finished after a newer cached frame was acted on
+                    overtaken += 1
+                    result = None
+        if result is not None:
+            frames += 1
+            handled, img, detections, latency = result
+            if recorder is not None:
+                recorder.frame(img)
+                recorder.detections(detections)
+            targets, closest = select_target(detections, sort_tracker, target_lock)
+            status = controller.step(closest[1:] if closest else None, img.shape[1])
+            last_result = time.time()
+            halted = False
+
+            lines = [(f"Workers: {INFER_WORKERS}x{THREADS_PER_WORKER} Latency: {int(latency * 1000)}ms Res: {INPUT_WIDTH}x{INPUT_HEIGHT}", (20, 30), 0.7, (255, 0, 0)),
+                     (f"CMD: {status}", (20, 60), 0.8, (0, 255, 255))]
+            if not display.show(img, (targets, lines)):
+                break
+        elif not halted and time.time() - last_result > RESULT_TIMEOUT:
+            # Workers failing or stuck: do not keep driving on the last command
+            print(f"⚠️ No detection result for {RESULT_TIMEOUT:.1f} s, stopping motors")
+            base_motors.stop()
+            halted = True
+
+        if time.time() - last_report >= STATS_INTERVAL:
+            elapsed = time.time() - last_report
+            p50 = 1000 * float(np.median(pool.latencies)) if pool.latencies else 0.0
+            print(f"📊 Pool: {frames / elapsed:.1f} FPS, p50 latency {p50:.0f} ms, "
+                  f"skipped {pool.skipped}, out-of-order {pool.stale}, overtaken {overtaken}, errors {pool.errors}"
+                  + (f", {gate.summary()}" if gate is not None else ""))
+            frames = 0
+            last_report = time.time()
+
+    base_motors.stop()
+
+def tile_frames(imgs):
+    # Side by side, shorter frames padded at the bottom
+    height = max(img.shape[0] for img in imgs)
+    return np.hstack([cv2.copyMakeBorder(img, 0, height - img.shape[0], 0, 0, cv2.BORDER_CONSTANT)
+                      for img in imgs])
+
+def run_multi_camera(cameras, detector, batched, sort_tracker, target_lock, controller, display, recorder=None):
+    """
+    Detects on the newest frame of every camera at once and aligns to the
+    drive camera's (camera 0) target. The display shows the cameras side by
+    side, each with its own garbage targets.
+    """
+    last_ids = None
+    frames = 0
+    busy = 0.0
+    last_report = time.time()
+    while True:
+        if cameras.frame_id == last_ids:
+            time.sleep(0.002)
+            continue
+        last_ids = cameras.frame_id
+        success, imgs = cameras.read()
+        if not success:
+            time.sleep(0.01)
+            continue
+
+        start = time.perf_counter()
+        detections = run_camera_detector(detector, imgs, batched)
+        busy += time.perf_counter() - start
+        frames += 1
+        if recorder is not None:
+            recorder.frame(imgs[0])
+            recorder.detections(detections[0])
+
+        targets, closest = select_target(detections[0], sort_tracker, target_lock)
+        status = controller.step(closest[1:] if closest else None, imgs[0].shape[1])
+
+        if display.mode != 'headless':
+            # Other cameras' boxes shifted onto their tile
+            overlay_targets = list(targets)
+            x = imgs[0].shape[1]
+            for img, camera_detections in zip(imgs[1:], detections[1:]):
+                overlay_targets += [(name, left + x, top, width, height, distance)
+                                    for name, left, top, width, height, distance in garbage_targets(camera_detections)]
+                x += img.shape[1]
+            mode = "batched" if batched else "per camera"
+            lines = [(f"{len(imgs)} cameras ({mode}) Model: {MODEL_TYPE.upper()} Res: {INPUT_WIDTH}x{INPUT_HEIGHT}", (20, 30), 0.7, (255, 0, 0)),
+                     (f"CMD: {status}", (20, 60), 0.8, (0, 255, 255))]
+            if not display.show(tile_frames(imgs), (overlay_targets, lines)):
+                break
+
+        if time.time() - last_report >= STATS_INTERVAL:
+            elapsed = time.time() - last_report
+            latency_ms = 1000 * busy / frames if frames else 0.0
+            print(f"📊 Cameras: {frames / elapsed:.1f} sets/s x {len(imgs)} frames, "
+                  f"detection {latency_ms:.0f} ms per set ({'batched' if batched else 'per camera'})")
+            frames = 0
+            busy = 0.0
+            last_report = time.time()
+
+    base_motors.stop()
+
+def home_lift(lift_ready):
+    # Initialize Automation and move the lift to the top limit switch
     try:
         automation_pre_test.init_pca()
         automation_pre_test.set_pwm_freq(50)
@@ -168,59 +872,200 @@ def main():
         automation_pre_test.move_up_until_L2()
     except Exception as e:
         print(f"Automation Init Failed: {e}")
+    finally:
+        lift_ready.set()
+        LIFT_READY.set(1)
 
-    # Initialize Base Motors
-    try:
-        base_motors.init()
-    except Exception as e:
-        print(f"Base Motors Init Failed: {e}")
+def load_models():
+    """
+    Loads the detector (and ROI detector) and runs WARMUP_RUNS forward passes,
+    so the slow first inference happens during startup, not on the first frame.
+    Returns: (detector, roi_detector or None)
+    """
+    if OPENCV_THREADS:
+        cv2.setNumThreads(OPENCV_THREADS)
+    detector = load_detector(MODEL_FILE, (INPUT_WIDTH, INPUT_HEIGHT))
 
-    # Check for model and download if missing
-    if not os.path.exists(MODEL_FILE):
-        print(f"Model file {MODEL_FILE} not found.")
-        if not download_model(MODEL_URL, MODEL_FILE):
-             print(f"Please manually download {MODEL_FILE} and place it in this directory.")
-             input("Press Enter to exit...")
-             return
-
-    # Initialize OpenCV DNN Network
-    net = cv2.dnn.readNetFromONNX(MODEL_FILE)
-    
-    # Use CPU by default to avoid CUDA errors without proper setup
-    print("Using CPU for inference")
-    net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
-    net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
-
-    # Initialize Webcam
-    # Try indices 0 and 1 to find the USB camera
-    cap = None
-    for cam_index in [0, 1]:
-        print(f"Trying to open camera index {cam_index}...")
-        # Check if we can open it with standard VideoCapture first
-        temp_cap = cv2.VideoCapture(cam_index)
-        if temp_cap.isOpened():
-            print(f"Successfully detected camera index {cam_index}")
-            temp_cap.release()
-            try:
-                cap = ThreadedCamera(cam_index)
-                if cap.isOpened():
-                    print(f"Started ThreadedCamera on index {cam_index}")
-                    break
-            except Exception as e:
-                print(f"Failed to start ThreadedCamera: {e}")
+    # Small-input detector for ROI re-detection (optional)
+    roi_detector = None
+    if ROI_MODE and DETECTOR_BACKEND != 'darknet':
+        if os.path.exists(ROI_MODEL_FILE):
+            roi_detector = load_detector(ROI_MODEL_FILE, (ROI_SIZE, ROI_SIZE))
         else:
-             temp_cap.release()
+            print(f"ROI model {ROI_MODEL_FILE} not found, ROI mode disabled.")
+            print(f"Export it with: python export_onnx.py {MODEL_TYPE} {ROI_SIZE} {ROI_SIZE}")
+            if MODEL_PRECISION == 'int8':
+                print(f"then quantize it with: python quantize_model.py {ROI_MODEL_FILE.replace('_int8', '')}")
+
+    frame = np.zeros((CAMERA_HEIGHT, CAMERA_WIDTH, 3), dtype=np.uint8)
+    for _ in range(WARMUP_RUNS):
+        run_detector(detector, frame)
+        if roi_detector is not None:
+            run_detector(roi_detector, frame[:ROI_SIZE, :ROI_SIZE])
+    return detector, roi_detector
+
+def load_camera_models():
+    """
+    Loads the multi-camera detector (BATCH_MODEL_FILE, or MODEL_FILE with one
+    forward pass per camera if it is missing) and warms it up.
+    Returns: (detector, batched)
+    """
+    if OPENCV_THREADS:
+        cv2.setNumThreads(OPENCV_THREADS)
+    # Darknet runs one pass per camera either way (DarknetDetector.detect_batch)
+    batched = DETECTOR_BACKEND != 'darknet' and os.path.exists(BATCH_MODEL_FILE)
+    if not batched and DETECTOR_BACKEND != 'darknet':
+        print(f"Batch model {BATCH_MODEL_FILE} not found, running one forward pass per camera.")
+        print(f"Export it with: python export_onnx.py {MODEL_TYPE} {INPUT_WIDTH} {INPUT_HEIGHT} {CAMERA_COUNT}")
+    detector = load_detector(BATCH_MODEL_FILE if batched else MODEL_FILE, (INPUT_WIDTH, INPUT_HEIGHT))
+
+    frames = [np.zeros((CAMERA_HEIGHT, CAMERA_WIDTH, 3), dtype=np.uint8)] * CAMERA_COUNT
+    for _ in range(WARMUP_RUNS):
+        run_camera_detector(detector, frames, batched)
+    return detector, batched
+
+def main():
+    print(f"Starting Garbage Detection with {MODEL_FILE} ({INPUT_WIDTH}x{INPUT_HEIGHT})...")
+    if TUNED:
+        print(f"Using autotuned {DETECTOR_BACKEND} x{OPENCV_THREADS} threads ({TUNED['latency_ms']} ms measured)")
+    elif USE_AUTOTUNE:
+        print("No autotune results for this machine/model, run: python autotune.py")
     
-    if cap is None or not cap.isOpened():
-        print("Error: Could not open any webcam (tried index 0 and 1).")
+    timeline = StartupTimeline()
+
+    # Base motors first: the drive must be stoppable before anything else runs
+    with timeline.phase("base motors"):
+        try:
+            base_motors.init()
+        except Exception as e:
+            print(f"Base Motors Init Failed: {e}")
+
+    # Check for model and download if missing
+    with timeline.phase("model check"):
+        if not os.path.exists(MODEL_FILE):
+            print(f"Model file {MODEL_FILE} not found.")
+            if MODEL_URL is None:
+                 if DETECTOR_BACKEND == 'darknet':
+                     print(f"Place {DARKNET_CONFIG} and {DARKNET_WEIGHTS} (YOLOv4-tiny) in this directory.")
+                     input("Press Enter to exit...")
+                     return
+                 if MODEL_PRECISION == 'int8':
+                     print(f"Build it with: python quantize_model.py {FP32_MODEL_FILE}")
+                 if not os.path.exists(FP32_MODEL_FILE):
+                     print(f"Export it with: python export_onnx.py {MODEL_TYPE} {INPUT_WIDTH} {INPUT_HEIGHT}")
+                 input("Press Enter to exit...")
+                 return
+            if not download_model(MODEL_URL, MODEL_FILE):
+                 print(f"Please manually download {MODEL_FILE} and place it in this directory.")
+                 input("Press Enter to exit...")
+                 return
+
+    # Inference worker processes are forked before this process starts any
+    # threads or OpenCV threading (startup phases, model load, camera)
+    pool = None
+    if INFER_WORKERS > 0 and CAMERA_COUNT == 1:
+        print(f"Starting {INFER_WORKERS} inference workers x {THREADS_PER_WORKER} threads")
+        with timeline.phase("inference workers"):
+            pool = InferencePool(MODEL_FILE, (INPUT_WIDTH, INPUT_HEIGHT), (CAMERA_WIDTH, CAMERA_HEIGHT),
+                                 INFER_WORKERS, THREADS_PER_WORKER, decode_kwargs=decode_settings(),
+                                 backend=DETECTOR_BACKEND, backend_options=backend_options())
+
+    # Lift homing, model load + warm-up and camera discovery run concurrently.
+    # Detection and driving start as soon as model and camera are ready; only
+    # the pickup waits for the lift (lift_ready)
+    lift_ready = threading.Event()
+    timeline.start("lift homing", home_lift, lift_ready)
+    if CAMERA_COUNT > 1:
+        camera_future = timeline.start("camera discovery", find_cameras, ThreadedCamera, CAMERA_COUNT)
+        models_future = timeline.start("model load + warm-up", load_camera_models)
+    else:
+        camera_future = timeline.start("camera discovery", find_camera, ThreadedCamera)
+        models_future = timeline.start("model load + warm-up", load_models) if pool is None else None
+
+    # Started after the worker fork; closed at exit so Ctrl+C still flushes it
+    recorder = None
+    if RECORD_SESSION:
+        recorder = Recorder(session_dir(RECORD_DIR))
+        print(f"Recording session to {recorder.path}")
+        base_motors.on_command = recorder.command
+        automation_pre_test.on_sensor = recorder.sensor
+        atexit.register(recorder.close)
+
+    if METRICS_PORT:
+        try:
+            serve_metrics(METRICS_PORT, METRICS_HOST)
+        except OSError as e:
+            print(f"Metrics endpoint failed: {e}")
+
+    if CAMERA_COUNT > 1:
+        detector, batched = models_future.result()
+        roi_detector = None
+        found = camera_future.result()
+        cap = CameraGroup([camera for camera, _ in found]) if found else None
+        if found and len(found) < CAMERA_COUNT:
+            # The batch model only takes exactly CAMERA_COUNT frames
+            print(f"Only {len(found)} of {CAMERA_COUNT} cameras found, running one forward pass per camera.")
+            batched = False
+    else:
+        detector, roi_detector = models_future.result() if models_future else (None, None)
+        cap, _ = camera_future.result()
+    if cap is None:
+        print("Error: Could not open any webcam.")
         print("Please check your USB connection or try 'ls /dev/video*' in terminal.")
         return
-        
+
     # cap.set(3, 640)  # Resolution 640x480 - Handled in ThreadedCamera
     # cap.set(4, 480)
 
-    last_trigger_time = 0
-    TRIGGER_COOLDOWN = 5
+    # Detect-then-track state
+    tracker = FlowTracker()
+    frames_since_detect = 0
+    target_label = None
+    mode_stats = ModeStats()
+
+    # Multi-object tracking / target commitment
+    sort_tracker = SortTracker(max_age=TRACK_MAX_AGE)
+    target_lock = TargetLock(max_missed=TRACK_MAX_AGE)
+
+    # ROI re-detection state
+    roi_runs = 0
+    last_target_box = None
+
+    def first_decision():
+        timeline.mark("first decision")
+        print(f"⏱️ Startup timeline:\n{timeline.report()}")
+        if not lift_ready.is_set():
+            print("(lift still homing, pickup waits for it)")
+
+    # Collected: move on to the next track
+    controller = AlignmentController(on_collected=target_lock.release, lift_ready=lift_ready,
+                                     on_first_decision=first_decision)
+
+    display = Display(DISPLAY_MODE, "Pi Garbage Detection", render_overlay, VIEWER_FPS)
+
+    gate = MotionGate(MOTION_THRESHOLD, MOTION_PIXEL_DELTA, MOTION_MAX_AGE) if MOTION_GATE else None
+
+    if CAMERA_COUNT > 1:
+        run_multi_camera(cap, detector, batched, sort_tracker, target_lock, controller, display, recorder)
+        cap.release()
+        display.close()
+        return
+
+    if pool is not None:
+        try:
+            run_worker_pool(cap, pool, sort_tracker, target_lock, controller, display, recorder, gate)
+        finally:
+            base_motors.stop()
+            pool.close()
+        cap.release()
+        display.close()
+        return
+
+    if PIPELINED:
+        run_pipeline(cap, detector, roi_detector, sort_tracker, target_lock, controller, display, recorder, gate)
+        cap.release()
+        display.close()
+        return
 
     while True:
         success, img = cap.read()
@@ -230,179 +1075,88 @@ def main():
             continue
         
         start = time.time()
+        if recorder is not None:
+            recorder.frame(img)
 
-        # Preprocess Image with Letterboxing
-        padded_img, scale, (pad_top, pad_left) = preprocess_image(img, (INPUT_WIDTH, INPUT_HEIGHT))
-        
-        blob = cv2.dnn.blobFromImage(padded_img, 1/255.0, (INPUT_WIDTH, INPUT_HEIGHT), swapRB=True, crop=False)
-        net.setInput(blob)
-        
-        # Forward Pass
-        outputs = net.forward()
-        
-        # Output shape is (1, 84, 8400) -> Transpose to (1, 8400, 84)
-        outputs = np.transpose(outputs, (0, 2, 1)) 
-        
-        # Extract rows
-        rows = outputs[0]
-        
-        boxes = []
-        confidences = []
-        class_ids = []
-
-        # No need for x_factor/y_factor relative to original image here, 
-        # since we will un-pad and un-scale later based on letterboxing
-
-        for row in rows:
-            classes_scores = row[4:]
-            max_score_idx = np.argmax(classes_scores)
-            max_score = classes_scores[max_score_idx]
-            
-            if max_score >= CONF_THRESHOLD:
-                # Get box coordinates (cx, cy, w, h) relative to PADDED image
-                cx, cy, w, h = row[0], row[1], row[2], row[3]
-                
-                # Un-pad
-                cx -= pad_left
-                cy -= pad_top
-                
-                # Un-scale
-                cx /= scale
-                cy /= scale
-                w /= scale
-                h /= scale
-                
-                # Calculate top-left corner
-                left = int(cx - 0.5 * w)
-                top = int(cy - 0.5 * h)
-                width = int(w)
-                height = int(h)
-                
-                boxes.append([left, top, width, height])
-                confidences.append(float(max_score))
-                class_ids.append(max_score_idx)
-
-        # NMS
-        indices = cv2.dnn.NMSBoxes(boxes, confidences, CONF_THRESHOLD, NMS_THRESHOLD)
-
-        garbage_detected_near = False
+        mode = "detect"
         target_box = None
-        closest_dist = float('inf')
-
-        for i in indices:
-            # Depending on opencv version, i might be a list or int
-            idx = i if isinstance(i, (int, np.integer)) else i[0]
-            
-            box = boxes[idx]
-            left, top, width, height = box[0], box[1], box[2], box[3]
-            conf = confidences[idx]
-            cls_id = class_ids[idx]
-            
-            if cls_id < len(classNames):
-                currentClass = classNames[cls_id]
-                
-                # Filter for garbage classes
-                if currentClass in garbage_map:
-                    displayName = garbage_map[currentClass]
-                    
-                    # Distance Calculation
-                    # Use min(width, height) as the reference dimension for known width?
-                    # Original code used min(width, height)
-                    dim = min(width, height)
-                    distance = calculate_distance(FOCAL_LENGTH, KNOWN_WIDTH, dim)
-                    
-                    # Color Logic
-                    if distance < 20: 
-                        color = (0, 255, 0) # Green
-                        garbage_detected_near = True
-                    else:
-                        color = (0, 0, 255) # Red
-
-                    # Draw Visuals
-                    cvzone.cornerRect(img, (top, left, width, height), l=9, rt=5, colorR=color, colorC=color)
-                    
-                    text = f'{displayName} {int(distance)}cm'
-                    cvzone.putTextRect(img, text, (max(0, left), max(35, top)), scale=1.5, thickness=2, offset=5, colorR=color)
-
-                    # Track the closest target for alignment
-                    if distance < closest_dist:
-                        closest_dist = distance
-                        # Target specific data for alignment
-                        # box = [left, top, width, height]
-                        target_box = (left, top, width, height, distance)
+        overlay_targets = []
 
-        end = time.time()
-        fps = 1 / (end - start)
-        cv2.putText(img, f"FPS: {int(fps)} Model: {MODEL_TYPE.upper()} Res: {INPUT_SIZE}", (20, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 0, 0), 2)
+        # Between detector runs, follow the locked target with optical flow
+        if TRACK_MODE:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+            if tracker.active and frames_since_detect < DETECT_EVERY:
+                ok, box, track_conf = tracker.update(gray)
+                if ok and track_conf >= TRACK_MIN_CONF:
+                    mode = "track"
+                    frames_since_detect += 1
+                    left, top, width, height = box
+                    distance = calculate_distance(FOCAL_LENGTH, KNOWN_WIDTH, min(width, height))
+                    target_box = (left, top, width, height, distance)
+                    overlay_targets.append((target_label, *target_box))
 
-        cv2.imshow("Pi Garbage Detection", img)
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            base_motors.stop()
-            break
+        if mode != "track":
+            detections = None
+            if gate is not None:
+                # Static scene: reuse the last detections
+                detections, signature = gate.check(img)
+                if detections is not None:
+                    mode = "reuse"
+            if detections is None and roi_detector is not None and last_target_box and roi_runs < ROI_FULL_EVERY:
+                # Locked: only look around the last known target position
+                window = roi_window(last_target_box, (img.shape[1], img.shape[0]), ROI_MARGIN, ROI_SIZE)
+                detections = run_roi_detector(roi_detector, img, window)
+                roi_runs += 1
+                mode = "roi"
+                if not np.isin(detections["class_id"], GARBAGE_CLASS_IDS).any():
+                    detections = None  # Lost in the crop: fall back to the full frame
+            if detections is None:
+                detections = run_detector(detector, img)
+                roi_runs = 0
+                mode = "detect"
+            if gate is not None and mode != "reuse":
+                gate.update(signature, detections)
+            if recorder is not None:
+                recorder.detections(detections)
+            targets, closest = select_target(detections, sort_tracker, target_lock)
+            overlay_targets = targets
+
+            if closest:
+                target_label = closest[0]
+                target_box = closest[1:]
+
+            if TRACK_MODE:
+                frames_since_detect = 0
+                if target_box:
+                    tracker.init(gray, target_box[:4])
+                else:
+                    tracker.reset()
+
+        last_target_box = target_box
+
+        end = time.time()
+        mode_stats.add(mode, end - start)
+        if end - mode_stats.window_start >= STATS_INTERVAL:
+            print(f"📊 {mode_stats.summary()}" + (f" | {gate.summary()}" if gate is not None else ""))
+            mode_stats.reset()
 
         # === ALIGNMENT CONTROL LOGIC ===
+        status = controller.step(target_box, img.shape[1])
+
+        fps = 1 / (end - start)
+        lines = [(f"FPS: {int(fps)} ({mode}) Model: {MODEL_TYPE.upper()} Res: {INPUT_WIDTH}x{INPUT_HEIGHT}", (20, 30), 0.7, (255, 0, 0))]
         if target_box:
-            # Unpack target
-            x, y, w, h, dist = target_box
-            cx = x + w // 2
-            
-            # Determine Image Center
-            img_center_x = INPUT_WIDTH // 2 
-            
-            # Calculate Offset
-            offset = cx - img_center_x
-            
-            # Tolerance
-            CENTER_TOLERANCE = 50
-            
-            # Ranges
-            TARGET_MIN = 5
-            TARGET_MAX = 10
-            
-            status = "Idle"
-            
-            # 1. Alignment (Left/Right)
-            if abs(offset) > CENTER_TOLERANCE:
-                if offset > 0:
-                    status = "Turning Right"
-                    base_motors.right()
-                else:
-                    status = "Turning Left"
-                    base_motors.left()
-            
-            # 2. Distance Control (Forward/Backward)
-            else:
-                # Aligned horizontally, now check distance
-                if dist > TARGET_MAX:
-                    status = "Forward"
-                    base_motors.forward()
-                elif dist < TARGET_MIN:
-                    status = "Backward"
-                    base_motors.backward()
-                else:
-                    # 3. Trigger Automation
-                    status = "Aligned! Triggering..."
-                    base_motors.stop()
-                    print("✅ Target Aligned & In Range. Starting Automation.")
-                    
-                    # Double check time cooldown
-                    if time.time() - last_trigger_time > TRIGGER_COOLDOWN:
-                         try:
-                             automation_pre_test.automation_sequence()
-                             last_trigger_time = time.time()
-                             # Optional: Move back/reset after automation?
-                         except Exception as e:
-                             print(f"❌ Automation Error: {e}")
-            
-            cv2.putText(img, f"CMD: {status}", (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
-            
-        else:
-            # No target found
+            lines.append((f"CMD: {status}", (20, 60), 0.8, (0, 255, 255)))
+        if not display.show(img, (overlay_targets, lines)):
             base_motors.stop()
-
+            break
 
     cap.release()
-    cv2.destroyAllWindows()
+    display.close()
 
 if __name__ == "__main__":
-    main()
+    try:
+        main()
+    except KeyboardInterrupt:
+        # Headless runs are stopped with Ctrl+C
+        base_motors.stop()
@@ -0,0 +1,173 @@
+import bisect
+import contextlib
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Latency buckets in seconds (1 ms .. 10 s); covers a ~1 ms NMS call up to a
+# multi-second lift move
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount=1):
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        return [("", {}, self.value)]
+
+
+class Gauge:
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        # A single assignment, no lock needed
+        self.value = float(value)
+
+    def samples(self):
+        return [("", {}, self.value)]
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. observe() is one bisect and three additions
+    under a lock, cheap enough for every frame.
+    """
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.sum += seconds
+            self.count += 1
+
+    @contextlib.contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self):
+        with self.lock:
+            counts, total, count = list(self.counts), self.sum, self.count
+        out = []
+        cumulative = 0
+        for bound, n in zip(self.buckets + (float("inf"),), counts):
+            cumulative += n
+            out.append(("_bucket", {"le": "+Inf" if bound == float("inf") else repr(bound)}, cumulative))
+        out.append(("_sum", {}, total))
+        out.append(("_count", {}, count))
+        return out
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for v in labels.values())
+    return "{" + ",".join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + "}"
+
+
+class Registry:
+    """
+    Metric families by name (counters end in _total), one series per label set, e.g.
+    histogram("stage_seconds", "...", stage="forward"). Asking again for the
+    same name and labels returns the existing series, so call sites can look
+    their series up once at import and keep the reference.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.families = {}  # name -> (type, help, {label tuple: metric})
+
+    def _series(self, kind, factory, name, help_text, labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            family = self.families.setdefault(name, (kind, help_text, {}))
+            if family[0] != kind:
+                raise ValueError(f"Metric {name} already registered as a {family[0]}")
+            series = family[2]
+            if key not in series:
+                series[key] = factory()
+            return series[key]
+
+    def counter(self, name, help_text, **labels):
+        return self._series("counter", Counter, name, help_text, labels)
+
+    def gauge(self, name, help_text, **labels):
+        return self._series("gauge", Gauge, name, help_text, labels)
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS, **labels):
+        return self._series("histogram", lambda: Histogram(buckets), name, help_text, labels)
+
+    def render(self):
+        """
+        Returns: all metrics in the Prometheus text exposition format
+        """
+        with self.lock:
+            families = [(name, kind, help_text, list(series.items()))
+                        for name, (kind, help_text, series) in sorted(self.families.items())]
+        lines = []
+        for name, kind, help_text, series in families:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, metric in series:
+                for suffix, extra, value in metric.samples():
+                    lines.append(f"{name}{suffix}{_format_labels({**dict(key), **extra})} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+
+
+def stage_timer(stage):
+    """
+    Returns: the processing stage latency histogram for stage, e.g. "forward"
+    """
+    return histogram("wastexpert_stage_seconds", "Processing stage latency in seconds.", stage=stage)
+
+
+def serve(port, host="127.0.0.1", registry=REGISTRY):
+    """
+    Serves GET /metrics on a daemon thread.
+    host "0.0.0.0" makes it reachable from other machines (e.g. a Prometheus
+    server on the laptop scraping the Pi).
+    Returns: the running ThreadingHTTPServer
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # No per-scrape console output
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics")
+    thread.daemon = True
+    thread.start()
+    print(f"📈 Metrics on http://{host}:{port}/metrics")
+    return server
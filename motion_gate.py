@@ -0,0 +1,71 @@
+import time
+import numpy as np
+import cv2
+
+from metrics import counter
+
+# Defaults (main_pi.py / laptop_main.py pass their own)
+THRESHOLD = 0.01       # fraction of pixels that must change to re-run inference
+PIXEL_DELTA = 15       # grey levels a pixel must change by to count as changed
+MAX_AGE = 1.0          # seconds a cached result may be reused
+GATE_SIZE = (80, 60)   # comparison resolution; also averages out sensor noise
+
+INFERRED = counter("wastexpert_motion_gate_frames_total", "Frames by motion gate outcome.", result="inferred")
+SKIPPED = counter("wastexpert_motion_gate_frames_total", "Frames by motion gate outcome.", result="skipped")
+
+
+class MotionGate:
+    """
+    Skips inference while the scene is static.
+    check(img) compares a downscaled grayscale copy of img with the frame the
+    cached detections came from (not the previous frame, so slow changes
+    still add up) and returns the cached detections when few enough pixels
+    changed and the cache is younger than max_age. After an inference the
+    caller stores the result with update().
+    check() and update() may run on different threads (pipelined loop).
+    """
+    def __init__(self, threshold=THRESHOLD, pixel_delta=PIXEL_DELTA, max_age=MAX_AGE, size=GATE_SIZE):
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.max_age = max_age
+        self.size = size
+        self.reference = None  # (signature, detections, time), replaced as a whole
+        self.frames = 0
+        self.skipped = 0
+
+    def signature(self, img):
+        small = cv2.resize(img, self.size, interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return small
+
+    def changed_fraction(self, signature, reference):
+        diff = cv2.absdiff(signature, reference)
+        return np.count_nonzero(diff > self.pixel_delta) / diff.size
+
+    def check(self, img):
+        """
+        Returns: (cached detections or None, signature to pass to update())
+        """
+        signature = self.signature(img)
+        self.frames += 1
+        reference = self.reference
+        if (reference is not None and time.time() - reference[2] < self.max_age
+                and signature.shape == reference[0].shape
+                and self.changed_fraction(signature, reference[0]) <= self.threshold):
+            self.skipped += 1
+            SKIPPED.inc()
+            return reference[1], signature
+        INFERRED.inc()
+        return None, signature
+
+    def update(self, signature, detections):
+        self.reference = (signature, detections, time.time())
+
+    def reset(self):
+        # e.g. after the robot moved without frames being processed
+        self.reference = None
+
+    def summary(self):
+        ratio = self.skipped / self.frames if self.frames else 0.0
+        return f"motion gate skipped {self.skipped}/{self.frames} ({100 * ratio:.0f}%)"
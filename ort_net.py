@@ -0,0 +1,36 @@
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+# Graph optimization levels by name ("all" fuses the most, e.g. Conv+Add+Relu)
+OPTIMIZATION_LEVELS = {
+    "disable": "ORT_DISABLE_ALL",
+    "basic": "ORT_ENABLE_BASIC",
+    "extended": "ORT_ENABLE_EXTENDED",
+    "all": "ORT_ENABLE_ALL",
+}
+
+class OrtNet:
+    """
+    onnxruntime CPU session behind the cv2.dnn Net setInput()/forward()
+    interface, so the detection loops can run models OpenCV DNN handles
+    poorly (e.g. INT8 QDQ models from quantize_model.py) without changes.
+    """
+    def __init__(self, path, threads=0, optimization="all"):
+        if ort is None:
+            raise ImportError("onnxruntime is required for this model: pip install onnxruntime")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, OPTIMIZATION_LEVELS[optimization])
+        if threads:
+            # 0 = onnxruntime default (one thread per physical core)
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.blob = None
+
+    def setInput(self, blob):
+        self.blob = blob
+
+    def forward(self):
+        return self.session.run(None, {self.input_name: self.blob})[0]
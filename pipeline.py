@@ -0,0 +1,181 @@
+import queue
+import threading
+import time
+
+
+class LatestQueue:
+    """
+    Bounded queue with drop-oldest semantics: put() never blocks, it evicts the
+    oldest item instead, so consumers always work on the freshest data.
+    on_drop(item) is called for every evicted item (e.g. to recycle buffers).
+    """
+    def __init__(self, maxsize=1, on_drop=None):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.items = []
+        self.cond = threading.Condition()
+        self.dropped = 0
+
+    def put(self, item):
+        evicted = []
+        with self.cond:
+            self.items.append(item)
+            while len(self.items) > self.maxsize:
+                evicted.append(self.items.pop(0))
+                self.dropped += 1
+            self.cond.notify()
+        if self.on_drop:
+            for old in evicted:
+                self.on_drop(old)
+
+    def get(self, timeout=None):
+        """
+        Returns: the oldest queued item, or None on timeout
+        """
+        with self.cond:
+            if not self.items:
+                self.cond.wait(timeout)
+            if not self.items:
+                return None
+            return self.items.pop(0)
+
+
+class FanOut:
+    """
+    One producer, several consumers: put() hands each item to every
+    subscriber's own LatestQueue, so a slow subscriber only drops its own
+    items and never holds up the others.
+    shared=True distributes instead: all subscribers take from one queue and
+    each item goes to exactly one of them (waiting consumers in turn).
+    active is set while there is at least one subscriber.
+    """
+    def __init__(self, maxsize=1, on_drop=None, shared=False):
+        self.maxsize = maxsize
+        self.on_drop = on_drop
+        self.shared = LatestQueue(maxsize, on_drop) if shared else None
+        self.subscribers = []
+        self.lock = threading.Lock()
+        self.active = threading.Event()
+
+    def subscribe(self):
+        """
+        Returns: the LatestQueue to take items from
+        """
+        with self.lock:
+            if self.shared is not None:
+                if not self.subscribers:
+                    # Nothing left over from before the first subscriber
+                    while self.shared.get(timeout=0) is not None:
+                        pass
+                q = self.shared
+            else:
+                q = LatestQueue(self.maxsize, self.on_drop)
+            self.subscribers.append(q)
+            self.active.set()
+            return q
+
+    def unsubscribe(self, q):
+        with self.lock:
+            self.subscribers.remove(q)
+            if not self.subscribers:
+                self.active.clear()
+
+    def put(self, item):
+        if self.shared is not None:
+            self.shared.put(item)
+            return
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for q in subscribers:
+            q.put(item)
+
+    def __len__(self):
+        return len(self.subscribers)
+
+
+class StageStats:
+    """
+    Per-stage latency counters (thread-safe).
+    """
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+    def add(self, seconds):
+        with self.lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def summary(self):
+        with self.lock:
+            if not self.count:
+                return f"{self.name}: -"
+            return f"{self.name}: {1000 * self.total / self.count:.1f}/{1000 * self.max:.0f} ms (avg/max) x{self.count}"
+
+
+class Stage:
+    """
+    Worker thread: takes items from in_queue, applies fn and puts the result
+    on out_queue. fn may return None to drop the item.
+    """
+    def __init__(self, name, fn, in_queue, out_queue=None):
+        self.name = name
+        self.fn = fn
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stats = StageStats(name)
+        self.stopped = False
+        self.thread = threading.Thread(target=self.run, name=name)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped:
+            item = self.in_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            start = time.perf_counter()
+            try:
+                result = self.fn(item)
+            except Exception as e:
+                print(f"❌ {self.name} stage error: {e}")
+                continue
+            self.stats.add(time.perf_counter() - start)
+            if result is not None and self.out_queue is not None:
+                self.out_queue.put(result)
+
+    def stop(self):
+        self.stopped = True
+        if self.thread.is_alive():
+            self.thread.join(timeout=1.0)
+
+
+class BufferPool:
+    """
+    Fixed set of reusable objects (e.g. Letterbox blobs) handed out and
+    returned explicitly, so a buffer is never rewritten while still in use.
+    """
+    def __init__(self, factory, size):
+        self.free = queue.Queue()
+        for _ in range(size):
+            self.free.put(factory())
+
+    def acquire(self, timeout=None):
+        try:
+            return self.free.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def release(self, buffer):
+        self.free.put(buffer)
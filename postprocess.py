@@ -0,0 +1,170 @@
+import time
+import cv2
+import numpy as np
+
+from metrics import stage_timer
+
+# ================= DETECTION RECORD =================
+# One row per kept detection, boxes already mapped back to the camera image.
+DETECTION_DTYPE = np.dtype([
+    ("left", np.int32),
+    ("top", np.int32),
+    ("width", np.int32),
+    ("height", np.int32),
+    ("conf", np.float32),
+    ("class_id", np.int32),
+])
+
+# Detections of several cameras in one array (Detector.detect_batch), camera
+# = index of the frame in the batch
+CAMERA_DETECTION_DTYPE = np.dtype(DETECTION_DTYPE.descr + [("camera", np.int32)])
+
+# Pre-NMS cap: cluttered scenes can leave thousands of anchors above threshold
+TOP_K = 300
+
+# Boxes of different classes are shifted this far apart so one NMS call
+# never suppresses across classes (must exceed any image coordinate)
+CLASS_OFFSET = 4096
+
+# Part of the "decode" stage, tracked separately
+NMS_SECONDS = stage_timer("nms")
+
+
+def empty_detections():
+    return np.zeros(0, dtype=DETECTION_DTYPE)
+
+
+def tag_camera(detections, camera):
+    """
+    Returns: detections as CAMERA_DETECTION_DTYPE with camera set
+    """
+    tagged = np.empty(detections.size, dtype=CAMERA_DETECTION_DTYPE)
+    for name in DETECTION_DTYPE.names:
+        tagged[name] = detections[name]
+    tagged["camera"] = camera
+    return tagged
+
+
+def split_cameras(detections, cameras):
+    """
+    Returns: one DETECTION_DTYPE array per camera 0..cameras-1
+    """
+    out = []
+    for camera in range(cameras):
+        mask = detections["camera"] == camera
+        own = np.empty(int(mask.sum()), dtype=DETECTION_DTYPE)
+        for name in DETECTION_DTYPE.names:
+            own[name] = detections[name][mask]
+        out.append(own)
+    return out
+
+
+def build_class_filter(class_names, garbage_map, category_thresholds=None, default_threshold=0.25):
+    """
+    Builds the column subset for garbage-only decoding.
+    category_thresholds: {display name: threshold}, e.g. {"Organic": 0.4}.
+    Returns: (class_ids, thresholds) arrays aligned by position.
+    """
+    category_thresholds = category_thresholds or {}
+    class_ids = []
+    thresholds = []
+    for cls_id, name in enumerate(class_names):
+        if name in garbage_map:
+            class_ids.append(cls_id)
+            thresholds.append(category_thresholds.get(garbage_map[name], default_threshold))
+    return np.array(class_ids, dtype=np.int64), np.array(thresholds, dtype=np.float32)
+
+
+def decode_yolov8(outputs, scale=1.0, pad=(0, 0), conf_threshold=0.25,
+                  nms_threshold=0.45, top_k=TOP_K, class_ids=None, class_thresholds=None):
+    """
+    Decodes a raw YOLOv8 output tensor of shape (1, 4 + num_classes, num_anchors)
+    with array operations instead of a per-row loop.
+    scale: letterbox scale, or (scale_x, scale_y) for a stretched resize.
+    pad: (pad_top, pad_left) added by letterboxing.
+    class_ids: optional class columns to score; all other classes are never considered.
+    class_thresholds: optional per-class thresholds aligned with class_ids.
+    Returns: structured array of DETECTION_DTYPE, highest confidence first.
+    """
+    preds = outputs[0]
+    if class_ids is None:
+        scores = preds[4:]
+    else:
+        scores = preds[4 + np.asarray(class_ids)]
+
+    # Best class score per anchor, then drop everything below threshold
+    if class_thresholds is not None:
+        class_thresholds = np.asarray(class_thresholds)
+        conf_threshold = float(class_thresholds.min())
+    confs = scores.max(axis=0)
+    keep = np.flatnonzero(confs >= conf_threshold)
+
+    # Per-class thresholds only need the argmax of the few surviving anchors
+    if class_thresholds is not None and keep.size:
+        best_cls = scores[:, keep].argmax(axis=0)
+        keep = keep[confs[keep] >= class_thresholds[best_cls]]
+    if keep.size == 0:
+        return empty_detections()
+
+    # Pre-NMS top-k cap
+    if top_k and keep.size > top_k:
+        best = np.argpartition(confs[keep], -top_k)[-top_k:]
+        keep = keep[best]
+
+    confs = confs[keep]
+    labels = scores[:, keep].argmax(axis=0)
+    if class_ids is not None:
+        labels = np.asarray(class_ids)[labels]
+
+    # Un-pad and un-scale all boxes together
+    if np.isscalar(scale):
+        scale_x = scale_y = scale
+    else:
+        scale_x, scale_y = scale
+    pad_top, pad_left = pad
+
+    cx, cy, w, h = preds[:4, keep]
+    cx = (cx - pad_left) / scale_x
+    cy = (cy - pad_top) / scale_y
+    w = w / scale_x
+    h = h / scale_y
+
+    boxes = np.empty((keep.size, 4), dtype=np.int32)
+    boxes[:, 0] = cx - 0.5 * w
+    boxes[:, 1] = cy - 0.5 * h
+    boxes[:, 2] = w
+    boxes[:, 3] = h
+
+    # Class-aware NMS in a single call
+    nms_boxes = boxes.copy()
+    nms_boxes[:, 0] += labels * CLASS_OFFSET
+    nms_boxes[:, 1] += labels * CLASS_OFFSET
+    start = time.perf_counter()
+    indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confs.tolist(), conf_threshold, nms_threshold)
+    NMS_SECONDS.observe(time.perf_counter() - start)
+    indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+
+    detections = np.empty(indices.size, dtype=DETECTION_DTYPE)
+    detections["left"] = boxes[indices, 0]
+    detections["top"] = boxes[indices, 1]
+    detections["width"] = boxes[indices, 2]
+    detections["height"] = boxes[indices, 3]
+    detections["conf"] = confs[indices]
+    detections["class_id"] = labels[indices]
+    return detections
+
+
+def decode_darknet(outputs, input_size, scale=1.0, pad=(0, 0), **kwargs):
+    """
+    Decodes OpenCV Darknet YOLO outputs (one (num_boxes, 5 + num_classes)
+    array per output layer, boxes normalized to the network input, class
+    scores already multiplied by objectness) by reshaping them into the
+    YOLOv8 layout and reusing decode_yolov8.
+    input_size: (width, height) of the network input.
+    Returns: structured array of DETECTION_DTYPE, highest confidence first.
+    """
+    preds = np.concatenate([out.reshape(-1, out.shape[-1]) for out in outputs])
+    in_w, in_h = input_size
+    boxes = preds[:, :4] * np.array([in_w, in_h, in_w, in_h], dtype=np.float32)
+    stacked = np.concatenate([boxes, preds[:, 5:]], axis=1).T[np.newaxis]
+    return decode_yolov8(stacked, scale, pad, **kwargs)
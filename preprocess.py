@@ -0,0 +1,132 @@
+import math
+import cv2
+import numpy as np
+
+# YOLOv8 downsamples by 32, so network inputs must be multiples of it
+STRIDE = 32
+
+
+def rect_input_size(frame_size, long_side, stride=STRIDE):
+    """
+    Smallest stride-aligned (width, height) with the given long side that
+    holds the frame's aspect ratio, e.g. (640, 480) -> 640x480 or 416x320.
+    """
+    w, h = frame_size
+    scale = long_side / max(w, h)
+    return (math.ceil(w * scale / stride) * stride,
+            math.ceil(h * scale / stride) * stride)
+
+
+def roi_window(box, frame_size, margin=1.0, min_side=0):
+    """
+    Square crop around box (left, top, width, height) extended by margin box
+    sizes on every side, at least min_side wide, clamped to the frame.
+    Returns: (x0, y0, x1, y1)
+    """
+    left, top, width, height = box[:4]
+    frame_w, frame_h = frame_size
+    side = max(width, height) * (1 + 2 * margin)
+    side = int(min(max(side, min_side), frame_w, frame_h))
+
+    cx, cy = left + width / 2, top + height / 2
+    x0 = int(min(max(cx - side / 2, 0), frame_w - side))
+    y0 = int(min(max(cy - side / 2, 0), frame_h - side))
+    return x0, y0, x0 + side, y0 + side
+
+
+class Letterbox:
+    """
+    Letterbox + blob stage that reuses its buffers every frame.
+    The frame is resized into a persistent buffer and written, normalized and
+    RB-swapped, straight into the padded region of a persistent NCHW float32 blob.
+    The constant border is filled once, whenever the frame size changes.
+    blob: optional (1, 3, H, W) view to write into, e.g. one slot of a batch.
+    """
+    def __init__(self, input_size, frame_size=None, pad_value=0, blob=None):
+        # input_size / frame_size are (width, height)
+        self.input_width, self.input_height = input_size
+        self.pad_value = pad_value
+        if blob is None:
+            blob = np.empty((1, 3, self.input_height, self.input_width), dtype=np.float32)
+        self.blob = blob
+        self.frame_size = None
+        if frame_size is not None:
+            self.configure(frame_size)
+
+    def configure(self, frame_size):
+        w, h = frame_size
+        self.scale = min(self.input_width / w, self.input_height / h)
+        nw, nh = int(w * self.scale), int(h * self.scale)
+        self.resized_size = (nw, nh)
+        self.pad_top = (self.input_height - nh) // 2
+        self.pad_left = (self.input_width - nw) // 2
+
+        self.resized = np.empty((nh, nw, 3), dtype=np.uint8)
+        self.planes = [np.empty((nh, nw), dtype=np.uint8) for _ in range(3)]
+
+        # Border is constant, only the image region is rewritten per frame
+        self.blob.fill(self.pad_value / 255.0)
+        top, left = self.pad_top, self.pad_left
+        self.rois = [self.blob[0, c, top:top + nh, left:left + nw] for c in range(3)]
+        self.frame_size = (w, h)
+
+    def prepare(self, img):
+        """
+        Writes img into the blob.
+        Returns: blob, scale, (pad_top, pad_left)
+        """
+        h, w = img.shape[:2]
+        if self.frame_size != (w, h):
+            self.configure((w, h))
+
+        if self.resized_size == (w, h):
+            src = img
+        else:
+            src = cv2.resize(img, self.resized_size, dst=self.resized)
+
+        # BGR planes in reverse order -> RGB channels, scaled to [0, 1]
+        cv2.split(src, self.planes)
+        for roi, plane in zip(self.rois, reversed(self.planes)):
+            cv2.multiply(plane, 1 / 255.0, dst=roi, dtype=cv2.CV_32F)
+
+        return self.blob, self.scale, (self.pad_top, self.pad_left)
+
+
+class BatchLetterbox:
+    """
+    One Letterbox per camera, each writing into its own slot of a persistent
+    (N, 3, H, W) blob, so the frames are stacked without an extra copy.
+    """
+    def __init__(self, input_size, batch_size, frame_size=None, pad_value=0):
+        width, height = input_size
+        self.blob = np.empty((batch_size, 3, height, width), dtype=np.float32)
+        self.slots = [Letterbox(input_size, frame_size, pad_value, blob=self.blob[i:i + 1])
+                      for i in range(batch_size)]
+
+    def prepare(self, imgs):
+        """
+        Writes imgs[i] into batch slot i.
+        Returns: blob, [scale per image], [(pad_top, pad_left) per image]
+        """
+        scales, pads = [], []
+        for slot, img in zip(self.slots, imgs):
+            _, scale, pad = slot.prepare(img)
+            scales.append(scale)
+            pads.append(pad)
+        return self.blob, scales, pads
+
+
+class Stretch:
+    """
+    Plain resize to input_size without padding, for models trained on
+    stretched images (Darknet YOLOv4-tiny).
+    prepare() follows the Letterbox contract: (blob, (scale_x, scale_y), (0, 0)).
+    """
+    def __init__(self, input_size, frame_size=None):
+        self.input_size = tuple(input_size)
+
+    def prepare(self, img):
+        h, w = img.shape[:2]
+        in_w, in_h = self.input_size
+        blob = cv2.dnn.blobFromImage(img, 1 / 255.0, self.input_size, swapRB=True, crop=False)
+        return blob, (in_w / w, in_h / h), (0, 0)
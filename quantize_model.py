@@ -0,0 +1,175 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+import cv2
+
+from preprocess import Letterbox
+from postprocess import decode_yolov8
+from sort_tracker import iou_matrix
+from ort_net import OrtNet, ort
+from setup_dataset import DATASET_ROOT
+
+# Configuration
+MODEL_FILE = "yolov8n.onnx"
+INPUT_SIZE = 640          # Only for models with dynamic input dims; otherwise read from the model
+CALIBRATION_IMAGES = 100
+HOLDOUT_FRACTION = 0.2    # Held out from images/train when images/val is empty
+CONF_THRESHOLD = 0.25
+NMS_THRESHOLD = 0.45
+MATCH_IOU = 0.5           # Detections agree if same class and IoU >= this
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+def list_images(folder):
+    if not os.path.isdir(folder):
+        return []
+    return sorted(os.path.join(folder, f) for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+def split_dataset(root):
+    """
+    Calibrates on images/train and evaluates on images/val (the layout
+    setup_dataset.py creates). setup_dataset.py currently validates on train,
+    so when images/val is empty the tail of train is held out instead.
+    Returns: (calibration images, held-out images)
+    """
+    train = list_images(os.path.join(root, "images", "train"))
+    val = list_images(os.path.join(root, "images", "val"))
+    if not val:
+        split = int(len(train) * (1 - HOLDOUT_FRACTION))
+        train, val = train[:split], train[split:]
+    return train[:CALIBRATION_IMAGES], val
+
+def model_input_size(model_path):
+    """
+    Returns: (width, height) of the model's NCHW input, INPUT_SIZE for dynamic dims
+    """
+    shape = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].shape
+    height, width = (d if isinstance(d, int) and d > 0 else INPUT_SIZE for d in shape[2:4])
+    return width, height
+
+def load_blob(letterbox, path):
+    img = cv2.imread(path)
+    if img is None:
+        return None, None
+    blob, scale, pad = letterbox.prepare(img)
+    # The letterbox reuses its blob, so hand out a copy
+    return blob.copy(), (scale, pad)
+
+def quantize(model_path, output_path, images):
+    from onnxruntime.quantization import (CalibrationDataReader, CalibrationMethod, QuantFormat,
+                                          QuantType, quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    class LetterboxReader(CalibrationDataReader):
+        def __init__(self):
+            self.letterbox = Letterbox(model_input_size(model_path))
+            self.input_name = ort.InferenceSession(model_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+            self.paths = iter(images)
+
+        def get_next(self):
+            for path in self.paths:
+                blob, _ = load_blob(self.letterbox, path)
+                if blob is not None:
+                    return {self.input_name: blob}
+            return None
+
+    # Shape inference + graph cleanup first, as onnxruntime recommends
+    tmp_dir = tempfile.mkdtemp()
+    prepared_path = os.path.join(tmp_dir, "prepared.onnx")
+    quant_pre_process(model_path, prepared_path, skip_symbolic_shape=True)
+
+    # Only convolutions/matmuls are quantized; the detection head (concat,
+    # sigmoid, box decode) stays float so scores and boxes keep their range
+    quantize_static(prepared_path, output_path, LetterboxReader(),
+                    quant_format=QuantFormat.QDQ,
+                    op_types_to_quantize=["Conv", "MatMul"],
+                    per_channel=True,
+                    activation_type=QuantType.QUInt8,
+                    weight_type=QuantType.QInt8,
+                    calibrate_method=CalibrationMethod.MinMax)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+def match_detections(reference, candidate):
+    """
+    Greedy same-class IoU matching.
+    Returns: (matched count, IoUs of the matches)
+    """
+    if len(reference) == 0 or len(candidate) == 0:
+        return 0, []
+    ref_boxes = np.stack([reference[k] for k in ("left", "top", "width", "height")], axis=1).astype(np.float64)
+    cand_boxes = np.stack([candidate[k] for k in ("left", "top", "width", "height")], axis=1).astype(np.float64)
+    iou = iou_matrix(ref_boxes, cand_boxes)
+    iou[reference["class_id"][:, None] != candidate["class_id"][None, :]] = 0
+
+    ious = []
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < MATCH_IOU:
+            break
+        ious.append(iou[i, j])
+        iou[i, :] = 0
+        iou[:, j] = 0
+    return len(ious), ious
+
+def evaluate(fp32_path, int8_path, images):
+    nets = {"fp32": OrtNet(fp32_path), "int8": OrtNet(int8_path)}
+    letterbox = Letterbox(model_input_size(fp32_path))
+    latency = {name: [] for name in nets}
+    counts = {name: 0 for name in nets}
+    matched = 0
+    ious = []
+
+    for path in images:
+        blob, meta = load_blob(letterbox, path)
+        if blob is None:
+            continue
+        detections = {}
+        for name, net in nets.items():
+            net.setInput(blob)
+            start = time.perf_counter()
+            outputs = net.forward()
+            latency[name].append(time.perf_counter() - start)
+            detections[name] = decode_yolov8(outputs, meta[0], meta[1], CONF_THRESHOLD, NMS_THRESHOLD)
+            counts[name] += len(detections[name])
+        n, matched_ious = match_detections(detections["fp32"], detections["int8"])
+        matched += n
+        ious.extend(matched_ious)
+
+    print(f"\nHeld-out images: {len(latency['fp32'])}")
+    for name in nets:
+        # First run includes session warm-up
+        ms = 1000 * np.median(latency[name][1:] or latency[name])
+        print(f"  {name}: median forward {ms:.1f} ms, {counts[name]} detections")
+    recall = matched / counts["fp32"] if counts["fp32"] else 1.0
+    precision = matched / counts["int8"] if counts["int8"] else 1.0
+    mean_iou = float(np.mean(ious)) if ious else 0.0
+    print(f"  Agreement with FP32: recall {recall:.1%}, precision {precision:.1%}, mean IoU {mean_iou:.3f}")
+
+if __name__ == "__main__":
+    # Usage: python quantize_model.py [model.onnx] [dataset_root]
+    model_path = sys.argv[1] if len(sys.argv) > 1 else MODEL_FILE
+    dataset_root = sys.argv[2] if len(sys.argv) > 2 else DATASET_ROOT
+    output_path = model_path.replace(".onnx", "_int8.onnx")
+
+    if ort is None:
+        print("Please install onnxruntime first: pip install onnxruntime")
+        sys.exit(1)
+    if not os.path.exists(model_path):
+        print(f"Error: {model_path} does not exist.")
+        sys.exit(1)
+
+    calibration, holdout = split_dataset(dataset_root)
+    if not calibration:
+        print(f"Error: no images found under {os.path.join(dataset_root, 'images')}.")
+        sys.exit(1)
+
+    print(f"Calibrating on {len(calibration)} images from {dataset_root}...")
+    quantize(model_path, output_path, calibration)
+    print(f"Saved {output_path}")
+
+    if holdout:
+        evaluate(model_path, output_path, holdout)
+    else:
+        print("No held-out images, skipping evaluation.")
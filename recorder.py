@@ -0,0 +1,340 @@
+import glob
+import json
+import mmap
+import os
+import queue
+import struct
+import sys
+import threading
+import time
+import numpy as np
+import cv2
+
+from postprocess import DETECTION_DTYPE
+
+# ================= FILE FORMAT =================
+# A session is a directory of segments. seg_000000.rec holds records
+# back to back: RECORD_HEADER (wall-clock time, kind, payload length), then
+# the payload. seg_000000.idx holds one INDEX_DTYPE row per record, so a
+# reader can binary-search by time without scanning the segment.
+RECORD_HEADER = struct.Struct("<dBI")
+INDEX_DTYPE = np.dtype([
+    ("t", "<f8"),
+    ("kind", "u1"),
+    ("offset", "<u8"),   # of the record header within the segment
+    ("length", "<u4"),   # payload bytes
+])
+
+# Record kinds
+FRAME = 1       # raw BGR image: "<HHB" height, width, channels + pixels
+JPEG = 2        # encoded JPEG bytes
+DETECTIONS = 3  # postprocess.DETECTION_DTYPE array
+COMMAND = 4     # base_motors command name, utf-8
+SENSOR = 5      # {"name": ..., "value": ...} as JSON
+KIND_NAMES = {FRAME: "frame", JPEG: "jpeg", DETECTIONS: "detections", COMMAND: "command", SENSOR: "sensor"}
+FRAME_HEADER = struct.Struct("<HHB")
+
+# ================= WRITER CONFIGURATION =================
+SEGMENT_BYTES = 256 * 1024 * 1024  # start a new segment after this many bytes
+QUEUE_SIZE = 256                   # records waiting for the writer thread
+MAX_QUEUED_FRAMES = 8              # frames beyond this are dropped, events are kept
+FLUSH_INTERVAL = 1.0               # seconds; at most this much is lost on a crash
+JPEG_QUALITY = 80                  # frames are JPEG-encoded on the writer thread (None = raw)
+
+
+def segment_paths(path, number):
+    base = os.path.join(path, f"seg_{number:06d}")
+    return base + ".rec", base + ".idx"
+
+
+class Recorder:
+    """
+    Append-only session recorder for field runs.
+    The record methods only copy/enqueue and never block the caller: the
+    writer thread encodes and writes. When the writer falls behind, frames
+    are dropped first (MAX_QUEUED_FRAMES), other records once the queue is
+    full; `dropped` counts both.
+    """
+    def __init__(self, path, jpeg_quality=JPEG_QUALITY, segment_bytes=SEGMENT_BYTES):
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.jpeg_quality = jpeg_quality
+        self.segment_bytes = segment_bytes
+        self.queue = queue.Queue(QUEUE_SIZE)
+        self.lock = threading.Lock()
+        self.queued_frames = 0
+        self.dropped = 0
+        self.written = 0
+        # Continue after existing segments (e.g. a restarted session)
+        self.segment = len(glob.glob(os.path.join(path, "seg_*.rec")))
+        self.rec = None
+        self.idx = None
+        self.thread = threading.Thread(target=self.run, name="recorder")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _put(self, t, kind, payload, is_frame=False):
+        item = (time.time() if t is None else t, kind, payload)
+        with self.lock:
+            if is_frame and self.queued_frames >= MAX_QUEUED_FRAMES:
+                self.dropped += 1
+                return
+            try:
+                self.queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return
+            if is_frame:
+                self.queued_frames += 1
+
+    def frame(self, img, t=None):
+        # Copied: the caller may draw on or reuse img while it is queued
+        self._put(t, FRAME, img.copy(), is_frame=True)
+
+    def jpeg(self, data, t=None):
+        # Already-encoded frame (e.g. the buffer rpi_main.py streams)
+        self._put(t, JPEG, bytes(data), is_frame=True)
+
+    def detections(self, detections, t=None):
+        self._put(t, DETECTIONS, np.ascontiguousarray(detections, dtype=DETECTION_DTYPE).tobytes())
+
+    def command(self, name, t=None):
+        self._put(t, COMMAND, name.encode("utf-8"))
+
+    def sensor(self, name, value, t=None):
+        self._put(t, SENSOR, json.dumps({"name": name, "value": value}).encode("utf-8"))
+
+    def _open_segment(self):
+        self._close_segment()
+        rec_path, idx_path = segment_paths(self.path, self.segment)
+        self.segment += 1
+        self.rec = open(rec_path, "ab")
+        self.idx = open(idx_path, "ab")
+
+    def _close_segment(self):
+        if self.rec is not None:
+            self.rec.close()
+            self.idx.close()
+            self.rec = self.idx = None
+
+    def _encode(self, kind, payload):
+        if kind != FRAME:
+            return kind, payload
+        with self.lock:
+            self.queued_frames -= 1
+        if self.jpeg_quality is not None:
+            ok, buf = cv2.imencode(".jpg", payload, [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality])
+            if ok:
+                return JPEG, buf.tobytes()
+        h, w = payload.shape[:2]
+        c = payload.shape[2] if payload.ndim == 3 else 1
+        return FRAME, FRAME_HEADER.pack(h, w, c) + payload.tobytes()
+
+    def _write(self, t, kind, payload):
+        if self.rec is None or self.rec.tell() >= self.segment_bytes:
+            self._open_segment()
+        offset = self.rec.tell()
+        self.rec.write(RECORD_HEADER.pack(t, kind, len(payload)))
+        self.rec.write(payload)
+        entry = np.array([(t, kind, offset, len(payload))], dtype=INDEX_DTYPE)
+        self.idx.write(entry.tobytes())
+        self.written += 1
+
+    def run(self):
+        last_flush = time.time()
+        while True:
+            try:
+                item = self.queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                break
+            if item:
+                t, kind, payload = item
+                kind, payload = self._encode(kind, payload)
+                try:
+                    self._write(t, kind, payload)
+                except OSError as e:
+                    print(f"Recorder write failed: {e}")
+            if self.rec is not None and time.time() - last_flush >= FLUSH_INTERVAL:
+                self.rec.flush()
+                self.idx.flush()
+                last_flush = time.time()
+        self._close_segment()
+
+    def close(self):
+        # Writes everything still queued, then closes the segment
+        if not self.thread.is_alive():
+            return
+        self.queue.put(None)
+        self.thread.join()
+        if self.dropped:
+            print(f"Recorder dropped {self.dropped} records")
+
+
+def _scan_segment(mm):
+    """
+    Rebuilds a segment index from the records themselves (index file missing
+    or behind, e.g. after a crash). Stops at the first truncated record.
+    """
+    rows = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(mm):
+        t, kind, length = RECORD_HEADER.unpack_from(mm, offset)
+        if offset + RECORD_HEADER.size + length > len(mm):
+            break
+        rows.append((t, kind, offset, length))
+        offset += RECORD_HEADER.size + length
+    return np.array(rows, dtype=INDEX_DTYPE)
+
+
+class Recording:
+    """
+    Reader for a Recorder session directory. Segments are memory-mapped and
+    the per-segment indexes merged into one time-sorted index, so seek(t) is
+    a binary search and reading a record only touches its own pages.
+    Decoded frames and detections are copies (safe to keep after close()).
+    """
+    def __init__(self, path):
+        self.path = path
+        self.files = []
+        self.maps = []
+        indexes = []
+        for rec_path in sorted(glob.glob(os.path.join(path, "seg_*.rec"))):
+            if os.path.getsize(rec_path) == 0:
+                continue
+            f = open(rec_path, "rb")
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            idx_path = rec_path[:-len(".rec")] + ".idx"
+            index = np.fromfile(idx_path, dtype=INDEX_DTYPE) if os.path.exists(idx_path) else np.zeros(0, INDEX_DTYPE)
+            # Drop entries past the end of the data, rescan if records are missing
+            index = index[index["offset"] + RECORD_HEADER.size + index["length"] <= len(mm)]
+            end = int(index["offset"][-1] + RECORD_HEADER.size + index["length"][-1]) if len(index) else 0
+            if end < len(mm):
+                index = _scan_segment(mm)
+            self.files.append(f)
+            self.maps.append(mm)
+            indexes.append((len(self.maps) - 1, index))
+
+        merged = np.zeros(sum(len(i) for _, i in indexes),
+                          dtype=INDEX_DTYPE.descr + [("segment", "<u4")])
+        pos = 0
+        for segment, index in indexes:
+            for name in INDEX_DTYPE.names:
+                merged[name][pos:pos + len(index)] = index[name]
+            merged["segment"][pos:pos + len(index)] = segment
+            pos += len(index)
+        # Records from several producer threads can be slightly out of time order
+        self.index = merged[np.argsort(merged["t"], kind="stable")]
+        self.frame_positions = np.flatnonzero(np.isin(self.index["kind"], (FRAME, JPEG)))
+
+    def __len__(self):
+        return len(self.index)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def start_time(self):
+        return float(self.index["t"][0]) if len(self.index) else None
+
+    @property
+    def end_time(self):
+        return float(self.index["t"][-1]) if len(self.index) else None
+
+    def seek(self, t):
+        """
+        Returns: position of the first record at or after wall-clock time t
+        """
+        return int(np.searchsorted(self.index["t"], t, side="left"))
+
+    def raw(self, i):
+        """
+        Returns: (t, kind, payload memoryview into the segment map)
+        """
+        row = self.index[i]
+        start = int(row["offset"]) + RECORD_HEADER.size
+        return float(row["t"]), int(row["kind"]), memoryview(self.maps[row["segment"]])[start:start + int(row["length"])]
+
+    def read(self, i):
+        """
+        Returns: (t, kind, value) with value decoded per kind: BGR image for
+        FRAME/JPEG, DETECTION_DTYPE array, command string or (name, value)
+        """
+        t, kind, payload = self.raw(i)
+        try:
+            if kind == FRAME:
+                h, w, c = FRAME_HEADER.unpack_from(payload)
+                img = np.frombuffer(payload[FRAME_HEADER.size:], dtype=np.uint8).reshape(h, w, c).copy()
+                return t, kind, img
+            if kind == JPEG:
+                return t, kind, cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if kind == DETECTIONS:
+                return t, kind, np.frombuffer(payload, dtype=DETECTION_DTYPE).copy()
+            if kind == COMMAND:
+                return t, kind, bytes(payload).decode("utf-8")
+            if kind == SENSOR:
+                reading = json.loads(bytes(payload).decode("utf-8"))
+                return t, kind, (reading["name"], reading["value"])
+            return t, kind, bytes(payload)
+        finally:
+            payload.release()
+
+    def records(self, start=None, end=None, kinds=None):
+        """
+        Yields (t, kind, value) for records with start <= t < end, optionally
+        only the given kinds, e.g. kinds=(COMMAND, SENSOR).
+        """
+        first = self.seek(start) if start is not None else 0
+        last = self.seek(end) if end is not None else len(self.index)
+        positions = np.arange(first, last)
+        if kinds is not None:
+            positions = positions[np.isin(self.index["kind"][first:last], kinds)]
+        for i in positions:
+            yield self.read(int(i))
+
+    def frames(self, start=None, end=None):
+        for t, _, img in self.records(start, end, kinds=(FRAME, JPEG)):
+            yield t, img
+
+    def frame_at(self, t):
+        """
+        Returns: (t, img) of the newest frame at or before t, or None
+        """
+        n = np.searchsorted(self.index["t"][self.frame_positions], t, side="right")
+        if n == 0:
+            return None
+        frame_t, _, img = self.read(int(self.frame_positions[n - 1]))
+        return frame_t, img
+
+    def close(self):
+        for mm in self.maps:
+            mm.close()
+        for f in self.files:
+            f.close()
+        self.maps = []
+        self.files = []
+
+
+def session_dir(root="recordings"):
+    return os.path.join(root, time.strftime("%Y%m%d_%H%M%S"))
+
+
+def main():
+    # Usage: python recorder.py <session dir>  (prints a summary)
+    path = sys.argv[1] if len(sys.argv) > 1 else "recordings"
+    with Recording(path) as rec:
+        if not len(rec):
+            print(f"No records in {path}")
+            return
+        kinds, counts = np.unique(rec.index["kind"], return_counts=True)
+        print(f"{path}: {len(rec)} records over {rec.end_time - rec.start_time:.1f}s")
+        for kind, count in zip(kinds, counts):
+            print(f"  {KIND_NAMES.get(int(kind), kind):<12}{count:>8}")
+
+
+if __name__ == "__main__":
+    main()
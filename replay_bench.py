@@ -0,0 +1,288 @@
+import argparse
+import ast
+import glob
+import os
+import time
+import numpy as np
+import cv2
+
+import automation_pre_test
+import base_motors
+from postprocess import build_class_filter
+from recorder import Recording
+from sort_tracker import SortTracker, TargetLock
+
+# ================= CONFIGURATION =================
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+STAGES = ["preprocess", "forward", "decode", "select", "decide", "total"]
+WARMUP = 2
+MAX_FRAMES = 300
+
+
+def iter_frames(source, limit=MAX_FRAMES):
+    """
+    Yields BGR frames from a recorder.py session, an image folder (sorted by
+    name) or a video file.
+    """
+    count = 0
+    if glob.glob(os.path.join(source, "seg_*.rec")):
+        with Recording(source) as recording:
+            for _, img in recording.frames():
+                if count >= limit:
+                    return
+                count += 1
+                yield img
+        return
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if count >= limit:
+                return
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                img = cv2.imread(os.path.join(source, name))
+                if img is not None:
+                    count += 1
+                    yield img
+        return
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Cannot open {source}")
+    try:
+        while count < limit:
+            ok, img = cap.read()
+            if not ok:
+                return
+            count += 1
+            yield img
+    finally:
+        cap.release()
+
+
+class CommandLog:
+    """
+    Collects the motor/automation commands issued while replaying, tagged with
+    the frame that caused them.
+    """
+    def __init__(self):
+        self.frame = 0
+        self.commands = []
+
+    def record(self, command):
+        self.commands.append((self.frame, command))
+
+    def per_frame(self, frames):
+        """
+        Returns: last command issued for every frame index ('-' if none)
+        """
+        out = ['-'] * frames
+        for frame, command in self.commands:
+            out[frame] = command
+        return out
+
+    def runs(self):
+        """
+        Returns: the command sequence with repeats collapsed, e.g. "LEFT x12, STOP x3, AUTO"
+        """
+        runs = []
+        for _, command in self.commands:
+            if runs and runs[-1][0] == command:
+                runs[-1][1] += 1
+            else:
+                runs.append([command, 1])
+        return ", ".join(c if n == 1 else f"{c} x{n}" for c, n in runs)
+
+
+class PiProfile:
+    """
+    main_pi.py full-frame path: detector, decode_settings(), select_target()
+    and AlignmentController, with base_motors and the pickup automation
+    replaced by the command log. ROI re-detection and optical-flow tracking
+    (serial loop only) are not replayed.
+    """
+    name = "pi"
+
+    def __init__(self):
+        import main_pi
+        self.module = main_pi
+
+    def load_detector(self):
+        m = self.module
+        if m.OPENCV_THREADS:
+            cv2.setNumThreads(m.OPENCV_THREADS)
+        return m.load_detector(m.MODEL_FILE, (m.INPUT_WIDTH, m.INPUT_HEIGHT))
+
+    def decode_settings(self):
+        return self.module.decode_settings()
+
+    def select(self, detections, sort_tracker, target_lock):
+        _, closest = self.module.select_target(detections, sort_tracker, target_lock)
+        return closest[1:] if closest else None
+
+    def controller(self, target_lock):
+        return self.module.AlignmentController(on_collected=target_lock.release)
+
+    def stub_outputs(self, log):
+        stubs = {(base_motors, name): (lambda name=name: log.record(name.upper()))
+                 for name in ("forward", "backward", "left", "right", "stop")}
+        stubs[(automation_pre_test, "automation_sequence")] = lambda: log.record("AUTO")
+        return stubs
+
+
+class LaptopProfile(PiProfile):
+    """
+    laptop_main.py: detector, decode_settings(), select_target() and
+    AlignmentController, with send_command replaced by the command log.
+    """
+    name = "laptop"
+
+    def __init__(self):
+        import laptop_main
+        self.module = laptop_main
+
+    def load_detector(self):
+        return self.module.load_detector()
+
+    def select(self, detections, sort_tracker, target_lock):
+        _, target_box = self.module.select_target(detections, sort_tracker, target_lock)
+        return target_box
+
+    def stub_outputs(self, log):
+        return {(self.module, "send_command"): log.record}
+
+
+def parse_overrides(pairs):
+    """
+    ["CONF_THRESHOLD=0.3", "DETECTOR_BACKEND=onnxruntime"] -> dict with
+    Python literals where possible, strings otherwise.
+    """
+    overrides = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        try:
+            overrides[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            overrides[key] = value
+    return overrides
+
+
+def replay(profile, source, overrides, limit):
+    """
+    Runs every frame through preprocess -> forward -> decode (incl. NMS) ->
+    target selection -> alignment decision. Overrides are module-level config
+    names of main_pi.py / laptop_main.py (final values such as MODEL_FILE,
+    INPUT_WIDTH, DETECTOR_BACKEND, CONF_THRESHOLD), restored afterwards.
+    Returns: ({stage: per-frame seconds}, CommandLog, frames)
+    """
+    m = profile.module
+    saved = {key: getattr(m, key) for key in overrides}
+    saved.update(GARBAGE_CLASS_IDS=m.GARBAGE_CLASS_IDS, GARBAGE_THRESHOLDS=m.GARBAGE_THRESHOLDS)
+    log = CommandLog()
+    stubs = profile.stub_outputs(log)
+    originals = {target: getattr(*target) for target in stubs}
+    try:
+        for key, value in overrides.items():
+            setattr(m, key, value)
+        # Thresholds derived from CONF_THRESHOLD / CATEGORY_THRESHOLDS at import
+        m.GARBAGE_CLASS_IDS, m.GARBAGE_THRESHOLDS = build_class_filter(
+            m.classNames, m.garbage_map, m.CATEGORY_THRESHOLDS, m.CONF_THRESHOLD)
+        for (obj, attr), stub in stubs.items():
+            setattr(obj, attr, stub)
+
+        detector = profile.load_detector()
+        if detector is None:
+            raise RuntimeError("Detector could not be loaded")
+        preprocessor = detector.preprocessor()
+        sort_tracker = SortTracker(max_age=m.TRACK_MAX_AGE)
+        target_lock = TargetLock(max_missed=m.TRACK_MAX_AGE)
+        controller = profile.controller(target_lock)
+        settings = profile.decode_settings()
+
+        times = {stage: [] for stage in STAGES}
+        frames = 0
+        for img in iter_frames(source, limit):
+            if frames == 0:
+                # First forward passes allocate lazily; keep them out of the stats
+                for _ in range(WARMUP):
+                    detector.detect(img, **settings)
+            log.frame = frames
+            t0 = time.perf_counter()
+            blob, scale, pad = preprocessor.prepare(img)
+            t1 = time.perf_counter()
+            outputs = detector.infer(blob)
+            t2 = time.perf_counter()
+            detections = detector.decode(outputs, scale, pad, **settings)
+            t3 = time.perf_counter()
+            target_box = profile.select(detections, sort_tracker, target_lock)
+            t4 = time.perf_counter()
+            controller.step(target_box, img.shape[1])
+            t5 = time.perf_counter()
+            for stage, seconds in zip(STAGES, (t1 - t0, t2 - t1, t3 - t2, t4 - t3, t5 - t4, t5 - t0)):
+                times[stage].append(seconds)
+            frames += 1
+        return times, log, frames
+    finally:
+        for (obj, attr), original in originals.items():
+            setattr(obj, attr, original)
+        for key, value in saved.items():
+            setattr(m, key, value)
+
+
+def summarize(times, frames):
+    """
+    Returns: {stage: (p50, p95, p99) in ms} and throughput in FPS
+    """
+    stats = {}
+    for stage, samples in times.items():
+        ms = np.array(samples) * 1000
+        stats[stage] = tuple(np.percentile(ms, [50, 95, 99])) if ms.size else (0.0, 0.0, 0.0)
+    total = sum(times["total"])
+    return stats, (frames / total if total else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded video/images through the detection and control pipeline.")
+    parser.add_argument("source", help="recorder.py session, video file or image folder")
+    parser.add_argument("--profile", choices=["pi", "laptop"], default="pi", help="pipeline to replay")
+    parser.add_argument("-a", action="append", metavar="KEY=VALUE", help="config override for run A")
+    parser.add_argument("-b", action="append", metavar="KEY=VALUE", help="config override for run B (enables comparison)")
+    parser.add_argument("--frames", type=int, default=MAX_FRAMES, help="max frames to replay")
+    args = parser.parse_args()
+
+    profile = PiProfile() if args.profile == "pi" else LaptopProfile()
+    runs = [("A", parse_overrides(args.a))]
+    if args.b:
+        runs.append(("B", parse_overrides(args.b)))
+
+    results = []
+    for label, overrides in runs:
+        print(f"Run {label}: {args.profile} {overrides or '(defaults)'}")
+        times, log, frames = replay(profile, args.source, overrides, args.frames)
+        if frames == 0:
+            print(f"No frames read from {args.source}")
+            return
+        stats, fps = summarize(times, frames)
+        results.append((label, stats, fps, log, frames))
+
+    print(f"\nPer-stage latency in ms (p50 / p95 / p99), {results[0][4]} frames")
+    header = f"{'stage':<12}" + "".join(f"{'run ' + label:>26}" for label, *_ in results)
+    print(header)
+    for stage in STAGES:
+        row = f"{stage:<12}"
+        for _, stats, *_ in results:
+            p50, p95, p99 = stats[stage]
+            row += f"{p50:>10.1f}{p95:>8.1f}{p99:>8.1f}"
+        print(row)
+    print(f"{'FPS':<12}" + "".join(f"{fps:>26.1f}" for _, _, fps, *_ in results))
+
+    for label, _, _, log, _ in results:
+        print(f"\nCommands run {label}: {log.runs() or '(none)'}")
+    if len(results) == 2:
+        frames = min(results[0][4], results[1][4])
+        a = results[0][3].per_frame(frames)
+        b = results[1][3].per_frame(frames)
+        differ = sum(x != y for x, y in zip(a, b))
+        print(f"\nDecisions differ on {differ} of {frames} frames")
+
+
+if __name__ == "__main__":
+    main()
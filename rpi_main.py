@@ -1,10 +1,15 @@
 import cv2
 import socket
-import struct
-import pickle
 import threading
 import time
 import sys
+import atexit
+from recorder import Recorder, session_dir
+from metrics import counter, gauge, histogram, stage_timer, serve as serve_metrics
+from tracing import Tracer
+from video_protocol import send_frame, CreditWindow, CREDIT_DONE, CREDIT_STALE
+from pipeline import FanOut
+from stream_quality import QualityController
 
 # Import Hardware Modules
 try:
@@ -19,6 +24,98 @@ except ImportError:
 VIDEO_PORT = 5555
 CMD_PORT = 5556
 BUFFER_SIZE = 4096
+# Flow-controlled streaming: the camera is read on its own thread into a
+# single-frame slot (newer frames replace unsent ones) and a frame is only
+# sent, always the newest, while the laptop has granted a credit, so stale
+# frames never queue up in socket buffers when the laptop falls behind.
+# A laptop that grants no credits within CREDIT_WAIT s (FLOW_CONTROL off or an
+# older laptop_main.py) is streamed to as fast as the link allows.
+FLOW_CONTROL = True
+CREDIT_WAIT = 2.0
+STATS_INTERVAL = 5.0  # seconds between stream reports
+# Camera resolution and JPEG quality of the stream; the upper bound when
+# ADAPTIVE_QUALITY lowers quality and downscales frames as the link slows
+# down, to keep frames within FRAME_AGE_BUDGET s from capture to the laptop's
+# decision (see stream_quality.py). Link throughput and laptop processing time
+# come from the flow control credits (send timings without flow control).
+CAMERA_WIDTH = 640
+CAMERA_HEIGHT = 480
+JPEG_QUALITY = 80
+ADAPTIVE_QUALITY = True
+FRAME_AGE_BUDGET = 0.25
+# MJPEG passthrough: request MJPEG from the camera (V4L2) and stream its
+# compressed frames as they are, skipping the decode to BGR and re-encode on
+# the Pi. Frames are only decoded here when ADAPTIVE_QUALITY has to shrink
+# them. Falls back to BGR capture + encoding if the camera or OpenCV backend
+# does not hand out raw MJPEG.
+MJPEG_PASSTHROUGH = True
+# Several laptops can connect at once (up to VIDEO_CLIENTS), e.g. a second one
+# to watch (WATCH_ONLY in its laptop_main.py). Each is streamed to on its own thread with its own newest-frame
+# slot, credits and quality level, so a slow one cannot hold up the others,
+# and a frame is encoded only once per quality level.
+# DISTRIBUTE_INFERENCE: each frame goes to only one laptop (the next one with
+# a free credit, in turn when they are equally fast) instead of all of them,
+# so every added laptop raises the detection rate. Their commands are merged
+# by frame ID on the command server. Without it, only the longest-connected
+# laptop on the command server drives; the others' commands are ignored.
+VIDEO_CLIENTS = 4
+DISTRIBUTE_INFERENCE = False
+KNOWN_COMMANDS = ("FORWARD", "BACKWARD", "LEFT", "RIGHT", "STOP", "AUTO")
+# Video frames are sent with video_protocol.send_frame (header with frame ID
+# and capture time on the Pi clock, then the JPEG bytes).
+# Commands are lines "<COMMAND> <frame ID> <capture time>\n" naming the frame
+# they were decided on; "PING <t>\n" is answered with "PONG <t> <Pi time>\n"
+# for the laptop's clock offset estimate. Must match laptop_main.py.
+# Commands from all connected laptops are applied in frame order: a decision
+# on an older frame than the last applied one, or on a frame captured before
+# the last AUTO sequence finished, is dropped.
+
+# Record the streamed JPEGs, base motor commands and lift sensor readings
+# to RECORD_DIR/<date_time>/ (see recorder.py)
+RECORD_SESSION = False
+RECORD_DIR = "recordings"
+
+# Prometheus metrics (see metrics.py) at http://METRICS_HOST:METRICS_PORT/metrics (0 = off)
+METRICS_PORT = 9108
+METRICS_HOST = "127.0.0.1"
+
+# Per-frame spans (capture, encode, send, command dispatch) written to
+# TRACE_FILE on exit; merge with the laptop's file using tracing.py
+TRACE = False
+TRACE_FILE = "trace_pi.json"
+
+recorder = None
+tracer = None
+
+command_lock = threading.Lock()  # one command (or AUTO sequence) at a time across laptops
+command_clients = []             # (socket, address) of connected laptops, oldest first
+driver = None                    # command socket allowed to drive (without DISTRIBUTE_INFERENCE)
+last_command_frame = 0           # frame ID of the newest decision applied
+automation_done = 0.0            # decisions on frames captured before this are stale
+
+CAPTURE_SECONDS = stage_timer("capture")
+ENCODE_SECONDS = stage_timer("jpeg_encode")
+SEND_SECONDS = histogram("wastexpert_socket_seconds", "Socket send/recv duration in seconds.", op="video_send")
+SENT_BYTES = counter("wastexpert_socket_bytes_total", "Bytes sent/received.", op="video_send")
+def stream_frames(result):
+    return counter("wastexpert_stream_frames_total", "Video stream frames by outcome.", result=result)
+
+def frame_age(at):
+    return histogram("wastexpert_stream_frame_age_seconds", "Frame age since capture, in seconds (Pi clock).", at=at)
+
+SENT_FRAMES = stream_frames("sent")
+DROPPED_FRAMES = stream_frames("dropped")  # replaced by a newer frame before it was sent
+STALE_FRAMES = stream_frames("stale")      # sent, but replaced on the laptop before it was processed
+SEND_AGE_SECONDS = frame_age("send")       # when the send completed
+DONE_AGE_SECONDS = frame_age("done")       # when the laptop reported it processed
+STREAM_QUALITY = gauge("wastexpert_stream_jpeg_quality", "JPEG quality of the last streamed frame.")
+STREAM_SCALE = gauge("wastexpert_stream_scale", "Downscale factor of the last streamed frame.")
+IGNORED_COMMANDS = counter("wastexpert_ignored_commands_total",
+                           "Commands from a laptop that is not the driver (DISTRIBUTE_INFERENCE off).")
+STALE_COMMANDS = counter("wastexpert_stale_commands_total",
+                         "Commands dropped for being decided on an older frame than the last applied one.")
+ACTUATION_SECONDS = histogram("wastexpert_motion_to_actuation_seconds",
+                              "Camera capture to command dispatch on the Pi, in seconds.")
 
 def init_hardware():
     print("🤖 Initializing Hardware...")
@@ -39,41 +136,231 @@ def init_hardware():
     except Exception as e:
         print(f"❌ Hardware Init Error: {e}")
 
+def is_jpeg(frame):
+    # Raw MJPEG reads are a 1 x N byte row starting with the JPEG SOI marker
+    return (frame is not None and frame.ndim == 2 and frame.shape[0] == 1 and frame.size > 2
+            and frame[0, 0] == 0xFF and frame[0, 1] == 0xD8)
+
+def configure_camera(cap, passthrough):
+    if passthrough:
+        cap.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    cap.set(3, CAMERA_WIDTH)
+    cap.set(4, CAMERA_HEIGHT)
+    cap.set(cv2.CAP_PROP_CONVERT_RGB, 0 if passthrough else 1)
+
+def open_camera():
+    """
+    Returns: (capture, passthrough) where passthrough means read() returns
+    the camera's JPEG bytes instead of BGR pixels
+    """
+    if not MJPEG_PASSTHROUGH:
+        cap = cv2.VideoCapture(0)
+        configure_camera(cap, False)
+        return cap, False
+
+    cap = cv2.VideoCapture(0, cv2.CAP_V4L2)
+    configure_camera(cap, True)
+    ret, frame = cap.read()
+    if ret and is_jpeg(frame):
+        print(f"📷 MJPEG passthrough ({int(cap.get(3))}x{int(cap.get(4))})")
+        return cap, True
+    print("📷 Camera gives no raw MJPEG, encoding frames on the Pi")
+    configure_camera(cap, False)
+    return cap, False
+
+class StreamFrame:
+    """
+    One captured frame, shared by all video clients. jpeg() encodes it once
+    per quality level, on the first client that sends it at that level.
+    camera_size (width, height) is set when image is the camera's JPEG bytes
+    (MJPEG passthrough) rather than BGR pixels.
+    """
+    def __init__(self, frame_id, image, t_start, t_capture, camera_size=None):
+        self.frame_id = frame_id
+        self.image = image
+        self.t_start = t_start
+        self.t_capture = t_capture
+        self.camera_size = camera_size
+        self.pixels = image if camera_size is None else None
+        self.encoded = {}  # level -> (JPEG buffer, camera width, camera height)
+        self.lock = threading.Lock()
+
+    def jpeg(self, level, scale, quality):
+        """
+        Returns: (JPEG buffer, camera width, camera height) at the given level
+        """
+        with self.lock:
+            if level not in self.encoded:
+                self.encoded[level] = self._encode(level, scale, quality)
+                if len(self.encoded) == 1:
+                    # First time this frame is streamed
+                    if recorder is not None:
+                        recorder.jpeg(self.encoded[level][0])
+                    if tracer is not None:
+                        tracer.add("capture", self.t_start, self.t_capture, self.frame_id)
+            return self.encoded[level]
+
+    def _encode(self, level, scale, quality):
+        if self.camera_size is not None and level == 0:
+            # Camera JPEG as it came in
+            return (self.image, *self.camera_size)
+        if self.pixels is None:
+            # Passthrough, but the controller wants smaller frames
+            self.pixels = cv2.imdecode(self.image, cv2.IMREAD_COLOR)
+        # Compress frame (downscaled by the quality controller; the header
+        # keeps the camera size so the laptop scales it back)
+        start = time.time()
+        height, width = self.pixels.shape[:2]
+        small = self.pixels if scale == 1.0 else cv2.resize(self.pixels, (int(width * scale), int(height * scale)),
+                                                            interpolation=cv2.INTER_AREA)
+        ret, buffer = cv2.imencode('.jpg', small, [int(cv2.IMWRITE_JPEG_QUALITY), quality])
+        end = time.time()
+        ENCODE_SECONDS.observe(end - start)
+        if tracer is not None:
+            tracer.add("jpeg_encode", start, end, self.frame_id, quality=quality, scale=scale)
+        return buffer, width, height
+
+def capture_frames(cap, hub, camera_size=None):
+    """
+    Capture thread: publishes the newest frame (BGR, or JPEG bytes in
+    passthrough) to hub while a client is connected.
+    """
+    frame_id = 0
+    while True:
+        hub.active.wait()
+        if not cap.isOpened():
+            cap.open(0, cv2.CAP_V4L2 if camera_size is not None else cv2.CAP_ANY)
+            configure_camera(cap, camera_size is not None)
+        t_start = time.time()
+        ret, frame = cap.read()
+        t_capture = time.time()
+        CAPTURE_SECONDS.observe(t_capture - t_start)
+        if not ret:
+            time.sleep(0.01)
+            continue
+        frame_id += 1
+        hub.put(StreamFrame(frame_id, frame, t_start, t_capture, camera_size))
+
 def video_stream_server():
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
     server_socket.bind(('0.0.0.0', VIDEO_PORT)) # Listen on all interfaces
     server_socket.listen(5)
-    print(f"📷 Video Stream Server listening on port {VIDEO_PORT}")
+    print(f"📷 Video Stream Server listening on port {VIDEO_PORT}"
+          + (" (distributing frames across clients)" if DISTRIBUTE_INFERENCE else ""))
 
-    cap = cv2.VideoCapture(0)
-    cap.set(3, 640)
-    cap.set(4, 480)
+    cap, passthrough = open_camera()
+    camera_size = (int(cap.get(3)), int(cap.get(4))) if passthrough else None
+
+    hub = FanOut(1, on_drop=lambda item: DROPPED_FRAMES.inc(), shared=DISTRIBUTE_INFERENCE)
+    t_capture = threading.Thread(target=capture_frames, args=(cap, hub, camera_size), name="capture")
+    t_capture.daemon = True
+    t_capture.start()
 
     while True:
         client_socket, addr = server_socket.accept()
-        print(f"📷 Video Connected to: {addr}")
-        
-        if not cap.isOpened():
-             cap.open(0)
-
-        try:
-            while cap.isOpened():
-                ret, frame = cap.read()
-                if not ret:
-                    break
-                
-                # Compress frame
-                ret, buffer = cv2.imencode('.jpg', frame, [int(cv2.IMWRITE_JPEG_QUALITY), 80])
-                data = pickle.dumps(buffer)
-                
-                # Send message length first, then data
-                message_size = struct.pack("Q", len(data))
-                client_socket.sendall(message_size + data)
-                
-        except Exception as e:
-            print(f"📷 Video Stream Error/Disconnect: {e}")
-        finally:
+        if len(hub) >= VIDEO_CLIENTS:
+            print(f"📷 Video client {addr} refused, {VIDEO_CLIENTS} already connected")
             client_socket.close()
+            continue
+        # A new client's queue never holds a frame captured before it connected
+        latest = hub.subscribe()
+        print(f"📷 Video Connected to: {addr} ({len(hub)} connected)")
+        t_client = threading.Thread(target=serve_video_client, args=(client_socket, addr, hub, latest),
+                                    name=f"video {addr[0]}:{addr[1]}")
+        t_client.daemon = True
+        t_client.start()
+
+def serve_video_client(client_socket, addr, hub, latest):
+    try:
+        stream_to_client(client_socket, latest, addr)
+    except Exception as e:
+        print(f"📷 Video Stream Error/Disconnect ({addr}): {e}")
+    finally:
+        hub.unsubscribe(latest)
+        client_socket.close()
+
+def stream_to_client(client_socket, latest, addr=None):
+    """
+    Sends the newest StreamFrame from latest to one client, whenever it has
+    granted a credit.
+    """
+    window = CreditWindow()
+    # Frame ID -> (capture time, send start, quality level, bytes) until the laptop reports on it
+    in_flight = {}
+    quality = QualityController(JPEG_QUALITY, 1.0, FRAME_AGE_BUDGET) if ADAPTIVE_QUALITY else None
+
+    def on_credit(kind, seq, processing):
+        frame = in_flight.pop(seq, None)
+        if frame is None:
+            return
+        t_capture, t_send, level, size = frame
+        if kind == CREDIT_DONE:
+            t_done = time.time()
+            DONE_AGE_SECONDS.observe(t_done - t_capture)
+            if quality is not None:
+                # Send start to credit, minus the laptop's decode + inference
+                quality.observe(level, size, t_done - t_capture, max(t_done - t_send - processing, 0.0))
+        elif kind == CREDIT_STALE:
+            STALE_FRAMES.inc()
+
+    t_credits = threading.Thread(target=window.run, args=(client_socket, on_credit), name="video credits")
+    t_credits.daemon = True
+    t_credits.start()
+
+    flow = FLOW_CONTROL
+    connected = time.time()
+    sent = passed = 0
+    dropped_before = latest.dropped
+    last_report = time.time()
+    while not window.closed:
+        if flow and not window.acquire(timeout=0.5):
+            if not window.active and time.time() - connected > CREDIT_WAIT:
+                print(f"📷 Receiver {addr} grants no credits, streaming without flow control")
+                flow = False
+            continue
+
+        # Newest frame at the moment the credit arrived
+        frame = None
+        while frame is None and not window.closed:
+            frame = latest.get(timeout=0.5)
+        if frame is None:
+            break
+        frame_id, t_capture = frame.frame_id, frame.t_capture
+
+        level, scale, jpeg_quality = quality.settings if quality is not None else (0, 1.0, JPEG_QUALITY)
+        if frame.camera_size is not None and level == 0:
+            passed += 1
+        else:
+            STREAM_QUALITY.set(jpeg_quality)
+            STREAM_SCALE.set(scale)
+        buffer, width, height = frame.jpeg(level, scale, jpeg_quality)
+        t_encoded = time.time()
+
+        # Header (frame ID, capture time, size) and JPEG bytes, no copy
+        if flow:
+            in_flight[frame_id] = (t_capture, t_encoded, level, buffer.nbytes)
+        size = send_frame(client_socket, frame_id, t_capture, width, height, buffer)
+        t_sent = time.time()
+        SEND_SECONDS.observe(t_sent - t_encoded)
+        SENT_BYTES.inc(size)
+        SENT_FRAMES.inc()
+        SEND_AGE_SECONDS.observe(t_sent - t_capture)
+        if quality is not None and not flow:
+            # No reports from the laptop: blocking send time is the link measure
+            quality.observe(level, buffer.nbytes, t_sent - t_capture, t_sent - t_encoded)
+        sent += 1
+        if tracer is not None:
+            tracer.add("send", t_encoded, t_sent, frame_id, bytes=size)
+
+        if t_sent - last_report >= STATS_INTERVAL:
+            dropped, dropped_before = latest.dropped - dropped_before, latest.dropped
+            print(f"📷 Stream {addr[0] if addr else ''}: {sent / (t_sent - last_report):.1f} FPS sent, {dropped} dropped, "
+                  f"last frame {1000 * (t_sent - t_capture):.0f} ms old at send"
+                  + ("" if flow else " (no flow control)")
+                  + (f", {passed} passed through" if passed else "")
+                  + (f", {quality.summary()}" if quality is not None else ""))
+            sent = passed = 0
+            last_report = t_sent
 
 def command_server():
     server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
@@ -84,48 +371,132 @@ def command_server():
     while True:
         client_socket, addr = server_socket.accept()
         print(f"🎮 Command Connected to: {addr}")
+        # One thread per laptop; handle_command orders their commands
+        t_client = threading.Thread(target=serve_command_client, args=(client_socket, addr),
+                                    name=f"command {addr[0]}:{addr[1]}")
+        t_client.daemon = True
+        t_client.start()
 
-        try:
-            while True:
-                data = client_socket.recv(1024)
-                if not data:
-                    break
-                
-                command = data.decode('utf-8').strip().upper()
-                # print(f"Received Command: {command}") # Debug: print every command?
-                
-                if command == "FORWARD":
-                    base_motors.forward()
-                elif command == "BACKWARD":
-                    base_motors.backward()
-                elif command == "LEFT":
-                    base_motors.left()
-                elif command == "RIGHT":
-                    base_motors.right()
-                elif command == "STOP":
-                    base_motors.stop()
-                elif command == "AUTO":
-                    print("🚀 Triggering Automation Sequence")
-                    base_motors.stop() # Ensure stop before auto
-                    # Run automation in a separate thread so we don't block command loop?
-                    # Or block to prevent other commands? 
-                    # Blocking is safer to avoid conflict.
-                    try:
-                        automation_pre_test.automation_sequence()
-                    except Exception as e:
-                        print(f"❌ Automation Error: {e}")
-                    # client_socket.sendall(b"AUTO_DONE") # Optional: Ack
-                else:
-                    print(f"❓ Unknown Command: {command}")
+def serve_command_client(client_socket, addr):
+    global driver
+    with command_lock:
+        command_clients.append((client_socket, addr))
+        if driver is None and not DISTRIBUTE_INFERENCE:
+            driver = client_socket
+            print(f"🎮 {addr} drives")
+    try:
+        pending = b""
+        while True:
+            data = client_socket.recv(1024)
+            if not data:
+                break
+            pending += data
+            while b"\n" in pending:
+                line, pending = pending.split(b"\n", 1)
+                handle_command(client_socket, line.decode('utf-8').strip())
 
-        except Exception as e:
-            print(f"🎮 Command Connection Error/Disconnect: {e}")
-            base_motors.stop()
-        finally:
-            client_socket.close()
+    except Exception as e:
+        print(f"🎮 Command Connection Error/Disconnect: {e}")
+    finally:
+        with command_lock:
+            command_clients.remove((client_socket, addr))
+            # A laptop that never drove leaves the motors alone
+            drove = DISTRIBUTE_INFERENCE or driver is client_socket
+            if driver is client_socket:
+                # The longest-connected remaining laptop takes over
+                driver = command_clients[0][0] if command_clients else None
+                if driver is not None:
+                    print(f"🎮 {command_clients[0][1]} drives")
+        client_socket.close()
+        if drove:
             base_motors.stop()
 
+def handle_command(client_socket, line):
+    global last_command_frame, automation_done
+    fields = line.split()
+    if not fields:
+        return
+    command = fields[0].upper()
+    if command == "PING":
+        # Clock offset probe from the laptop: echo its time with ours
+        client_socket.sendall(f"PONG {fields[1]} {time.time():.6f}\n".encode('utf-8'))
+        return
+
+    # Frame the laptop decided on, if it sent one
+    frame_id = int(fields[1]) if len(fields) > 1 else None
+    t_capture = float(fields[2]) if len(fields) > 2 else None
+
+    with command_lock:
+        if not DISTRIBUTE_INFERENCE and client_socket is not driver:
+            # Mirror mode: every laptop sees every frame, only one drives
+            IGNORED_COMMANDS.inc()
+            return
+        if frame_id:
+            # Another laptop already acted on a newer frame (or the AUTO
+            # sequence ran after this frame was captured)
+            if frame_id < last_command_frame or (t_capture is not None and t_capture < automation_done):
+                STALE_COMMANDS.inc()
+                return
+            last_command_frame = frame_id
+        dispatch_command(command, frame_id, t_capture)
+        if command == "AUTO":
+            automation_done = time.time()
+
+def dispatch_command(command, frame_id, t_capture):
+    start = time.time()
+    if t_capture is not None:
+        ACTUATION_SECONDS.observe(start - t_capture)
+
+    # Unknown commands share one label value to keep the series count fixed
+    label = command if command in KNOWN_COMMANDS else "UNKNOWN"
+    counter("wastexpert_commands_total", "Drive/automation commands received.", command=label).inc()
+    # print(f"Received Command: {command}") # Debug: print every command?
+
+    if command == "FORWARD":
+        base_motors.forward()
+    elif command == "BACKWARD":
+        base_motors.backward()
+    elif command == "LEFT":
+        base_motors.left()
+    elif command == "RIGHT":
+        base_motors.right()
+    elif command == "STOP":
+        base_motors.stop()
+    elif command == "AUTO":
+        print("🚀 Triggering Automation Sequence")
+        base_motors.stop() # Ensure stop before auto
+        # Blocking (command_lock is held) so that no other command, from
+        # any laptop, conflicts with the sequence
+        try:
+            automation_pre_test.automation_sequence()
+        except Exception as e:
+            print(f"❌ Automation Error: {e}")
+        # client_socket.sendall(b"AUTO_DONE") # Optional: Ack
+    else:
+        print(f"❓ Unknown Command: {command}")
+
+    if tracer is not None:
+        tracer.add(f"dispatch {command}", start, time.time(), frame_id)
+
 def main():
+    global recorder, tracer
+    if RECORD_SESSION:
+        recorder = Recorder(session_dir(RECORD_DIR))
+        print(f"Recording session to {recorder.path}")
+        base_motors.on_command = recorder.command
+        automation_pre_test.on_sensor = recorder.sensor
+        atexit.register(recorder.close)
+
+    if METRICS_PORT:
+        try:
+            serve_metrics(METRICS_PORT, METRICS_HOST)
+        except OSError as e:
+            print(f"Metrics endpoint failed: {e}")
+
+    if TRACE:
+        tracer = Tracer("rpi_main")
+        atexit.register(tracer.export, TRACE_FILE)
+
     init_hardware()
 
     # Start Video Thread
@@ -0,0 +1,258 @@
+import numpy as np
+
+from postprocess import DETECTION_DTYPE
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
+# Detection fields plus a stable ID and how many updates the track has missed
+TRACK_DTYPE = np.dtype(DETECTION_DTYPE.descr + [("track_id", np.int32), ("missed", np.int32)])
+
+# ================= KALMAN MODEL =================
+# State: [cx, cy, area, aspect, vx, vy, v_area] with constant velocity;
+# aspect ratio is assumed constant (as in SORT)
+F = np.eye(7)
+F[0, 4] = F[1, 5] = F[2, 6] = 1.0
+H = np.eye(4, 7)
+
+Q = np.eye(7)
+Q[4:, 4:] *= 0.01
+Q[-1, -1] *= 0.01
+
+R = np.eye(4)
+R[2:, 2:] *= 10.0
+
+P0 = np.eye(7) * 10.0
+P0[4:, 4:] *= 1000.0  # Velocities are unknown at birth
+
+
+def hungarian(cost):
+    """
+    Minimum-cost assignment on a rectangular cost matrix (O(n^3), vectorized
+    over columns). Used when scipy is not installed.
+    Returns: (rows, cols)
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.int64)    # p[j]: row assigned to column j (1-based)
+    way = np.zeros(m + 1, dtype=np.int64)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            used_cols = np.flatnonzero(used)
+            u[p[used_cols]] += delta
+            v[used_cols] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    cols = np.flatnonzero(p[1:])
+    rows = p[1:][cols] - 1
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+def iou_matrix(a, b):
+    """
+    Pairwise IoU of (N, 4) and (M, 4) boxes given as (left, top, width, height).
+    """
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+def boxes_to_z(boxes):
+    w, h = boxes[:, 2], boxes[:, 3]
+    return np.stack([boxes[:, 0] + w / 2, boxes[:, 1] + h / 2, w * h, w / np.maximum(h, 1e-6)], axis=1)
+
+
+def x_to_boxes(x):
+    area = np.maximum(x[:, 2], 1e-6)
+    w = np.sqrt(area * x[:, 3])
+    h = area / np.maximum(w, 1e-6)
+    return np.stack([x[:, 0] - w / 2, x[:, 1] - h / 2, w, h], axis=1)
+
+
+class SortTracker:
+    """
+    SORT-style multi-object tracker: constant-velocity Kalman filters for all
+    tracks in stacked arrays, IoU cost with Hungarian association, track birth
+    for unmatched detections and death after max_age missed updates.
+    """
+    def __init__(self, max_age=5, min_hits=2, iou_threshold=0.3):
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.iou_threshold = iou_threshold
+        self.reset()
+
+    def reset(self):
+        self.x = np.zeros((0, 7))
+        self.P = np.zeros((0, 7, 7))
+        self.ids = np.zeros(0, dtype=np.int32)
+        self.hits = np.zeros(0, dtype=np.int32)
+        self.missed = np.zeros(0, dtype=np.int32)
+        self.class_ids = np.zeros(0, dtype=np.int32)
+        self.confs = np.zeros(0, dtype=np.float32)
+        self.frame_count = 0
+        self.next_id = 1
+
+    def predict(self):
+        # Keep the area positive
+        shrinking = self.x[:, 2] + self.x[:, 6] <= 0
+        self.x[shrinking, 6] = 0.0
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+        self.missed += 1
+
+    def correct(self, idx, z):
+        x, P = self.x[idx], self.P[idx]
+        y = z - x @ H.T
+        S = H @ P @ H.T + R
+        K = P @ H.T @ np.linalg.inv(S)
+        self.x[idx] = x + (K @ y[:, :, None])[:, :, 0]
+        self.P[idx] = (np.eye(7) - K @ H) @ P
+
+    def update(self, detections):
+        """
+        detections: structured array with DETECTION_DTYPE fields.
+        Returns: confirmed tracks (TRACK_DTYPE) matched to a detection in this
+        update. Tracks coasting on their prediction (up to max_age missed
+        updates) are kept internally for re-association but not returned,
+        so no target is ever a predicted box without a detection behind it.
+        """
+        self.frame_count += 1
+        self.predict()
+
+        boxes = np.stack([detections["left"], detections["top"],
+                          detections["width"], detections["height"]], axis=1).astype(np.float64)
+        if boxes.size == 0:
+            boxes = boxes.reshape(0, 4)
+
+        # Associate detections with predicted track boxes
+        matched_det = np.zeros(0, dtype=np.int64)
+        matched_trk = np.zeros(0, dtype=np.int64)
+        if len(boxes) and len(self.ids):
+            iou = iou_matrix(boxes, x_to_boxes(self.x))
+            if linear_sum_assignment is not None:
+                rows, cols = linear_sum_assignment(-iou)
+            else:
+                rows, cols = hungarian(-iou)
+            good = iou[rows, cols] >= self.iou_threshold
+            matched_det, matched_trk = rows[good], cols[good]
+
+        if matched_det.size:
+            self.correct(matched_trk, boxes_to_z(boxes[matched_det]))
+            self.hits[matched_trk] += 1
+            self.missed[matched_trk] = 0
+            self.class_ids[matched_trk] = detections["class_id"][matched_det]
+            self.confs[matched_trk] = detections["conf"][matched_det]
+
+        # Birth: every unmatched detection starts a new track
+        new = np.setdiff1d(np.arange(len(boxes)), matched_det)
+        if new.size:
+            x = np.zeros((new.size, 7))
+            x[:, :4] = boxes_to_z(boxes[new])
+            self.x = np.concatenate([self.x, x])
+            self.P = np.concatenate([self.P, np.repeat(P0[None], new.size, axis=0)])
+            self.ids = np.concatenate([self.ids, np.arange(self.next_id, self.next_id + new.size, dtype=np.int32)])
+            self.hits = np.concatenate([self.hits, np.ones(new.size, dtype=np.int32)])
+            self.missed = np.concatenate([self.missed, np.zeros(new.size, dtype=np.int32)])
+            self.class_ids = np.concatenate([self.class_ids, detections["class_id"][new].astype(np.int32)])
+            self.confs = np.concatenate([self.confs, detections["conf"][new].astype(np.float32)])
+            self.next_id += new.size
+
+        # Death: drop tracks that have missed too many updates
+        alive = self.missed <= self.max_age
+        if not alive.all():
+            for name in ("x", "P", "ids", "hits", "missed", "class_ids", "confs"):
+                setattr(self, name, getattr(self, name)[alive])
+
+        confirmed = ((self.hits >= self.min_hits) | (self.frame_count <= self.min_hits)) & (self.missed == 0)
+        out_boxes = x_to_boxes(self.x[confirmed])
+        tracks = np.empty(int(confirmed.sum()), dtype=TRACK_DTYPE)
+        tracks["left"] = out_boxes[:, 0]
+        tracks["top"] = out_boxes[:, 1]
+        tracks["width"] = out_boxes[:, 2]
+        tracks["height"] = out_boxes[:, 3]
+        tracks["conf"] = self.confs[confirmed]
+        tracks["class_id"] = self.class_ids[confirmed]
+        tracks["track_id"] = self.ids[confirmed]
+        tracks["missed"] = self.missed[confirmed]
+        return tracks
+
+
+class TargetLock:
+    """
+    Commits the controller to one track ID until it is collected (release())
+    or lost, so near-equidistant items do not cause flip-flopping.
+    While the locked track goes undetected there is no target (the tracker
+    may still re-match it); after max_missed updates (the tracker's max_age)
+    it is lost and the closest detected track is locked instead.
+    """
+    def __init__(self, max_missed=5):
+        self.max_missed = max_missed
+        self.track_id = None
+        self.missed = 0
+
+    def select(self, tracks, distances):
+        """
+        tracks: SortTracker.update() output (detected tracks only)
+        Returns: index into tracks of the target, or None
+        """
+        if self.track_id is not None:
+            locked = np.flatnonzero(tracks["track_id"] == self.track_id)
+            if locked.size:
+                self.missed = 0
+                return int(locked[0])
+            self.missed += 1
+            if self.missed <= self.max_missed:
+                return None
+            self.track_id = None
+        if len(tracks) == 0:
+            return None
+        # Lost (or nothing locked yet): commit to the closest track
+        idx = int(np.argmin(distances))
+        self.track_id = int(tracks["track_id"][idx])
+        self.missed = 0
+        return idx
+
+    def release(self):
+        self.track_id = None
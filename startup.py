@@ -0,0 +1,156 @@
+import contextlib
+import glob
+import re
+import threading
+import time
+from concurrent.futures import Future
+
+# Last camera index that delivered a frame, tried first on the next start
+CAMERA_STATE_FILE = "last_camera_index.txt"
+
+# /dev/video* nodes on a Pi that are codecs/ISPs, not cameras
+NON_CAMERA_PREFIXES = ("bcm2835-codec", "bcm2835-isp", "rpivid", "pispbe", "rp1-cfe")
+
+
+class StartupTimeline:
+    """
+    Per-phase startup timings relative to the moment it was created.
+    start() runs a phase on a daemon thread so phases overlap (a stuck lift
+    limit switch never blocks interpreter exit); phase() times a block on
+    the calling thread; mark() records an instant such as the first decision.
+    """
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.lock = threading.Lock()
+        self.phases = []   # (name, start, end), seconds since t0
+        self.marks = []    # (name, t)
+
+    def now(self):
+        return time.perf_counter() - self.t0
+
+    def _record(self, name, start):
+        with self.lock:
+            self.phases.append((name, start, self.now()))
+
+    def start(self, name, fn, *args):
+        """
+        Returns: concurrent.futures.Future with fn's result (or exception)
+        """
+        future = Future()
+
+        def run():
+            start = self.now()
+            try:
+                future.set_result(fn(*args))
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self._record(name, start)
+
+        threading.Thread(target=run, name=name, daemon=True).start()
+        return future
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = self.now()
+        try:
+            yield
+        finally:
+            self._record(name, start)
+
+    def mark(self, name):
+        with self.lock:
+            self.marks.append((name, self.now()))
+
+    def report(self):
+        with self.lock:
+            phases = sorted(self.phases, key=lambda p: p[1])
+            marks = list(self.marks)
+        lines = [f"{'phase':<24}{'start':>8}{'end':>8}{'took':>8}"]
+        for name, start, end in phases:
+            lines.append(f"{name:<24}{start:>7.2f}s{end:>7.2f}s{end - start:>7.2f}s")
+        for name, t in marks:
+            lines.append(f"{name:<24}{t:>7.2f}s")
+        serial = sum(end - start for _, start, end in phases)
+        lines.append(f"Sum of phases {serial:.2f}s (fully serial startup)")
+        return "\n".join(lines)
+
+
+def _video_name(index):
+    try:
+        with open(f"/sys/class/video4linux/video{index}/name") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def load_last_camera(path=CAMERA_STATE_FILE):
+    try:
+        with open(path) as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def save_last_camera(index, path=CAMERA_STATE_FILE):
+    try:
+        with open(path, "w") as f:
+            f.write(f"{index}\n")
+    except OSError as e:
+        print(f"Could not save camera index: {e}")
+
+
+def camera_candidates(last_index=None):
+    """
+    Enumerates /dev/video* once, skipping Pi codec/ISP nodes.
+    Returns: camera indices with last_index first; [0, 1] when /dev has no
+    video nodes (e.g. not Linux).
+    """
+    indices = []
+    for path in glob.glob("/dev/video*"):
+        match = re.fullmatch(r"/dev/video(\d+)", path)
+        if match and not _video_name(int(match.group(1))).startswith(NON_CAMERA_PREFIXES):
+            indices.append(int(match.group(1)))
+    indices = sorted(indices) or [0, 1]
+    if last_index in indices:
+        indices.remove(last_index)
+        indices.insert(0, last_index)
+    return indices
+
+
+def find_camera(open_camera, state_file=CAMERA_STATE_FILE):
+    """
+    Opens each candidate index once with open_camera(index) until one
+    delivers a frame (open_camera must return an object with isOpened(),
+    read() and release()), and remembers it for the next start.
+    Returns: (camera, index), or (None, None)
+    """
+    cameras = find_cameras(open_camera, 1, state_file)
+    return cameras[0] if cameras else (None, None)
+
+
+def find_cameras(open_camera, count, state_file=CAMERA_STATE_FILE):
+    """
+    find_camera() for up to count cameras, in candidate order (the
+    remembered index first, so the primary camera keeps its place).
+    Returns: [(camera, index)], fewer than count if not enough deliver frames
+    """
+    cameras = []
+    for index in camera_candidates(load_last_camera(state_file)):
+        if len(cameras) == count:
+            break
+        try:
+            cap = open_camera(index)
+        except Exception as e:
+            print(f"Camera index {index} failed: {e}")
+            continue
+        if cap.isOpened():
+            ok, frame = cap.read()
+            if ok and frame is not None:
+                print(f"Using camera index {index}")
+                if not cameras:
+                    save_last_camera(index, state_file)
+                cameras.append((cap, index))
+                continue
+        cap.release()
+    return cameras
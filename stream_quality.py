@@ -0,0 +1,99 @@
+# Defaults (rpi_main.py passes its own)
+BUDGET = 0.25         # seconds from capture to the laptop's decision
+QUALITY_STEPS = (0, 15, 30)   # JPEG quality below the configured maximum
+SCALES = (1.0, 0.75, 0.5)     # downscale factors up to the configured maximum
+SMOOTHING = 0.2       # weight of a new sample in the moving averages
+HOLD_FRAMES = 5       # observations between level changes
+HEADROOM = 0.8        # a better level must be predicted under HEADROOM * budget
+
+
+def quality_ladder(max_quality, max_scale=1.0):
+    """
+    Returns: [(scale, quality)] from the largest frames to the smallest,
+    ordered by the rough relative size scale^2 * quality
+    """
+    levels = {(round(max_scale * s, 3), max(max_quality - step, 10)) for s in SCALES for step in QUALITY_STEPS}
+    return sorted(levels, key=lambda level: level[0] ** 2 * level[1], reverse=True)
+
+
+def _ewma(old, new):
+    return new if old is None else old + SMOOTHING * (new - old)
+
+
+class QualityController:
+    """
+    Picks the JPEG quality and downscale factor of the video stream so that
+    frames reach a decision within budget seconds of their capture.
+    Every acknowledged frame reports its age, size and transfer time; the age
+    not explained by the transfer (encoding, laptop decode and inference) is
+    the part the stream cannot change. The controller takes the best level
+    whose predicted age (that part + frame size / throughput) fits the budget,
+    moving one level at a time and at most every HOLD_FRAMES frames.
+    When the laptop alone exceeds the budget, smaller frames cannot help and
+    the best level is kept.
+    observe() runs on the credit reader thread, settings on the sender.
+    """
+    def __init__(self, max_quality, max_scale=1.0, budget=BUDGET):
+        self.levels = quality_ladder(max_quality, max_scale)
+        self.budget = budget
+        self.level = 0
+        self.throughput = None   # bytes/s
+        self.fixed = None        # seconds of age not spent transferring
+        self.sizes = {}          # level -> bytes
+        self.since_change = 0
+
+    @property
+    def settings(self):
+        """
+        Returns: (level, scale, quality) for the next frame
+        """
+        level = self.level
+        scale, quality = self.levels[level]
+        return level, scale, quality
+
+    def observe(self, level, nbytes, age, transfer):
+        """
+        One delivered frame encoded at level: size in bytes, capture-to-decision
+        age and transfer time in seconds.
+        """
+        self.sizes[level] = _ewma(self.sizes.get(level), nbytes)
+        if transfer > 0:
+            self.throughput = _ewma(self.throughput, nbytes / transfer)
+        self.fixed = _ewma(self.fixed, max(age - transfer, 0.0))
+        self.since_change += 1
+        if self.since_change >= HOLD_FRAMES:
+            self._adapt()
+
+    def predicted_size(self, level):
+        if level in self.sizes:
+            return self.sizes[level]
+        # Not used yet: scale the nearest measured level by relative pixel count x quality
+        known = min(self.sizes, key=lambda k: abs(k - level))
+        (ks, kq), (s, q) = self.levels[known], self.levels[level]
+        return self.sizes[known] * (s * s * q) / (ks * ks * kq)
+
+    def predicted_age(self, level):
+        return self.fixed + self.predicted_size(level) / self.throughput
+
+    def _adapt(self):
+        if not self.throughput or not self.sizes:
+            return
+        if self.fixed >= self.budget:
+            target = 0
+        else:
+            target = next((i for i in range(len(self.levels)) if self.predicted_age(i) <= self.budget),
+                          len(self.levels) - 1)
+        level = self.level
+        if target > level:
+            level += 1
+        elif target < level and self.predicted_age(level - 1) <= self.budget * HEADROOM:
+            level -= 1
+        if level != self.level:
+            self.level = level
+            self.since_change = 0
+
+    def summary(self):
+        level, scale, quality = self.settings
+        throughput = f"{self.throughput / 1e6:.2f} MB/s" if self.throughput else "-"
+        fixed = f"{1000 * self.fixed:.0f} ms" if self.fixed is not None else "-"
+        return f"quality {quality} scale {scale:g} (level {level + 1}/{len(self.levels)}), link {throughput}, encode+laptop {fixed}"
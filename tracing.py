@@ -0,0 +1,133 @@
+import collections
+import contextlib
+import json
+import sys
+import threading
+import time
+import zlib
+
+# Spans kept per process (oldest are dropped), ~100 bytes each
+MAX_SPANS = 50000
+# Clock offset uses the lowest-RTT ping of the last CLOCK_SAMPLES
+CLOCK_SAMPLES = 32
+
+
+class Tracer:
+    """
+    Records named spans (wall-clock start/end, thread, frame ID) in a ring
+    buffer and exports them as Chrome / Perfetto trace JSON.
+    Frame IDs are assigned by rpi_main.py and carried through the video and
+    command protocols, so spans of one frame line up across machines.
+    """
+    def __init__(self, process_name, max_spans=MAX_SPANS):
+        self.process_name = process_name
+        self.spans = collections.deque(maxlen=max_spans)  # append() is thread-safe
+
+    def add(self, name, start, end, frame=None, **args):
+        self.spans.append((name, start, end, threading.current_thread().name, frame, args))
+
+    @contextlib.contextmanager
+    def span(self, name, frame=None, **args):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.add(name, start, time.time(), frame, **args)
+
+    def events(self, clock_offset=0.0):
+        """
+        Returns: Chrome trace events, timestamps shifted by clock_offset
+        seconds (reference clock - local clock)
+        """
+        pid = zlib.crc32(self.process_name.encode()) % 100000
+        threads = {}
+        events = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": self.process_name}}]
+        for name, start, end, thread, frame, args in list(self.spans):
+            if thread not in threads:
+                threads[thread] = len(threads) + 1
+                events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": threads[thread],
+                               "args": {"name": thread}})
+            if frame is not None:
+                args = dict(args, frame=frame)
+            events.append({"name": name, "ph": "X", "pid": pid, "tid": threads[thread],
+                           "ts": (start + clock_offset) * 1e6, "dur": (end - start) * 1e6, "args": args})
+        return events
+
+    def export(self, path, clock_offset=0.0):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events(clock_offset), "displayTimeUnit": "ms"}, f)
+        print(f"Trace written to {path} ({len(self.spans)} spans)")
+
+
+class ClockSync:
+    """
+    NTP-style offset estimate from ping exchanges: t0 local send, t1 remote
+    time, t2 local receive. offset = remote clock - local clock, taken from
+    the lowest round trip (least queueing) of the recent samples.
+    """
+    def __init__(self, samples=CLOCK_SAMPLES):
+        self.samples = collections.deque(maxlen=samples)
+
+    def add(self, t0, t1, t2):
+        self.samples.append((t2 - t0, t1 - (t0 + t2) / 2))
+
+    @property
+    def offset(self):
+        if not self.samples:
+            return 0.0
+        return min(self.samples)[1]
+
+    @property
+    def rtt(self):
+        return min(self.samples)[0] if self.samples else None
+
+
+def flow_events(events):
+    """
+    Arrows between consecutive spans of the same frame on different
+    processes (e.g. Pi "send" -> laptop "recv" -> Pi "dispatch").
+    """
+    by_frame = collections.defaultdict(list)
+    for event in events:
+        if event.get("ph") == "X" and "frame" in event["args"]:
+            by_frame[event["args"]["frame"]].append(event)
+    flows = []
+    flow_id = 0
+    for frame, spans in by_frame.items():
+        spans.sort(key=lambda e: e["ts"])
+        for a, b in zip(spans, spans[1:]):
+            if a["pid"] == b["pid"]:
+                continue
+            flow_id += 1
+            flows.append({"name": f"frame {frame}", "cat": "frame", "ph": "s", "id": flow_id,
+                          "pid": a["pid"], "tid": a["tid"], "ts": a["ts"]})
+            flows.append({"name": f"frame {frame}", "cat": "frame", "ph": "f", "bp": "e", "id": flow_id,
+                          "pid": b["pid"], "tid": b["tid"], "ts": b["ts"]})
+    return flows
+
+
+def merge(output, paths):
+    """
+    Combines trace files from several machines (already on one clock, see
+    Tracer.export clock_offset) and links each frame's spans across them.
+    """
+    events = []
+    for path in paths:
+        with open(path) as f:
+            events.extend(json.load(f)["traceEvents"])
+    events.extend(flow_events(events))
+    with open(output, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    print(f"Merged {len(paths)} traces into {output}, open it in https://ui.perfetto.dev or chrome://tracing")
+
+
+def main():
+    # Usage: python tracing.py <output.json> trace_pi.json trace_laptop.json
+    if len(sys.argv) < 3:
+        print("Usage: python tracing.py <output.json> <trace.json> [<trace.json> ...]")
+        return
+    merge(sys.argv[1], sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+import collections
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+
+# Video stream framing between rpi_main.py (sender) and laptop_main.py (receiver).
+# Every frame is a fixed header followed by the encoded image, no pickle:
+#   magic, protocol version, codec, frame ID (sequence), capture time (Pi clock),
+#   camera width and height, payload length
+# The payload may be a downscaled image (adaptive quality); decode_frame()
+# returns it at the camera size, so boxes stay in camera pixels.
+FRAME_HEADER = struct.Struct("<4sBBQdHHI")
+MAGIC = b"WXVF"
+VERSION = 1
+
+CODEC_JPEG = 1
+
+# Larger payloads mean the stream is corrupt (a 640x480 JPEG is ~30-100 KB)
+MAX_PAYLOAD = 10_000_000
+# Initial receive buffer, grown when a larger frame arrives
+BUFFER_SIZE = 256 * 1024
+
+# Flow control, receiver -> sender on the same connection: the receiver grants
+# credits and the sender only sends a frame while it holds one, always the
+# newest. Message: magic, kind, credits granted, frame ID it refers to (0 = none),
+# receiver processing time of that frame in seconds (receive to decision)
+CREDIT_MESSAGE = struct.Struct("<4sBIQf")
+CREDIT_MAGIC = b"WXVC"
+CREDIT_INITIAL = 0  # window granted right after connecting
+CREDIT_DONE = 1     # frame processed (decision made)
+CREDIT_STALE = 2    # frame replaced by a newer one before it was processed
+
+FrameHeader = collections.namedtuple("FrameHeader", "seq t_capture width height codec length")
+
+
+def send_frame(sock, seq, t_capture, width, height, payload, codec=CODEC_JPEG):
+    """
+    Sends one frame. payload is any buffer (e.g. the cv2.imencode array) and
+    is not copied: header and payload go out in one sendmsg() where available.
+    Returns: bytes sent
+    """
+    payload = memoryview(payload).cast("B")
+    header = FRAME_HEADER.pack(MAGIC, VERSION, codec, seq, t_capture, width, height, payload.nbytes)
+    if hasattr(sock, "sendmsg"):
+        sent = sock.sendmsg([header, payload])
+        if sent < len(header):
+            sock.sendall(header[sent:])
+            sent = len(header)
+        sock.sendall(payload[sent - len(header):])
+    else:
+        # Windows sockets have no sendmsg
+        sock.sendall(header)
+        sock.sendall(payload)
+    return len(header) + payload.nbytes
+
+
+def read_exact(sock, view):
+    """
+    Fills the memoryview view from sock with recv_into().
+    """
+    while view.nbytes:
+        n = sock.recv_into(view)
+        if n == 0:
+            raise ConnectionError("Video stream closed")
+        view = view[n:]
+
+
+class FrameReceiver:
+    """
+    Reads frames from a connected socket with recv_into() into one reusable
+    buffer, so a frame costs no allocations and no copies on the Python side.
+    The payload returned by receive() is a view into that buffer and is only
+    valid until the next receive() (decode it, or copy it, before then).
+    """
+    def __init__(self, sock, buffer_size=BUFFER_SIZE, max_payload=MAX_PAYLOAD):
+        self.sock = sock
+        self.max_payload = max_payload
+        self.header = bytearray(FRAME_HEADER.size)
+        self.buffer = bytearray(buffer_size)
+        self.t_header = 0.0  # time.time() the last header was complete
+
+    def receive(self):
+        """
+        Returns: (FrameHeader, memoryview of the payload)
+        """
+        read_exact(self.sock, memoryview(self.header))
+        self.t_header = time.time()
+        magic, version, codec, seq, t_capture, width, height, length = FRAME_HEADER.unpack(self.header)
+        if magic != MAGIC:
+            raise ValueError(f"Bad frame magic {magic!r}, stream out of sync")
+        if version != VERSION:
+            raise ValueError(f"Video protocol version {version}, expected {VERSION}: update rpi_main.py and laptop_main.py together")
+        if length > self.max_payload:
+            raise ValueError(f"Frame payload of {length} bytes exceeds {self.max_payload}")
+        if length > len(self.buffer):
+            self.buffer = bytearray(length)
+        payload = memoryview(self.buffer)[:length]
+        read_exact(self.sock, payload)
+        return FrameHeader(seq, t_capture, width, height, codec, length), payload
+
+
+def decode_frame(header, payload):
+    """
+    Returns: BGR image at the camera size from a received payload (None if
+    it does not decode)
+    """
+    if header.codec != CODEC_JPEG:
+        raise ValueError(f"Unsupported codec {header.codec}")
+    img = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is not None and (img.shape[1], img.shape[0]) != (header.width, header.height):
+        img = cv2.resize(img, (header.width, header.height), interpolation=cv2.INTER_LINEAR)
+    return img
+
+
+def send_credit(sock, kind, seq=0, credits=1, processing=0.0):
+    sock.sendall(CREDIT_MESSAGE.pack(CREDIT_MAGIC, kind, credits, seq, processing))
+
+
+class CreditWindow:
+    """
+    Sender side of the flow control. run() reads the receiver's credit
+    messages on its own thread; acquire() takes one credit for the next frame.
+    active turns True with the first message, so a sender can tell a receiver
+    without flow control (which never sends one) from a busy one.
+    """
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.credits = 0
+        self.active = False
+        self.closed = False
+
+    def run(self, sock, on_credit=None):
+        """
+        Reads credit messages until the connection closes.
+        on_credit(kind, seq, processing) is called for every message.
+        """
+        message = bytearray(CREDIT_MESSAGE.size)
+        try:
+            while True:
+                read_exact(sock, memoryview(message))
+                magic, kind, credits, seq, processing = CREDIT_MESSAGE.unpack(message)
+                if magic != CREDIT_MAGIC:
+                    raise ValueError(f"Bad credit magic {magic!r}")
+                with self.cond:
+                    self.credits += credits
+                    self.active = True
+                    self.cond.notify_all()
+                if on_credit is not None:
+                    on_credit(kind, seq, processing)
+        except (OSError, ValueError):
+            pass  # ConnectionError is an OSError
+        finally:
+            with self.cond:
+                self.closed = True
+                self.cond.notify_all()
+
+    def acquire(self, timeout=None):
+        """
+        Returns: True if a credit was taken, False on timeout or once closed
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.credits > 0 or self.closed, timeout)
+            if self.credits > 0 and not self.closed:
+                self.credits -= 1
+                return True
+            return False
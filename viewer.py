@@ -0,0 +1,73 @@
+import threading
+import time
+import cv2
+
+# Display modes
+# 'window'   = draw overlays and imshow on the processing thread (every frame)
+# 'viewer'   = the processing loop only hands over the latest frame; a viewer
+#              thread draws and shows it at up to viewer_fps
+# 'headless' = no drawing and no GUI calls at all (no display attached)
+DISPLAY_MODES = ('window', 'viewer', 'headless')
+
+
+class Display:
+    """
+    Frame output for the detection loops.
+    draw(img, overlay) renders the loop's overlay data (targets, status text)
+    onto img; it is only called when something is actually shown, so loops
+    hand over plain data and never draw on the hot path themselves.
+    show() returns False once 'q' was pressed in the window.
+    """
+    def __init__(self, mode, window_name, draw, viewer_fps=5.0):
+        if mode not in DISPLAY_MODES:
+            raise ValueError(f"Unknown display mode {mode!r}, expected one of {DISPLAY_MODES}")
+        self.mode = mode
+        self.window_name = window_name
+        self.draw = draw
+        self.interval = 1.0 / viewer_fps
+        self.quit = threading.Event()
+        self.lock = threading.Lock()
+        self.latest = None
+        self.stopped = False
+        self.thread = None
+        if mode == 'viewer':
+            self.thread = threading.Thread(target=self.run, name="viewer")
+            self.thread.daemon = True
+            self.thread.start()
+
+    def show(self, img, overlay):
+        if self.mode == 'window':
+            self.draw(img, overlay)
+            cv2.imshow(self.window_name, img)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                self.quit.set()
+        elif self.mode == 'viewer':
+            # Reference swap only; the viewer picks up whatever is newest
+            with self.lock:
+                self.latest = (img, overlay)
+        return not self.quit.is_set()
+
+    def run(self):
+        # All GUI calls stay on this thread
+        shown = None
+        while not self.stopped:
+            start = time.perf_counter()
+            with self.lock:
+                latest = self.latest
+            if latest is not None and latest is not shown:
+                shown = latest
+                img, overlay = latest
+                img = img.copy()  # Never draw into a frame the loop may still read
+                self.draw(img, overlay)
+                cv2.imshow(self.window_name, img)
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                self.quit.set()
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+        cv2.destroyAllWindows()
+
+    def close(self):
+        self.stopped = True
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+        elif self.mode == 'window':
+            cv2.destroyAllWindows()